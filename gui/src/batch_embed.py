@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+# -----------------------------------
+# Name: batch_embed.py
+# Desc: Headless batch embedding of the QCADesigner circuits in a job
+#       manifest, see core/batch.py for the manifest format
+# Author: Jake Retallick
+# Created: 2026.10.17
+# Modified: 2026.10.17
+# Licence: Copyright 2015
+# -----------------------------------
+
+import argparse
+import sys
+
+from core.batch import load_manifest, run_batch
+
+
+def main():
+    '''Parse arguments and run all pending jobs of the manifest'''
+
+    parser = argparse.ArgumentParser(
+        description='Embed all circuits of a job manifest. Jobs which already '
+                    'have an embedding file are skipped, so an interrupted '
+                    'batch can be restarted with the same command.')
+    parser.add_argument('manifest', help='JSON job manifest')
+    parser.add_argument('-p', '--procs', type=int, default=None,
+                        help='number of worker processes, default all cores')
+    parser.add_argument('-d', '--dense-procs', type=int, default=None,
+                        help='worker processes for the dense placement '
+                             'trials of each job if jobs run serially, 0 '
+                             'for all cores')
+    parser.add_argument('-t', '--trials', type=int, default=None,
+                        help='dense placement trials per circuit')
+    parser.add_argument('-b', '--budget', type=float, default=None,
+                        help='time budget in seconds per trial')
+    parser.add_argument('-s', '--seed', type=int, default=None,
+                        help='base seed of dense placement trials')
+    parser.add_argument('--profile', default=None,
+                        help='name or file of a dense placement cost profile')
+    parser.add_argument('--text', action='store_true',
+                        help='write embeddings in the text format')
+    parser.add_argument('--skip-failed', action='store_true',
+                        help='do not retry jobs which failed in a past run')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='do not use the embedding cache')
+    args = parser.parse_args()
+
+    try:
+        manifest = load_manifest(args.manifest)
+    except IOError:
+        sys.exit(1)
+
+    records = run_batch(manifest, procs=args.procs,
+                        binary=False if args.text else None,
+                        skip_failed=args.skip_failed, trials=args.trials,
+                        seed=args.seed, budget=args.budget,
+                        use_cache=False if args.no_cache else None,
+                        profile=args.profile, dense_procs=args.dense_procs)
+
+    failed = [job['name'] for job in manifest['jobs']
+              if job['name'] in records and not records[job['name']]['good']]
+    if failed:
+        print('Failed jobs: {0}'.format(', '.join(failed)))
+
+
+if __name__ == '__main__':
+    main()
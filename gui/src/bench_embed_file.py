@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+
+#---------------------------------------------------------
+# Name: bench_embed_file.py
+# Purpose: Comparison of the load times of embedding files in the text and
+#          binary formats
+# Author: Jacob Retallick
+# Created: 17.10.2026
+#---------------------------------------------------------
+
+import random
+import shutil
+import sys
+import tempfile
+import os
+
+from time import time
+
+from core.embed_file import write_text, write_binary, load_text, \
+    load_binary, read_binary, BIN_EXT, TEXT_EXT
+
+FILES = 200             # number of embedding files per format
+CELLS = 150             # number of cells per embedding
+MAX_MODEL = 6           # maximum number of qubits per model
+M, N, L = 12, 12, 4     # size of the embedding active range
+
+
+def gen_embedding(rng):
+    '''Random embedding of CELLS cells with disjoint models of up to
+    MAX_MODEL qubits'''
+
+    qbits = [(m, n, h, l) for m in xrange(M) for n in xrange(N)
+             for h in xrange(2) for l in xrange(L)]
+    rng.shuffle(qbits)
+
+    models = {}
+    for cell in xrange(CELLS):
+        size = rng.randint(1, MAX_MODEL)
+        models[cell], qbits = qbits[:size], qbits[size:]
+
+    meta = {'chimera_file': '../chimera/bay16.txt',
+            'qca_file': '../qca/circuit.qca',
+            'full_adj': True, 'use_dense': True,
+            'M': M, 'N': N, 'L': L, 'M0': 2, 'N0': 3}
+
+    return meta, models
+
+
+def timed(func, fnames):
+    '''Total time taken by func over all given files'''
+
+    t = time()
+    for fname in fnames:
+        func(fname)
+    return time()-t
+
+
+def run_bench(files=FILES):
+    '''Write random embeddings in both formats and time their loading'''
+
+    rng = random.Random(0)
+    embeddings = [gen_embedding(rng) for _ in xrange(files)]
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        results = {}
+        for name, write, ext in [('text', write_text, TEXT_EXT),
+                                 ('binary', write_binary, BIN_EXT)]:
+            fnames = [os.path.join(tmp_dir, '{0}{1}'.format(i, ext))
+                      for i in xrange(files)]
+            t = time()
+            for fname, (meta, models) in zip(fnames, embeddings):
+                write(fname, meta, models)
+            results[name] = {'write': time()-t,
+                             'size': sum(os.path.getsize(fname)
+                                         for fname in fnames)}
+
+            load = load_text if name == 'text' else load_binary
+            results[name]['load'] = timed(load, fnames)
+            if name == 'binary':
+                results['binary']['map'] = timed(read_binary, fnames)
+
+            # loaded embeddings must match the written ones
+            for fname, (meta, models) in zip(fnames[:10], embeddings):
+                assert load(fname) == (meta, models)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    return results
+
+
+def show(results, files=FILES):
+    '''Echo a comparison table of the benchmark results'''
+
+    print('\n{0:>8} {1:>10} {2:>10} {3:>10} {4:>10}'.format(
+        'format', 'kB/file', 'write ms', 'load ms', 'map ms'))
+    for name in ['text', 'binary']:
+        res = results[name]
+        print('{0:>8} {1:>10.1f} {2:>10.3f} {3:>10.3f} {4:>10}'.format(
+            name, res['size']/1e3/files, 1e3*res['write']/files,
+            1e3*res['load']/files,
+            '{0:.3f}'.format(1e3*res['map']/files) if 'map' in res else '-'))
+
+
+if __name__ == '__main__':
+
+    try:
+        files = int(sys.argv[1])
+    except:
+        files = FILES
+
+    show(run_bench(files), files)
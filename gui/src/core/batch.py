@@ -0,0 +1,346 @@
+#!/usr/bin/env python
+
+#---------------------------------------------------------
+# Name: batch.py
+# Purpose: Headless batch embedding of QCADesigner circuits listed in a job
+#          manifest, run across a pool of worker processes
+# Author: Jacob Retallick
+# Created: 17.10.2026
+#---------------------------------------------------------
+
+import numpy as np
+import multiprocessing as mp
+import json
+import os
+
+from time import time
+
+from core.parse_qca import parse_qca_file
+from core.auxil import prepare_convert_adj, convert_to_full_adjacency, \
+    convert_to_lim_adjacency, CELL_FUNCTIONS
+from core.chimera import load_chimera_file, linear_to_tuple
+from core.classes import Embedding, get_embedder_flags
+from core.embed_file import save_embedding, BIN_EXT, TEXT_EXT
+import core.core_settings as settings
+
+# The manifest is a JSON object. Paths are relative to the manifest file.
+#
+#   {"chimera_file": "chimera/bay16.txt",
+#    "active_range": {"M": [0, 8], "N": [0, 8]},
+#    "out_dir": "embeddings",
+#    "full_adj": true, "use_dense": true, "tile_style": 0,
+#    "jobs": ["circuits/xor.qca",
+#             {"qca_file": "circuits/maj.qca", "name": "maj_lim",
+#              "full_adj": false}]}
+#
+# Only chimera_file and jobs are required. The active range defaults to the
+# full processor and out_dir to the manifest directory. Jobs are qca files
+# or objects which override any of the job options. Each job's embedding is
+# written to out_dir as <name>.emb, or <name>.txt in the text format, with
+# the name defaulting to the qca file name. Completed jobs are logged to
+# LOG_FILE in out_dir and jobs with an embedding file are skipped when the
+# batch is restarted.
+
+JOB_OPTIONS = ['active_range', 'full_adj', 'use_dense', 'tile_style']
+LOG_FILE = 'batch.log'          # JSON-lines record of completed jobs
+SUMMARY_FILE = 'summary.embed'  # embed file listing all written embeddings
+
+
+class QCACell:
+    '''Cell type flags of a parsed QCADesigner cell, as used by Embedding.
+    Stands in for the GUI's QCACellWidget'''
+
+    def __init__(self, cell):
+        '''Initialise from a cell dict of parse_qca_file'''
+
+        self.x, self.y = cell['x'], cell['y']
+        self.type = cell['cf']
+
+        self.fixed = self.type == CELL_FUNCTIONS['QCAD_CELL_FIXED']
+        self.driver = self.type == CELL_FUNCTIONS['QCAD_CELL_INPUT']
+        self.output = self.type == CELL_FUNCTIONS['QCAD_CELL_OUTPUT']
+        self.normal = not (self.fixed or self.driver)
+
+        self.pol = cell['pol'] if self.fixed else None
+
+
+def load_manifest(fname):
+    '''Load a job manifest. Returns a dict of the resolved chimera file and
+    output directory, and the list of jobs. Each job is a dict with the
+    absolute qca file, a unique name and all job options'''
+
+    try:
+        with open(fname, 'r') as fp:
+            manifest = json.load(fp)
+    except (IOError, ValueError):
+        print('Failed to load manifest: {0}'.format(fname))
+        raise IOError
+
+    root = os.path.dirname(os.path.abspath(fname))
+    path = lambda f: os.path.normpath(os.path.join(root, f))
+
+    defaults = {'active_range': None, 'full_adj': True, 'use_dense': True,
+                'tile_style': 0}
+    defaults.update((key, manifest[key]) for key in JOB_OPTIONS
+                    if key in manifest)
+
+    jobs, names = [], set()
+    for ind, job in enumerate(manifest['jobs']):
+        if not isinstance(job, dict):
+            job = {'qca_file': job}
+        opts = dict(defaults)
+        opts.update(job)
+        opts['qca_file'] = path(job['qca_file'])
+        opts.setdefault('name', os.path.splitext(
+            os.path.basename(job['qca_file']))[0])
+        if opts['name'] in names:
+            print('Duplicate job name in manifest: {0}'.format(opts['name']))
+            raise IOError
+        names.add(opts['name'])
+        opts['index'] = ind
+        jobs.append(opts)
+
+    return {'chimera_file': path(manifest['chimera_file']),
+            'out_dir': path(manifest.get('out_dir', '')),
+            'jobs': jobs}
+
+
+def load_circuit(qca_file, full_adj=True):
+    '''Parse a QCADesigner file into the normalised interaction matrix and
+    cells needed by Embedding.set_qca'''
+
+    cells, spacing, J = parse_qca_file(qca_file)
+
+    convert_vars = dict(zip(['Js', 'T', 'A', 'DX', 'DY'],
+                            prepare_convert_adj(cells, spacing, J)))
+    if full_adj:
+        J0 = convert_to_full_adjacency(J, **convert_vars)
+    else:
+        J0 = convert_to_lim_adjacency(J, **convert_vars)
+    J0 /= np.max(np.abs(J0))
+
+    return J0, [QCACell(cell) for cell in cells]
+
+
+def load_target(chimera_file, active_range=None, tile_style=0):
+    '''Load the Chimera graph of a chimera file restricted to an active
+    range of tiles. Returns the adjacency dict of the active range offset to
+    zero, the full range dict and the M, N of the active range. Tile styles
+    other than 0 keep only the even (-1) or odd (1) qubits of each half
+    tile, as in the GUI'''
+
+    M, N, adj = load_chimera_file(chimera_file)
+    adj = {linear_to_tuple(k, M, N): [linear_to_tuple(a, M, N)
+                                      for a in adj[k]] for k in adj}
+
+    if active_range is None:
+        active_range = {'M': [0, M], 'N': [0, N]}
+    M0, M1 = active_range['M']
+    N0, N1 = active_range['N']
+
+    check = lambda m, n, h, l: M0 <= m < M1 and N0 <= n < N1
+    if tile_style != 0:
+        side = 0 if tile_style < 0 else 1
+        check = lambda m, n, h, l, check=check: \
+            check(m, n, h, l) and l % 2 == side
+
+    offset = lambda m, n, h, l: (m-M0, n-N0, h, l)
+    adj = {offset(*q1): [offset(*q2) for q2 in adj[q1] if check(*q2)]
+           for q1 in adj if check(*q1)}
+
+    return adj, active_range, M1-M0, N1-N0
+
+
+def job_file(out_dir, job, binary=True):
+    '''Embedding file of a job'''
+
+    return os.path.join(out_dir, job['name'] + (BIN_EXT if binary
+                                                else TEXT_EXT))
+
+
+def run_job(args):
+    '''Embed the circuit of a single job and write its embedding file.
+    Returns a record of the job outcome for the batch log'''
+
+    job, chimera_file, out_dir, binary = args
+
+    rec = {'name': job['name'], 'index': job['index'], 'good': False}
+    t = time()
+    try:
+        if not job['use_dense'] and not get_embedder_flags()['heur']:
+            raise ValueError('Heuristic embedder is not available')
+
+        chimera_adj, active_range, M, N = load_target(
+            chimera_file, job['active_range'], job['tile_style'])
+        J, cells = load_circuit(job['qca_file'], job['full_adj'])
+
+        embedding = Embedding(job['qca_file'])
+        embedding.set_embedder(job['use_dense'])
+        embedding.set_chimera(chimera_adj, active_range, M, N)
+        embedding.set_qca(J, cells, job['full_adj'])
+        embedding.run_embedding()
+    except KeyboardInterrupt:
+        raise KeyboardInterrupt
+    except (Exception, SystemExit) as e:
+        rec['error'] = str(e) or type(e).__name__
+        rec['time'] = time()-t
+        return rec
+
+    rec['time'] = time()-t
+    rec['cached'] = embedding.cached
+    if not embedding.good:
+        if embedding.feasibility.get('reasons'):
+            rec['reasons'] = embedding.feasibility['reasons']
+        size = embedding.suggest_range() if job['use_dense'] else None
+        if size is not None:
+            rec['suggest'] = size
+        return rec
+
+    fname = job_file(out_dir, job, binary)
+    meta = {'chimera_file': os.path.relpath(chimera_file, out_dir),
+            'qca_file': os.path.relpath(job['qca_file'], out_dir),
+            'full_adj': job['full_adj'],
+            'use_dense': job['use_dense'],
+            'M': M, 'N': N, 'L': embedding.L,
+            'M0': active_range['M'][0],
+            'N0': active_range['N'][0]}
+
+    # write then rename so an interrupted batch never leaves a partial file
+    try:
+        save_embedding(fname+'.part', meta, embedding.models, binary=binary)
+        os.rename(fname+'.part', fname)
+    except (IOError, OSError):
+        rec['error'] = 'Failed to write {0}'.format(fname)
+        return rec
+
+    rec['good'] = True
+    rec['file'] = os.path.basename(fname)
+    rec['qubits'] = sum(len(qbits) for qbits in embedding.models.values())
+    rec['max_chain'] = max(len(qbits) for qbits in embedding.models.values())
+
+    return rec
+
+
+def read_log(out_dir):
+    '''Name keyed records of completed jobs in the batch log. Later records
+    of a job replace earlier ones'''
+
+    records = {}
+    try:
+        with open(os.path.join(out_dir, LOG_FILE), 'r') as fp:
+            for line in fp:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue    # truncated by an interrupted batch
+                records[rec['name']] = rec
+    except IOError:
+        pass
+    return records
+
+
+def write_summary(manifest, binary=True):
+    '''Write an embed file listing the embedding file of each job, keyed by
+    job index, for the GUI and post-processing tools'''
+
+    out_dir = manifest['out_dir']
+    fname = os.path.join(out_dir, SUMMARY_FILE)
+
+    with open(fname, 'w') as fp:
+        chim_file = os.path.relpath(manifest['chimera_file'], out_dir)
+        fp.write('chimera_file: {0}\n\n'.format(chim_file))
+        for job in manifest['jobs']:
+            if os.path.exists(job_file(out_dir, job, binary)):
+                fp.write('{0}: {1}\n'.format(job['index'], os.path.basename(
+                    job_file(out_dir, job, binary))))
+
+
+def _init_worker(trials, seed, budget, use_cache, profile, dense_procs,
+                 pooled=True):
+    '''Apply the batch's embedder settings in the current process. Dense
+    placement trials of pooled jobs run serially since pool workers cannot
+    have their own pools'''
+
+    if pooled:
+        settings.DENSE_PROCS = 1
+    elif dense_procs is not None:
+        settings.DENSE_PROCS = dense_procs
+    if trials is not None:
+        settings.DENSE_TRIALS = trials
+    if seed is not None:
+        settings.DENSE_SEED = seed
+    if budget is not None:
+        settings.DENSE_BUDGET = budget
+    if use_cache is not None:
+        settings.USE_CACHE = use_cache
+    if profile is not None:
+        settings.DENSE_PROFILE = profile
+
+
+def run_batch(manifest, procs=None, binary=None, skip_failed=False,
+              trials=None, seed=None, budget=None, use_cache=None,
+              profile=None, dense_procs=None, verbose=True):
+    '''Run all pending jobs of a loaded manifest in a pool of procs worker
+    processes, all cores if None. Jobs with an embedding file are skipped,
+    as are jobs logged as failed if skip_failed. Each embedding is written
+    and logged as soon as its job completes. If jobs run serially, the
+    dense placement trials of each job can instead run in a pool of
+    dense_procs processes, 0 for all cores. Unspecified embedder settings
+    default to the core settings. Returns the name keyed records of all
+    completed jobs'''
+
+    out_dir = manifest['out_dir']
+    if binary is None:
+        binary = settings.EMBED_FORMAT == 'binary'
+    if not os.path.isdir(out_dir):
+        os.makedirs(out_dir)
+
+    records = read_log(out_dir)
+    pending = []
+    for job in manifest['jobs']:
+        if os.path.exists(job_file(out_dir, job, binary)):
+            continue
+        rec = records.get(job['name'])
+        if skip_failed and rec is not None and not rec['good']:
+            continue
+        pending.append(job)
+
+    if verbose:
+        print('{0} of {1} jobs pending'.format(len(pending),
+                                               len(manifest['jobs'])))
+
+    if pending:
+        tasks = [(job, manifest['chimera_file'], out_dir, binary)
+                 for job in pending]
+        init_args = (trials, seed, budget, use_cache, profile, dense_procs)
+        procs = max(1, min(procs or mp.cpu_count(), len(tasks)))
+
+        if procs == 1:
+            _init_worker(*init_args, pooled=False)
+            results = (run_job(task) for task in tasks)
+            pool = None
+        else:
+            pool = mp.Pool(procs, initializer=_init_worker,
+                           initargs=init_args)
+            results = pool.imap_unordered(run_job, tasks)
+
+        log = open(os.path.join(out_dir, LOG_FILE), 'a')
+        try:
+            for count, rec in enumerate(results, 1):
+                records[rec['name']] = rec
+                log.write(json.dumps(rec, sort_keys=True) + '\n')
+                log.flush()
+                if verbose:
+                    print('[{0}/{1}] {2}... {3} ({4:.1f}s)'.format(
+                        count, len(tasks), rec['name'],
+                        'success' if rec['good'] else
+                        rec.get('error', 'failed'), rec['time']))
+        finally:
+            log.close()
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+    write_summary(manifest, binary)
+
+    return records
@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+
+#---------------------------------------------------------
+# Name: cache.py
+# Purpose: Persistent cache of embeddings keyed by the reduced QCA circuit
+#          graph and the active Chimera sub-graph
+# Author: Jacob Retallick
+# Created: 17.10.2026
+#---------------------------------------------------------
+
+import hashlib
+import json
+import os
+import tempfile
+
+MAX_ENTRIES = 20    # maximum number of cached embeddings per circuit
+
+
+def circuit_key(cells, adj):
+    '''Canonical hash of a circuit adjacency dict. Cells are relabelled by
+    their rank in sorted order so the hash does not depend on the cell
+    numbering offset, e.g. from removed driver cells. Returns the hash and
+    the list of cells in rank order'''
+
+    cells = sorted(cells)
+    rank = {cell: i for i, cell in enumerate(cells)}
+    edges = sorted(set(tuple(sorted([rank[c1], rank[c2]]))
+                       for c1 in adj for c2 in adj[c1]))
+
+    key = hashlib.sha1(json.dumps([len(cells), edges])).hexdigest()
+
+    return key, cells
+
+
+def target_key(M, N, L, chimera_adj):
+    '''Hash of the active Chimera sub-graph: its size and the set of active
+    couplers, so any disabled qubit or coupler changes the hash'''
+
+    edges = sorted(set(tuple(sorted([q1, q2]))
+                       for q1 in chimera_adj for q2 in chimera_adj[q1]))
+
+    return hashlib.sha1(json.dumps([M, N, L, edges])).hexdigest()
+
+
+def check_models(models, adj, chimera_adj):
+    '''Check that the models form a valid embedding of the circuit in the
+    given Chimera sub-graph: each model is a connected set of active qubits,
+    no qubit is shared, and every circuit edge has a coupler between the
+    two models'''
+
+    owner = {}
+    for cell in models:
+        for qbit in models[cell]:
+            if qbit in owner or not chimera_adj.get(qbit):
+                return False
+            owner[qbit] = cell
+
+    for cell in models:
+        # model connectivity
+        qbits = set(models[cell])
+        seen = set([models[cell][0]])
+        stack = [models[cell][0]]
+        while stack:
+            qbit = stack.pop()
+            for q2 in chimera_adj[qbit]:
+                if q2 in qbits and q2 not in seen:
+                    seen.add(q2)
+                    stack.append(q2)
+        if len(seen) < len(qbits):
+            return False
+
+        # couplers to adjacent models
+        for c2 in adj[cell]:
+            if not any(owner.get(q2) == c2 for qbit in models[cell]
+                       for q2 in chimera_adj[qbit]):
+                return False
+
+    return True
+
+
+def chimera_size(chimera_adj):
+    '''Number of tile rows and columns spanned by a Chimera adjacency dict'''
+
+    if not chimera_adj:
+        return 0, 0
+    return max(q[0] for q in chimera_adj)+1, max(q[1] for q in chimera_adj)+1
+
+
+def symmetries(bm, bn, M, N):
+    '''Generate the Chimera symmetries of a bm x bn block of tiles which fit
+    in an M x N processor: row and column reflections and, if the reflected
+    block still fits, the horizontal/vertical swap. Each symmetry is a
+    mapping of qubits within the block and the block size after mapping.
+    The identity comes first'''
+
+    for swap in [False, True]:
+        sm, sn = (bn, bm) if swap else (bm, bn)
+        if sm > M or sn > N:
+            continue
+        for flip_m in [False, True]:
+            for flip_n in [False, True]:
+                def mapping(q, swap=swap, flip_m=flip_m, flip_n=flip_n):
+                    m, n, h, l = q
+                    if flip_m:
+                        m = bm-1-m
+                    if flip_n:
+                        n = bn-1-n
+                    if swap:
+                        m, n, h = n, m, 1-h
+                    return (m, n, h, l)
+                yield mapping, sm, sn
+
+
+def find_placement(models, adj, chimera_adj, M=None, N=None):
+    '''Search all tile offsets and Chimera symmetries of an embedding for a
+    placement which is valid in the given Chimera sub-graph: all qubits
+    active and all needed couplers present. Offsets nearest to the current
+    placement are tried first, so a placement which is already valid is
+    returned unchanged.
+
+    inputs: models (dict)       : cell keyed lists of (m, n, h, l) qubits
+            adj (dict)          : circuit adjacency dict
+            chimera_adj (dict)  : adjacency dict of the target sub-graph
+            M, N (int)          : size of the target, default from chimera_adj
+
+    output: models (dict)       : relocated models, None if no placement
+    '''
+
+    if M is None or N is None:
+        M, N = chimera_size(chimera_adj)
+
+    qbits = [qbit for cell in models for qbit in models[cell]]
+    if not qbits:
+        return None
+
+    # bounding block of the embedding
+    m0, n0 = min(q[0] for q in qbits), min(q[1] for q in qbits)
+    bm = max(q[0] for q in qbits)-m0+1
+    bn = max(q[1] for q in qbits)-n0+1
+    local = {cell: [(m-m0, n-n0, h, l) for m, n, h, l in models[cell]]
+             for cell in models}
+
+    for mapping, sm, sn in symmetries(bm, bn, M, N):
+        mapped = {cell: map(mapping, local[cell]) for cell in local}
+        flat = [qbit for cell in mapped for qbit in mapped[cell]]
+        offsets = sorted(((dm, dn) for dm in xrange(M-sm+1)
+                          for dn in xrange(N-sn+1)),
+                         key=lambda x: abs(x[0]-m0)+abs(x[1]-n0))
+        for dm, dn in offsets:
+            # cheap rejection on inactive qubits before the full check
+            if not all(chimera_adj.get((m+dm, n+dn, h, l))
+                       for m, n, h, l in flat):
+                continue
+            placed = {cell: [(m+dm, n+dn, h, l) for m, n, h, l in
+                             mapped[cell]] for cell in mapped}
+            if check_models(placed, adj, chimera_adj):
+                return placed
+
+    return None
+
+
+class EmbeddingCache:
+    '''Persistent cache of embeddings. Each circuit has a JSON file in the
+    cache directory holding its embeddings for different Chimera
+    sub-graphs. Loaded files are kept in memory'''
+
+    def __init__(self, cache_dir):
+        '''Initialise a cache in the given directory. The directory is only
+        created once an embedding is stored'''
+
+        self.cache_dir = cache_dir
+        self.entries = {}   # circuit key keyed lists of cached embeddings
+
+    def cache_file(self, ckey):
+        '''Name of the cache file of a circuit'''
+        return os.path.join(self.cache_dir, '{0}.json'.format(ckey))
+
+    def read(self, ckey):
+        '''Read the list of cached embeddings of a circuit from its cache
+        file, bypassing the in-memory copy'''
+
+        try:
+            with open(self.cache_file(ckey), 'r') as fp:
+                self.entries[ckey] = json.load(fp)
+        except (IOError, ValueError):
+            self.entries[ckey] = []
+        return self.entries[ckey]
+
+    def load(self, ckey):
+        '''Get the list of cached embeddings of a circuit'''
+
+        if ckey not in self.entries:
+            self.read(ckey)
+        return self.entries[ckey]
+
+    def lookup(self, adj, M, N, L, chimera_adj):
+        '''Find a cached embedding of the circuit adjacency dict in the given
+        Chimera sub-graph. An embedding cached for a sub-graph which differs
+        only in qubits or couplers the embedding does not use is also
+        returned. Otherwise cached embeddings are moved to any tile offset or
+        Chimera symmetry which avoids the defects in the sub-graph. Returns a
+        cell keyed dict of qubit lists or None'''
+
+        ckey, cells = circuit_key(adj.keys(), adj)
+        entries = self.load(ckey)
+        if not entries:
+            return None
+
+        tkey = target_key(M, N, L, chimera_adj)
+        entries = [entry for entry in entries if entry['L'] == L]
+        models = [{cells[int(rank)]: map(tuple, qbits)
+                   for rank, qbits in entry['models'].iteritems()}
+                  for entry in entries]
+
+        # exact target matches first
+        order = sorted(xrange(len(entries)),
+                       key=lambda i: entries[i]['target'] != tkey)
+        for i in order:
+            if [entries[i]['M'], entries[i]['N']] != [M, N]:
+                continue
+            if entries[i]['target'] == tkey or \
+                    check_models(models[i], adj, chimera_adj):
+                return models[i]
+
+        # relocate any cached embedding within the sub-graph
+        for i in order:
+            placed = find_placement(models[i], adj, chimera_adj, M, N)
+            if placed is not None:
+                return placed
+
+        return None
+
+    def store(self, adj, M, N, L, chimera_adj, models):
+        '''Add an embedding of the circuit adjacency dict to the cache and
+        write the circuit's cache file. The file is re-read before merging,
+        so entries stored by other processes are kept, and replaced in a
+        single rename so readers never see a partly written file'''
+
+        ckey, cells = circuit_key(adj.keys(), adj)
+        tkey = target_key(M, N, L, chimera_adj)
+        rank = {cell: i for i, cell in enumerate(cells)}
+
+        entries = [entry for entry in self.read(ckey)
+                   if [entry['M'], entry['N'], entry['L'], entry['target']]
+                   != [M, N, L, tkey]]
+        entries.append({'M': M, 'N': N, 'L': L, 'target': tkey,
+                        'models': {rank[cell]: map(list, models[cell])
+                                   for cell in models}})
+        entries = entries[-MAX_ENTRIES:]
+        self.entries[ckey] = json.loads(json.dumps(entries))
+
+        tmp_name = None
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            fd, tmp_name = tempfile.mkstemp(suffix='.tmp', dir=self.cache_dir)
+            with os.fdopen(fd, 'w') as fp:
+                json.dump(entries, fp)
+            os.rename(tmp_name, self.cache_file(ckey))
+        except (IOError, OSError):
+            print('Failed to write embedding cache: {0}'.format(
+                self.cache_dir))
+            if tmp_name is not None and os.path.exists(tmp_name):
+                os.remove(tmp_name)
+            return False
+
+        return True
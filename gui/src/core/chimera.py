@@ -9,11 +9,19 @@
 #---------------------------------------------------------
 
 import numpy as np
-from itertools import product
+import os
 
 # constants
 L = 4   # number of qubits per half tile
 
+_memo = {}      # memoised adjacency dicts, keyed by size or file and mtime
+
+
+def _copy_adj(adj):
+    '''Copy of an adjacency dict which can be modified by the caller'''
+
+    return {k: list(adj[k]) for k in adj}
+
 
 def linear_to_tuple(ind, M, N, L=4, index0=False):
     '''Convert the linear index of a qubit in an (N, M, L) processor to 
@@ -43,51 +51,75 @@ def tuple_to_linear(tup, M, N, L=4, index0=False):
 
 
 def load_chimera_file(filename):
-    '''Load a chimera graph from an edge specification file'''
-    
+    '''Load a chimera graph from an edge specification file. Parsed files
+    are memoised until modified'''
+
     try:
         fp = open(filename, 'r')
+        key = (os.path.abspath(filename), os.path.getmtime(filename))
     except:
         print('Failed to open file: {0}'.format(filename))
         raise IOError
-        
-    # get number of qubits and number of connectors
-    num_qbits, num_conns = [int(x) for x in fp.readline().split()]
-    
-    adj = {i: [] for i in xrange(1, num_qbits+1)}
 
-    for line in fp:
-        a, b = [int(x) for x in line.strip().split()]
-        adj[a].append(b)
-        adj[b].append(a)
-    
-    # processor size
-    M = int(np.sqrt(num_qbits/(2*L)))
-    N = M
-    
+    if key not in _memo:
+        # get number of qubits and number of connectors
+        num_qbits, num_conns = [int(x) for x in fp.readline().split()]
+        edges = np.array(fp.read().split(), dtype=int).reshape([-1, 2])
+
+        # coupler endpoints must be qubits 1 to num_qbits, raise the first
+        # invalid endpoint as a missing qubit key
+        invalid = ((edges < 1) | (edges > num_qbits)).ravel()
+        if invalid.any():
+            fp.close()
+            raise KeyError(int(edges.ravel()[np.argmax(invalid)]))
+
+        # both directions of each edge, stable sort keeps the file order of
+        # each qubit's neighbours
+        src = edges.ravel()
+        dst = edges[:, ::-1].ravel()
+        order = np.argsort(src, kind='mergesort')
+        bounds = np.searchsorted(src[order], np.arange(1, num_qbits+2))
+        dst = dst[order].tolist()
+
+        adj = {i: dst[bounds[i-1]:bounds[i]] for i in xrange(1, num_qbits+1)}
+
+        # processor size
+        M = int(np.sqrt(num_qbits/(2*L)))
+        N = M
+
+        _memo[key] = (M, N, adj)
+
     fp.close()
 
-    return M, N, adj
-    
+    M, N, adj = _memo[key]
+    return M, N, _copy_adj(adj)
+
 
 def generate_chimera_adj(M, N, L=4):
-    '''Generate a full chimera adjacency dict of size MxN'''
-    
-    adj = {}
-    
-    # intra-tile connections
-    for m, n, h, l in product(range(M), range(N), range(2), range(L)):
-        adj[(m, n, h, l)] = [(m,n,1-h,x) for x in range(L)]
-    
-    # horizontal inter-tile connections
-    for m, n, l in product(range(M), range(N-1), range(L)):
-        adj[(m, n, 1, l)].append((m, n+1, 1, l))
-        adj[(m, n+1, 1, l)].append((m, n, 1, l))
-        
-    # vertical inter-tile connections
-    for m, n, l in product(range(M-1), range(N), range(L)):
-        adj[(m, n, 0, l)].append((m+1, n, 0, l))
-        adj[(m+1, n, 0, l)].append((m, n, 0, l))
-    
-    return adj
-    
\ No newline at end of file
+    '''Generate a full chimera adjacency dict of size MxN. Each qubit's
+    neighbours are the qubits of the other half of its tile followed by the
+    previous and next qubit along its row or column'''
+
+    key = (M, N, L)
+    if key not in _memo:
+        ids = np.arange(2*M*N*L).reshape([M, N, 2, L])
+        tups = np.unravel_index(ids.ravel(), ids.shape)
+        tups = zip(*[x.tolist() for x in tups])
+
+        # neighbour indices, -1 for missing inter-tile neighbours
+        nbrs = -np.ones([M, N, 2, L, L+2], dtype=int)
+        nbrs[:, :, :, :, :L] = ids[:, :, ::-1, np.newaxis, :]
+
+        # vertical inter-tile connections
+        nbrs[1:, :, 0, :, L] = ids[:-1, :, 0, :]
+        nbrs[:-1, :, 0, :, L+1] = ids[1:, :, 0, :]
+
+        # horizontal inter-tile connections
+        nbrs[:, 1:, 1, :, L] = ids[:, :-1, 1, :]
+        nbrs[:, :-1, 1, :, L+1] = ids[:, 1:, 1, :]
+
+        nbrs = nbrs.reshape([-1, L+2]).tolist()
+        _memo[key] = {tups[i]: [tups[j] for j in nbrs[i] if j >= 0]
+                      for i in xrange(ids.size)}
+
+    return _copy_adj(_memo[key])
@@ -9,18 +9,24 @@
 #---------------------------------------------------------
 
 import numpy as np
-import re
+import multiprocessing as mp
+import random
 import os
 
+from time import time
+
 from core.chimera import tuple_to_linear, linear_to_tuple
 import core.core_settings as settings
 from core.dense_embed.assign import assign_parameters
+from core.cache import EmbeddingCache, find_placement, check_models
+from core.embed_file import load_embedding
 
 # try to import different embedding methods
 embedders = {'dense': True,
              'heur': True}
 try:
-    from core.dense_embed.embed import denseEmbed, setChimera
+    from core.dense_embed.embed import denseEmbed, setChimera, getStats, \
+        mergeStats, checkFeasible, loadProfile
     from core.dense_embed.convert import convertToModels
 except Exception as e:
     print('Could not load dense embedding method...')
@@ -39,9 +45,76 @@ for key, flag in embedders.iteritems():
 
 SABOTAGE = False
 
+_trial_adj = {}     # source graph for dense placement trials in this process
+_trial_budget = None    # time budget of each trial in this process
+_trial_profile = None   # cost profile of each trial in this process
+
+_cache = EmbeddingCache(settings.CACHE_DIR)     # persistent embedding cache
+
 def get_embedder_flags():
     return embedders
 
+
+def _init_dense_trials(chimera_adj, M, N, L, qca_adj, budget=None,
+                       profile=None):
+    '''Set up the Chimera graph, source graph, time budget and cost profile
+    for dense placement trials run in the current process'''
+    global _trial_adj, _trial_budget, _trial_profile
+
+    setChimera(chimera_adj, M, N, L)
+    _trial_adj = qca_adj
+    _trial_budget = budget
+    _trial_profile = profile
+
+
+def _dense_trial(task):
+    '''Run a single seeded dense placement trial. Returns the trial number
+    with the cell map and paths of the embedding, or Nones on failure, and
+    the phase timings and counters of the trial'''
+
+    trial, seed = task
+    random.seed(seed)
+    np.random.seed(seed)
+    try:
+        cell_map, paths, stats = denseEmbed(_trial_adj, write=False,
+                                            stats=True, budget=_trial_budget,
+                                            profile=_trial_profile)
+    except KeyboardInterrupt:
+        raise KeyboardInterrupt
+    except (Exception, SystemExit):
+        return trial, None, None, getStats()
+    return trial, cell_map, paths, stats
+
+
+def _run_dense_trials(tasks, procs, init_args):
+    '''Generator of dense placement trial results in order of completion.
+    Trials are run in a pool of procs worker processes, or serially if
+    procs is 1. The pool is terminated once the generator is closed'''
+
+    if procs == 1:
+        _init_dense_trials(*init_args)
+        for task in tasks:
+            yield _dense_trial(task)
+        return
+
+    pool = mp.Pool(procs, initializer=_init_dense_trials, initargs=init_args)
+    try:
+        for result in pool.imap_unordered(_dense_trial, tasks):
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def embedding_size(cell_map, paths):
+    '''Number of distinct qubits used by a dense placement embedding'''
+
+    qbits = set(cell_map.values())
+    for path in paths.values():
+        qbits.update(path)
+    return len(qbits)
+
+
 class Embedding:
     '''Container class for an embedding'''
 
@@ -56,8 +129,13 @@ class Embedding:
 
         self.full_adj = True    # flag for full adjacency
         self.use_dense = True   # flag for dense placement
+        self.use_cache = settings.USE_CACHE     # flag for the embedding cache
+        self.cached = False     # flag for embedding loaded from the cache
+        self.native = True      # flag for embedding made for the chimera file
 
         self.dense_trials = 1   # number of allowed dense placement trials
+        self.dense_stats = {}   # timings and counters summed over trials
+        self.feasibility = {}   # result of the dense placement pre-check
 
         # QCA and Chimera structure
         self.qca_adj = {}       # adjacency dict for qca circuit (all cells)
@@ -82,54 +160,174 @@ class Embedding:
 
     # EMBEDDING METHODS
 
-    def run_embedding(self):
-        ''' '''
+    def run_embedding(self, lookup=True):
+        '''Run the selected embedder. If the cache is enabled, a cached
+        embedding of the same circuit in a compatible Chimera sub-graph is
+        used instead and new embeddings are added to the cache. If lookup is
+        False the embedder is always run, and the new embedding replaces any
+        cached for the same sub-graph'''
+
+        self.cached = False
+        if self.use_cache:
+            active_cells, qca_adj = self.get_reduced_qca_adj()
+            models = _cache.lookup(qca_adj, self.M, self.N, self.L,
+                                   self.chimera_adj) if lookup else None
+            if models is not None:
+                print('Using cached embedding...')
+                self.models = models
+                self.good = True
+                self.cached = True
+                return
 
         if self.use_dense:
             self.run_dense_embedding()
         else:
             self.run_heur_embedding()
 
-    def run_dense_embedding(self, full_adj=True):
-        '''Setup and run the Dense Placement algorithm'''
+        if self.good and self.use_cache:
+            _cache.store(qca_adj, self.M, self.N, self.L, self.chimera_adj,
+                         self.models)
+
+    def run_dense_embedding(self, full_adj=True, trials=None, procs=None,
+                            max_qubits=None, max_chain=None, budget=None):
+        '''Setup and run the Dense Placement algorithm. Independent trials
+        with distinct seeds are run in parallel and the embedding using the
+        fewest qubits is kept. Trials stop early once an embedding meets all
+        of the given targets on the number of qubits and the longest chain,
+        and each trial gives up once its time budget in seconds runs out.
+        Unspecified parameters default to the core settings. Phase timings
+        and counters of all run trials are summed into dense_stats'''
 
         # update embedding type in case direct call
         self.use_dense = True
 
+        trials = settings.DENSE_TRIALS if trials is None else trials
+        procs = settings.DENSE_PROCS if procs is None else procs
+        max_qubits = settings.DENSE_MAX_QUBITS if max_qubits is None \
+            else max_qubits
+        max_chain = settings.DENSE_MAX_CHAIN if max_chain is None \
+            else max_chain
+        budget = settings.DENSE_BUDGET if budget is None else budget
+
+        # load the cost profile once rather than in every trial
+        profile = settings.DENSE_PROFILE
+        if profile is not None:
+            try:
+                profile = loadProfile(profile)
+            except (IOError, KeyError) as e:
+                print('Invalid dense placement profile: {0}'.format(e))
+                self.dense_stats = {}
+                self.good = False
+                return
+
         # format embedding parameters
-        setChimera(self.chimera_adj, self.M, self.N, self.L)
         active_cells, qca_adj = self.get_reduced_qca_adj()
+        init_args = (self.chimera_adj, self.M, self.N, self.L, qca_adj,
+                     budget, profile)
+
+        # reject provably infeasible embeddings before running any trials
+        setChimera(self.chimera_adj, self.M, self.N, self.L)
+        self.feasibility = checkFeasible(qca_adj)
+        if self.feasibility['reasons']:
+            print('Embedding is infeasible in the active range:')
+            for reason in self.feasibility['reasons']:
+                print('\t{0}'.format(reason))
+            self.dense_stats = {}
+            self.good = False
+            return
+
+        # distinct seeds for each trial
+        seed = settings.DENSE_SEED
+        if seed is None:
+            seed = random.randint(0, 2**30)
+        tasks = [(trial, seed+trial) for trial in xrange(trials)]
+
+        procs = procs or mp.cpu_count()
+        procs = max(1, min(procs, trials))
 
-        # run a number of embedding and choose the best
+        # run a number of embeddings and choose the best
         embeds = []
-        for trial in xrange(settings.DENSE_TRIALS):
-            print('Trial {0}...'.format(trial)),
-            try:
-                cell_map, paths = denseEmbed(qca_adj, write=False)
-                print('success')
-            except Exception as e:
-                if type(e).__name__ == 'KeyboardInterrupt':
-                    raise KeyboardInterrupt
-                print('failed')
-                continue
-            embeds.append((cell_map, paths))
+        models = {}     # cell models of embeddings checked for chain length
+        stats = {'trials': 0, 'success': 0, 'time': {'convert': 0.}}
+        self.dense_stats = stats
+        results = _run_dense_trials(tasks, procs, init_args)
+        try:
+            for trial, cell_map, paths, trial_stats in results:
+                mergeStats(stats, trial_stats)
+                stats['trials'] += 1
+                if cell_map is None:
+                    print('Trial {0}... {1}'.format(trial, 'timed out' if
+                          trial_stats.get('timeouts') else 'failed'))
+                    continue
+                size = embedding_size(cell_map, paths)
+                print('Trial {0}... success: {1} qubits'.format(trial, size))
+                stats['success'] += 1
+                embeds.append((size, trial, cell_map, paths))
+
+                # check for early stopping
+                done = max_qubits is not None or max_chain is not None
+                if max_qubits is not None and size > max_qubits:
+                    done = False
+                if done and max_chain is not None:
+                    t = time()
+                    models[trial], max_model = convertToModels(paths, cell_map)
+                    stats['time']['convert'] += time()-t
+                    done = 0 < max_model <= max_chain
+                if done and not SABOTAGE:
+                    print('Target reached, stopping remaining trials')
+                    break
+        finally:
+            results.close()
 
         if len(embeds) == 0:
             self.good = False
             return
 
-        # sort embedding by number of qubits used (total path length)
+        # sort embedding by number of qubits used
         ind = -1 if SABOTAGE else 0
-        cell_map, paths = sorted(embeds,
-                                 key=lambda x: sum([len(p) for p in x[1]]))[ind]
+        size, trial, cell_map, paths = sorted(embeds)[ind]
         self.good = True
 
         # get cell models
-        print('Converting to models...')
-        models, max_model = convertToModels(paths, cell_map)
-        print('done')
-
-        self.models = {k: models[k]['qbits'] for k in models}
+        if models.get(trial) is None:
+            print('Converting to models...')
+            t = time()
+            models[trial], max_model = convertToModels(paths, cell_map)
+            stats['time']['convert'] += time()-t
+            print('done')
+
+        self.models = {k: models[trial][k]['qbits'] for k in models[trial]}
+
+    def suggest_range(self):
+        '''Suggest the size (M, N) of a larger active range which passes the
+        qubit count of the feasibility pre-check, assuming the free qubit
+        density of the current range. The range follows the aspect ratio of
+        the circuit's bounding box. Returns None if more tiles cannot help'''
+
+        feas = self.feasibility
+        if not feas or not feas['connected'] or \
+                feas['max_degree'] > self.L+2:
+            return None
+
+        density = feas['free_qbits']*1./(self.M*self.N) or 2.*self.L
+        tiles = feas['min_qbits']/density
+
+        # bounding box of the circuit, padded by the cell spacing
+        xs = sorted(set(self.cells[c].x for c in self.normal))
+        ys = sorted(set(self.cells[c].y for c in self.normal))
+        steps = [b-a for v in [xs, ys] for a, b in zip(v, v[1:])]
+        sep = min(steps) if steps else 1.
+        ratio = (ys[-1]-ys[0]+sep)/(xs[-1]-xs[0]+sep) if xs else 1.
+
+        M = max(self.M, int(np.ceil(np.sqrt(tiles*ratio))))
+        N = max(self.N, int(np.ceil(tiles/M)))
+        while M*N <= self.M*self.N:
+            if M < N*ratio:
+                M += 1
+            else:
+                N += 1
+
+        return M, N
 
     def run_heur_embedding(self, full_adj=True):
         '''Setup and run the Heuristic algorithm'''
@@ -278,72 +476,106 @@ class Embedding:
 
         return sorted(reduced_adj), reduced_adj
 
+    def refine_chimera(self, chimera_adj):
+        '''Restrict a full chimera adjacency dict to the active range, with
+        tiles offset to zero'''
+
+        M0, N0 = self.active_range['M'][0], self.active_range['N'][0]
+
+        tile_check = lambda m, n, h, l: \
+            m >= self.active_range['M'][0] and\
+            m < self.active_range['M'][1] and\
+            n >= self.active_range['N'][0] and\
+            n < self.active_range['N'][1]
+
+        chimera_adj = {k1: [k2 for k2 in chimera_adj[k1] if tile_check(*k2)]
+            for k1 in chimera_adj if tile_check(*k1)}
+
+        offset = lambda m, n, h, l: (m-M0, n-N0, h, l)
+        chimera_adj = {offset(*k1): [offset(*k2) for k2 in chimera_adj[k1]]
+            for k1 in chimera_adj}
+
+        return chimera_adj
+
+    def fits(self, chimera_adj):
+        '''Check that all qubits and couplers of the embedding are active in
+        the given full chimera adjacency dict. Requires the qca structure to
+        be set'''
+
+        active_cells, qca_adj = self.get_reduced_qca_adj()
+
+        M0, N0 = self.active_range['M'][0], self.active_range['N'][0]
+        offset = lambda m, n, h, l: (m+M0, n+N0, h, l)
+        models = {cell: [offset(*qbit) for qbit in self.models[cell]]
+                  for cell in self.models}
+
+        return check_models(models, qca_adj, chimera_adj)
+
+    def relocate(self, chimera_adj):
+        '''Move the embedding to the nearest tile offset or Chimera symmetry
+        for which all of its qubits and couplers are active in the given full
+        chimera adjacency dict. The active range is reduced to the tiles
+        used by the embedding. Requires the qca structure to be set. Returns
+        True if a valid placement was found'''
+
+        active_cells, qca_adj = self.get_reduced_qca_adj()
+
+        M0, N0 = self.active_range['M'][0], self.active_range['N'][0]
+        offset = lambda m, n, h, l: (m+M0, n+N0, h, l)
+        models = {cell: [offset(*qbit) for qbit in self.models[cell]]
+                  for cell in self.models}
+
+        models = find_placement(models, qca_adj, chimera_adj)
+        if models is None:
+            return False
+
+        qbits = [qbit for cell in models for qbit in models[cell]]
+        M0, N0 = min(q[0] for q in qbits), min(q[1] for q in qbits)
+        self.M = max(q[0] for q in qbits)-M0+1
+        self.N = max(q[1] for q in qbits)-N0+1
+        self.active_range = {'M': [M0, M0+self.M],
+                             'N': [N0, N0+self.N]}
+        self.chimera_adj = self.refine_chimera(chimera_adj)
+
+        offset = lambda m, n, h, l: (m-M0, n-N0, h, l)
+        self.models = {cell: [offset(*qbit) for qbit in models[cell]]
+                       for cell in models}
+        self.native = True
+
+        return True
+
     # FILE IO
 
     def from_file(self, fname, chimera_file, chimera_adj):
-        '''Load an embedder object from file relative to main directory'''
+        '''Load an embedder object from file relative to main directory.
+        The file may be in the binary or text format'''
 
-        try:
-            fp = open(fname, 'r')
-        except:
-            print('Failed to open file: {0}'.format(fname))
-            raise IOError
-
-        # parse file
-        info = {}
-        cells = []
-        for line in fp:
-            if '#' in line or len(line) < 3:
-                continue
-            key, data = [x.strip() for x in line.split(':')]
-            info[key] = data
-            if key.isdigit():
-                cells.append(key)
-        fp.close()
+        info, models = load_embedding(fname)
 
         # process info
         ndir = os.path.dirname(fname)
         chim_file = os.path.normpath(os.path.join(ndir, info['chimera_file']))
 
-        if not os.path.samefile(chim_file, chimera_file):
+        # embeddings from other chimera files must be relocated once the
+        # circuit is set, see relocate()
+        self.native = os.path.exists(chim_file) and \
+            os.path.samefile(chim_file, chimera_file)
+        if not self.native:
             print('Chosen embedding is not native to this chimera graph')
-            return
 
         self.qca_file = os.path.normpath(os.path.join(ndir, info['qca_file']))
 
         # flags
-        self.full_adj = info['full_adj'] == 'True'
-        self.use_dense = info['use_dense'] == 'True'
+        self.full_adj = info['full_adj']
+        self.use_dense = info['use_dense']
 
         # chimera parameters
-        self.M = int(info['M'])
-        self.N = int(info['N'])
-        self.L = int(info['L'])
+        self.M, self.N, self.L = info['M'], info['N'], info['L']
 
-        M0 = int(info['M0'])
-        N0 = int(info['N0'])
+        M0, N0 = info['M0'], info['N0']
         self.active_range = {'M': [M0, M0+self.M],
                              'N': [N0, N0+self.N]}
 
-        # refine chimera adjacency
-        tile_check = lambda m, n, h, l: \
-            m >= self.active_range['M'][0] and\
-            m < self.active_range['M'][1] and\
-            n >= self.active_range['N'][0] and\
-            n < self.active_range['N'][1]
+        self.chimera_adj = self.refine_chimera(chimera_adj)
 
-        chimera_adj = {k1: [k2 for k2 in chimera_adj[k1] if tile_check(*k2)]
-            for k1 in chimera_adj if tile_check(*k1)}
-
-        offset = lambda m, n, h, l: (m-M0, n-N0, h, l)
-        chimera_adj = {offset(*k1): [offset(*k2) for k2 in chimera_adj[k1]]
-            for k1 in chimera_adj}
-        self.chimera_adj = chimera_adj
-
-        # get models
-        models = {}
-        regex = re.compile('[0-9]+')
-        str_to_tuple = lambda s: tuple([int(x) for x in regex.findall(s)])
-        for cell in cells:
-            models[int(cell)] = [str_to_tuple(s) for s in info[cell].split(';')]
         self.models = models
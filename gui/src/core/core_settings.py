@@ -9,6 +9,25 @@
 # Licence: Copyright 2015
 # -----------------------------------
 
+import os
+
 DENSE_TRIALS = 10   # number of allowed dense placement trials per embedding
+DENSE_PROCS = 1     # number of worker processes for dense placement trials,
+                    # 0 uses all available cores and 1 runs trials serially
+DENSE_SEED = None   # base seed for dense placement trials, random if None
+DENSE_MAX_QUBITS = None     # stop trials early once an embedding uses at most
+                            # this many qubits, ignored if None
+DENSE_MAX_CHAIN = None      # stop trials early once an embedding has no chain
+                            # longer than this, ignored if None
+DENSE_BUDGET = None     # time budget in seconds per dense placement trial,
+                        # no limit if None
+DENSE_PROFILE = None    # name or file of the dense placement cost profile,
+                        # default cost constants if None
 HEUR_TRIALS = 1    # number of allowed heuristic trials per embedding
-HEUR_TIMEOUT = 5   # allowed number of seconds for heuristic algorithm
\ No newline at end of file
+HEUR_TIMEOUT = 5   # allowed number of seconds for heuristic algorithm
+USE_CACHE = True   # reuse cached embeddings of previously embedded circuits
+# directory of the persistent embedding cache, gui/bin/cache
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         os.pardir, os.pardir, 'bin', 'cache')
+EMBED_FORMAT = 'binary'     # format of saved embedding files: binary, or
+                            # text for export
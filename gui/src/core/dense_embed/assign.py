@@ -10,7 +10,6 @@
 
 import numpy as np
 import networkx as nx
-import itertools
 import re
 
 # ASSIGNMENT PARAMETERS
@@ -23,6 +22,36 @@ strategy = 'maximal'
 assert strategy.lower() in strategies, 'Invalid edge selection strategy'
 
 
+MEMO_SIZE = 64     # maximum number of memoised networkx graphs
+
+_graph_memo = {}    # id keyed (chimera adjacency, size, networkx graph)
+
+
+def chimera_graph(chimera):
+    '''networkx graph of a chimera adjacency structure. Graphs are kept per
+    adjacency object, so each of several embeddings exported for every
+    driver polarization only has its graph built once. An adjacency which
+    changed size since its graph was built gets a new graph'''
+
+    entry = _graph_memo.get(id(chimera))
+    if entry is None or entry[0] is not chimera or \
+            entry[1] != len(chimera):
+        if len(_graph_memo) >= MEMO_SIZE:
+            _graph_memo.clear()
+        entry = (chimera, len(chimera), nx.Graph(chimera))
+        _graph_memo[id(chimera)] = entry
+
+    return entry[2]
+
+
+def model_index(parts):
+    '''Map each qbit of a dict of partitions to its partition label and its
+    position in the partition'''
+
+    return {qbit: (label, k) for label in parts
+            for k, qbit in enumerate(parts[label])}
+
+
 def sort_dict(d):
     '''Sort the keys of a dict by d[key]'''
     return zip(*sorted([(d[k], k) for k in d]))[1]
@@ -44,8 +73,6 @@ def minimal_couplers(subgraphs, edges):
     '''Use the fewest possible number of couplers between and within
     subgraphs'''
 
-    N = len(subgraphs)
-
     # map each subgraph to its minimum spanning tree
     subgraphs = [nx.minimum_spanning_tree(subgraph) for subgraph in subgraphs]
 
@@ -61,15 +88,11 @@ def minimal_couplers(subgraphs, edges):
         for node in path_lengths[root]:
             costs[node] = path_lengths[root][node]
 
-    # for each pair of subgraphs, keep the inter-subgraph edge with the
-    # minimum total cost of its end nodes
-    nodes = sorted(subgraphs.keys())
-    for i in xrange(N-1):
-        q1 = nodes[i]
-        for j in xrange(i+1, N):
-            q2 = nodes[j]
-            edge_costs = {e: costs[e[0]]+costs[e[1]] for e in edges[(q1, q2)]}
-            edges[(q1, q2)] = sort_dict(edge_costs)[0]
+    # for each pair of connected subgraphs, keep the inter-subgraph edge with
+    # the minimum total cost of its end nodes
+    for key in edges:
+        edge_costs = {e: costs[e[0]]+costs[e[1]] for e in edges[key]}
+        edges[key] = sort_dict(edge_costs)[0]
 
     return subgraphs, edges
 
@@ -164,8 +187,6 @@ def partition_graph(G, parts):
                      in G
     '''
 
-    N = len(parts)  # number of partitions
-
     # get partition subgraphs
     subgraphs = {}
     for node in parts:
@@ -176,18 +197,23 @@ def partition_graph(G, parts):
             raise KeyError('Invalid indices given: {0}'.format(conflicts))
         subgraphs[node] = subgraph
 
-    # get list of edges between each subgraph
+    # get list of edges between each pair of connected subgraphs, walking
+    # the neighbours of each qbit once. Edges are in order of the positions
+    # of their end points in parts[n1] then parts[n2]
+    index = model_index(parts)
     edges = {}
-    nodes = sorted(parts.keys())
-    for i1 in xrange(N-1):
-        n1 = nodes[i1]
-        for i2 in xrange(i1+1, N):
-            n2 = nodes[i2]
-            edges[(n1, n2)] = []
-            for u, v in list(itertools.product(parts[n1], parts[n2])):
-                edge = sorted([u, v])
-                if G.has_edge(*edge):
-                    edges[(n1, n2)].append(edge)
+    for n1 in parts:
+        for k1, u in enumerate(parts[n1]):
+            for v in G[u]:
+                if v not in index:
+                    continue
+                n2, k2 = index[v]
+                if n1 < n2:
+                    edges.setdefault((n1, n2), []).append(
+                        (k1, k2, sorted([u, v])))
+
+    for key in edges:
+        edges[key] = [edge for k1, k2, edge in sorted(edges[key])]
 
     return subgraphs, edges
 
@@ -199,8 +225,6 @@ def convert_to_parameters(h, J, subgraphs, edges, J_inner):
     assert len(h) == len(subgraphs),\
         'Mismatch between problem nodes and subgraphs'
 
-    N = len(h)
-
     hq = {}     # h parameter for each qubit used: keys are integers
     Jq = {}     # J parameter for each coupler: key format (u, v) with u < v
 
@@ -217,14 +241,10 @@ def convert_to_parameters(h, J, subgraphs, edges, J_inner):
             Jq[(q1, q2)] = J_inner/scale
 
     # handle inter-subgraph parameters
-    nodes = sorted(subgraphs.keys())
-    for i in xrange(N-1):
-        n1 = nodes[i]
-        for j in xrange(i+1, N):
-            n2 = nodes[j]
-            if n2 in J[n1]:
-                for q1, q2 in edges[(n1, n2)]:
-                    Jq[(q1, q2)] = J[n1][n2]*1./len(edges[(n1, n2)])/scale
+    for n1, n2 in edges:
+        if n2 in J[n1]:
+            for q1, q2 in edges[(n1, n2)]:
+                Jq[(q1, q2)] = J[n1][n2]*1./len(edges[(n1, n2)])/scale
 
     return hq, Jq
 
@@ -257,8 +277,8 @@ def assign_parameters(h, J, qbits, chimera, flip_J=False, J_inner=-1):
 #        print('Flipping signs of J coefficients')
         J = {n1: {n2: -J[n1][n2] for n2 in J[n1]} for n1 in J}
 
-    # build chimera graph
-    G_chimera = nx.Graph(chimera)
+    # chimera graph
+    G_chimera = chimera_graph(chimera)
 
     # get subgraphs and edge lists for problem node qbit lists
     try:
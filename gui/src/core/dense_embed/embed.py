@@ -11,50 +11,25 @@
 from __future__ import division
 
 from bisect import bisect
+from heapq import heappush, heappop
 from random import random, shuffle
+from time import time
 from copy import copy as cp
 import numpy as np
 import sys
 import os   # for avoiding file overwriting
 import re
+import json
 import itertools
 
 import routing as Routing
+from graph import qubit_index, graph_from_edges
+from tracing import Tracer
 
 
 #######################################################################
 ### GLOBALS ###
 
-# default Chimera parameters
-M = 8   # number of tile rows
-N = 8	  # number of tile columns
-L = 4	  # number of qubits per half tile
-
-
-### working variables
-
-# source variables
-_numAdj = {}        # number of unplaced adjacent cells, source keyed
-_numAdj2 = {}       # number of cells at a 2-distance
-_source = {}        # adjacency list for cell connectivity
-
-# target variables
-_qubits = {}        # source keyed dict of each cell's qubit
-_cells = {}         # 4-tup keyed dict of each qbits' cell
-_qbit_paths = {}    # 4-tup keyed dict of paths containing each qbit
-_qbitAdj = {}       # 4-tup keyed dict of adjacent qbit lists
-_vacancy = []       # number of free columns/rows of tiles [L,R,D,U]
-_tile_occ = {}      # number of used qbits in each tile row/column, 4-tup keyed
-_reserved = {}      # 4-tup keyed dict of reserved qbit lists
-
-# flags
-_cell_flags = {}    # source keyed flag dict for each cell
-_qbit_flags = {}    # 4-tup keyed flag dict for each qubit
-_reserved = {}      # source keyed dict of sets of reserved adjacent qubits
-
-_paths = {}	     # source keyed dict of all paths in the embedding
-
-
 ### handles
 
 FIRST_PROB_POW = 4          # power for firstCell probabilistic method
@@ -72,9 +47,31 @@ SEAM_PATH_COST = 40      # cost for breaking a path
 SEAM_EXT_COST = 0       # cost for each extended connection
 SEAM_DIST_COST = 30      # cost for the distance between the seam and av. qbit
 
+SEARCH_TYPE = 'Dijkstra'    # multi-source search method: Dijkstra or Astar
+
 MAX_SEARCH_COUNT = 3    # maximum number of additional times to run the
                         # multisource search algorithm before failure asserted
 
+# wire path shortening
+WIRE_SEARCH = 'DP'      # wire lengthening method: DP, or DFS for the
+                        # recursive lengthen
+WIRE_CORRIDOR = 2       # max number of tiles the DP corridor extends beyond
+                        # the shortest path of the wire
+WIRE_SLACK = 3          # max number of qubits a lengthened path may exceed
+                        # the wire length by
+WIRE_BACKTRACK = 50     # backtracking steps per path qubit allowed when
+                        # extracting a simple path from the DP states
+
+PRECHECK = True     # reject provably infeasible embeddings before placement
+
+# cost profiles: named sets of the constants in PROFILE_PARAMS and
+# routing.PROFILE_PARAMS, stored as json files in PROFILE_DIR
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           'profiles')
+PROFILE_PARAMS = ['IN_TILE_COST', 'OUT_TILE_COST', 'EDGE_REP_COST',
+                  'SEAM_QBIT_COST', 'SEAM_PATH_COST', 'SEAM_EXT_COST',
+                  'SEAM_DIST_COST', 'FIRST_PROB_POW']
+
 VERBOSE = False
 WRITE = True
 
@@ -87,2045 +84,2824 @@ PORT_PATH = '../bin/temp/port'
 
 #######################################################################
 #######################################################################
-## LOGGING
-
-LOGGING = False
-LOG_PATH = '../bin/logs/log'
-_fp_log = None
-
-
-# checked
-def writeSol(fp):
-    '''write the solution to the given file pointer'''
-
-    global _qubits, _paths, M, N, L, _qbitAdj, _qbit_flags
-
-#    nq = len(_qubits)
-#    npq = len(filter(None, _qubits.values()))
-
-    # header
-    fp.write('<header>\n')
-    fp.write('M = %d\n' % M)
-    fp.write('N = %d\n' % N)
-    fp.write('L = %d\n' % L)
-    fp.write('</header>\n\n')
-
-    # disabled qubit list
-    qbs = itertools.product(range(M), range(N), [0, 1], range(L))
-    dis_qbits = [qb for qb in qbs if not _qbitAdj[qb]]
-
-    fp.write('<dis_qbits>\n')
-    for qb in dis_qbits:
-        fp.write('%s\n' % str(qb))
-    fp.write('</dis_qbits>\n')
-
-    # write qbit assignments
-    fp.write('\n\n<qubits>\n')
-    for cell in sorted(_qubits):
-        fp.write('%s : %s\n' % (str(cell), str(_qubits[cell])))
-    fp.write('</qubits>\n')
-
-    # write paths
-    fp.write('\n\n<paths>\n')
-    for ends in sorted(_paths):
-        path = _paths[ends]
-        fp.write('%s : %s\n' % ('; '.join(map(str, ends)),
-                                '; '.join(map(str, path))))
-    fp.write('</paths>')
-
-    num_qbits = 0
-    for qbit in _qbit_flags:
-        if _qbit_flags[qbit]['taken']:
-            num_qbits += 1
-
-    print 'Used %d qubits...' % num_qbits
-
-
-# checked
-def portSol(ext=None):
-    '''write the current solution to file: open and close file so update is
-    immediate'''
-
-    log('\n\n'+'*'*40 + '\n')
-    log('Porting solution for analysis...\n')
-
-    try:
-        fname = PORT_PATH
-        if not ext is None:
-            fname += str(ext)
-        fp = open(fname, 'w')
-    except IOError:
-        print('Failed to open port file... likely invalid directory path')
-        return None
-
-    writeSol(fp)
-    fp.close()
-
-    log('\nComplete...\n')
-    log('*'*40 + '\n')
-
-
-# checked
-def initLog():
-    '''Initialise log file'''
-    global _fp_log
-
-    if LOGGING:
-        _fp_log = open(LOG_PATH, 'w')
-
-
-# checked
-def killLog():
-    '''Close log file'''
-    global _fp_log
-
-    if LOGGING:
-        _fp_log.close()
-
-
-# checked
-def log(txt):
-    '''Log if LOGGING flag'''
-    global _fp_log
-
-    if LOGGING:
-        if VERBOSE:
-            print txt,
-        _fp_log.write(txt)
-
-
-# checked
-def logSol(cell_map, paths):
-    '''Log and print formatted solution'''
-    global _qbit_flags
-
-    if LOGGING:
-        log('\n\n'+'*'*30+'\n\n')
-
-        log('Cell Mapping:\n\n')
-        for cell in cell_map:
-            log('%s: %s\n' % (str(cell), str(cell_map[cell])))
-
-        log('\n\nPaths:\n\n')
-        for key in paths:
-            c1, c2 = key
-            path = paths[key]
-            log('%s <> %s : \t %s\n' % (str(c1), str(c2), str(path)))
-
-        # number of qubits used
-        nq = 0
-        for key in _qbit_flags:
-            if _qbit_flags[key]['taken']:
-                nq += 1
-        log('Number of qubit: %d' % nq)
-
-
-# checked
-def formatSol():
-    '''Format the solution for ease of interpretation
+## TRACING
 
-    output: paths (dict)    : (cell,cell) keyed dictionary of qubit paths
-            cell_map (dict) : cell keyed dictionary of assigned qubits
-    '''
-
-    global _paths, _qubits, _cells
-
-    # generate inverse cell map
-    cell_map = cp(_qubits)
-
-    # generate formatted paths dictionary
-    paths = {}
-    for key in _paths:
-        path = _paths[key]
-        if _qubits[key[0]] != path[0]:
-            path = path[::-1]
-        paths[key] = path
-
-    return cell_map, paths
+TRACING = False         # record structured trace events of each embedding
+TRACE_SIZE = 10000      # number of most recent trace events kept
+TRACE_PATH = '../bin/logs/trace'    # JSON-lines trace dump on failure
 
 
 #######################################################################
 #######################################################################
-### FORMATTING and CONVERSION ###
-
+### EXCEPTIONS ###
 
-# checked, complete
-def indexToLinear(tup, index0=False):
-    ''' convert a 4-tuple index to a linear qubit index. Tuple format
-    tup=(row,col,horiz?,index) with row,col,index starting from the
-    bottom left tile/qubit.
-    '''
-
-    global M, N, L
-
-    qpr = 2*N*L     # qbits per row
-    qpt = 2*L       # qbits per tile
 
-    return (0 if index0 else 1) + qpr*tup[0]+qpt*tup[1]+L*tup[2]+tup[3]
-
-
-# checked, complete
-def indexToTuple(index, index0=False):
-    ''' converts a linear qubit index to a 4-tuple index. '''
+class EmbedTimeout(KeyError):
+    '''Raised when the time budget of an embedding runs out. The progress
+    dict holds the number of placed cells, the number of cells and the
+    elapsed time'''
 
-    global M, N, L
-
-    qpr = 2*N*L     # qbits per row
-    qpt = 2*L       # qbits per tile
-
-    if not index0:
-        index -= 1
-
-    row, rem = divmod(index, qpr)
-    col, rem = divmod(rem, qpt)
-    horiz, ind = divmod(rem, L)
-
-    return (row, col, horiz, ind)
+    def __init__(self, progress):
+        KeyError.__init__(self, 'Time budget exceeded: %d of %d cells placed'
+                          % (progress['placed'], progress['cells']))
+        self.progress = progress
 
 
 #######################################################################
 #######################################################################
-### INITIALIZATION METHODS ###
-
-# checked, possibly include pro-processing for wire attraction
-def initialize(source):
-    '''Initialise embedding solver'''
+### EMBEDDER STATE ###
+
+
+class EmbedderState:
+    '''Working state and methods of the Dense Placement algorithm. Each
+    instance holds its own target graph and router, so independent
+    embeddings can run in the same process and a target graph can be kept
+    between embeddings'''
+
+    def __init__(self, M=8, N=8, L=4):
+        '''Initialise an embedder for an M x N Chimera graph with L qubits per
+        half tile. The target graph must be set before embedding'''
+
+        # Chimera parameters
+        self.M = M      # number of tile rows
+        self.N = N      # number of tile columns
+        self.L = L      # number of qubits per half tile
+
+        # tunable cost constants of this embedder, see setProfile
+        self._consts = {key: globals()[key] for key in PROFILE_PARAMS}
+
+        ### working variables
+
+        # source variables
+        self._numAdj = {}       # number of unplaced adjacent cells per cell
+        self._numAdj2 = {}      # number of cells at a 2-distance
+        self._source = {}       # adjacency list for cell connectivity
+
+        # target variables, qbits are linear indices into _graph
+        self._graph = None      # ChimeraGraph of the target
+        self._router = Routing.Router()     # qubit chain router
+        self._qubits = {}       # source keyed dict of each cell's qubit
+        self._cells = []        # qbit indexed list of each qbits' cell
+        self._qbit_paths = []   # qbit indexed list of sets of paths per qbit
+        self._qbitCost = []     # qbit indexed list of (qbit, step cost) lists
+        self._vacancy = []      # free columns/rows of tiles [L,R,D,U]
+        self._tile_occ = {}     # number of used qbits in each tile row/column
+        self._reserved = []     # qbit indexed list of sets of reserved qubits
+
+        # flags
+        self._cell_flags = {}   # source keyed flag dict for each cell
+        self._is_taken = None   # qbit flag array: qubit is used for routing
+        self._is_reserved = None    # qbit flag array: qubit is reserved
+        self._is_assigned = None    # qbit flag array: qubit is assigned
+        self._prox = []         # qbit indexed sets of adjacent assigned qbits
+        self._c_in = []         # qbit indexed sets of free internal neighbours
+        self._c_out = None      # qbit array: # of free external neighbours
+        self._free = []         # qbit indexed flags: not taken or reserved
+        self._num_free = []     # qbit indexed number of free neighbours
+        self._occ_dirty = True  # tile row/column emptied or filled
+
+        # search buffers, entries are only valid if stamped with the epoch of
+        # the current search so they are never cleared
+        self._epoch = 0         # last issued search epoch
+        self._search_bufs = []  # slot list of (seen, done, cost, heur) lists
+        self._visit_stamp = []  # qbit indexed epoch of the visit counts
+        self._visit_count = []  # qbit indexed multi-source visit counts
+
+        self._paths = {}        # source keyed dict of all embedding paths
+
+        self._trace = Tracer()  # ring buffer of trace events
+        self._stats = {}        # phase timings and counters of the last
+                                # embedding, see initStats
+        self._start = None      # start time of the current embedding
+        self._deadline = None   # time at which the embedding gives up
+
+        self.initStats()
+
+    # checked
+    def writeSol(self, fp):
+        '''write the solution to the given file pointer'''
+
+        tups = self._graph.tuples
+
+    #    nq = len(_qubits)
+    #    npq = len(filter(None, _qubits.values()))
+
+        # header
+        fp.write('<header>\n')
+        fp.write('M = %d\n' % self.M)
+        fp.write('N = %d\n' % self.N)
+        fp.write('L = %d\n' % self.L)
+        fp.write('</header>\n\n')
+
+        # disabled qubit list
+        dis_qbits = [tups[qb] for qb in np.nonzero(self._graph.degree == 0)[0]]
+
+        fp.write('<dis_qbits>\n')
+        for qb in dis_qbits:
+            fp.write('%s\n' % str(qb))
+        fp.write('</dis_qbits>\n')
+
+        # write qbit assignments
+        fp.write('\n\n<qubits>\n')
+        for cell in sorted(self._qubits):
+            fp.write('%s : %s\n' % (str(cell), str(tups[self._qubits[cell]])))
+        fp.write('</qubits>\n')
+
+        # write paths
+        fp.write('\n\n<paths>\n')
+        for ends in sorted(self._paths):
+            path = self._paths[ends]
+            fp.write('%s : %s\n' % ('; '.join(map(str, ends)),
+                                    '; '.join(str(tups[qb]) for qb in path)))
+        fp.write('</paths>')
+
+        num_qbits = np.count_nonzero(self._is_taken)
+
+        print 'Used %d qubits...' % num_qbits
+
+    # checked
+    def portSol(self, ext=None):
+        '''write the current solution to file: open and close file so update is
+        immediate'''
 
-    global _source, M, N, L
-
-    initLog()
-
-    log('Starting embedding\n\n')
-
-    log('Target Conditions:\n')
-    log('M:%d\t N:%d\t L:%d\n\n' % (M, N, L))
-
-    _source = source
-
-    # set trial dependent parameters
-    reset()
-
-    log('\n\n')
-
-
-# checked
-def reset():
-    '''Reset all trial specific parameters'''
+        try:
+            fname = PORT_PATH
+            if not ext is None:
+                fname += str(ext)
+            fp = open(fname, 'w')
+        except IOError:
+            print('Failed to open port file... likely invalid directory path')
+            return None
 
-    global _numAdj, _numAdj2, _qbitAdj, _tile_occ, _source
-    global _reserved, _cells, _qubits, _qbit_paths, _paths, _vacancy
+        self.writeSol(fp)
+        fp.close()
+
+        self._trace.event('port', fname=fname)
+
+    # checked
+    def initTrace(self):
+        '''Reset the trace buffer for a new embedding'''
+
+        if TRACING:
+            if self._trace.size != TRACE_SIZE:
+                self._trace = Tracer(size=TRACE_SIZE)
+            self._trace.clear()
+        self._trace.enabled = TRACING
+        self._trace.verbose = VERBOSE
+
+    # checked
+    def dumpTrace(self, fname=None):
+        '''Write the buffered trace events to file as JSON-lines. Defaults to
+        TRACE_PATH'''
+
+        if fname is None:
+            fname = TRACE_PATH
+        return self._trace.dump(fname)
+
+    # checked
+    def initStats(self):
+        '''Reset the phase timings and counters, including those of the
+        router. Phase times are exclusive: time spent re-placing cells
+        displaced by a seam is counted under search and route rather than
+        open'''
+
+        self._stats = {
+            'time': {'search': 0.,  # multi-source search
+                     'route': 0.,   # negotiated congestion routing
+                     'seam': 0.,    # finding and ranking seams to open
+                     'open': 0.,    # opening seams, excluding re-placement
+                     'shorten': 0.,     # wire path shortening
+                     'total': 0.},
+            'searches': 0,      # number of multi-source searches
+            'cands': 0,         # candidate qubits tried
+            'retries': 0,       # searches repeated after all candidates failed
+            'seams': 0,         # number of seams opened
+            'route_calls': 0,   # number of routing calls
+            'repaired': 0,      # number of cells re-placed by a repair
+            'timeouts': 0}      # number of embeddings out of time
+        self._router.initStats()
+
+    # checked
+    def getProfile(self):
+        '''Cost profile of the constants used by this embedder and its router.
+        A profile is a dict of the embed and routing constant values, with an
+        optional info dict describing its origin'''
+
+        return {'embed': dict(self._consts),
+                'routing': self._router.getProfile()}
+
+    # checked
+    def setProfile(self, profile):
+        '''Set the constants of a cost profile for this embedder and its
+        router only, see getProfile. Constants missing from the profile are
+        unchanged'''
+
+        checkProfile(profile)
+        self._consts.update(profile.get('embed', {}))
+        self._router.setProfile(profile.get('routing', {}))
+
+    # checked
+    def getStats(self):
+        '''Return the phase timings and counters of the last embedding,
+        including the routing iterations and rip-ups'''
+
+        stats = cp(self._stats)
+        stats['time'] = cp(self._stats['time'])
+        stats.update(self._router.getStats())
+        return stats
+
+    # checked
+    def setBudget(self, budget=None):
+        '''Set the time budget in seconds of the embedding starting now, None
+        for no limit. The router gives up at the same deadline'''
+
+        self._start = time()
+        self._deadline = None if budget is None else self._start+budget
+        self._router.deadline = self._deadline
+
+    # checked
+    def checkDeadline(self):
+        '''Raise EmbedTimeout with the partial progress once the time budget
+        has run out'''
+
+        if self._deadline is None or time() < self._deadline:
+            return
+
+        progress = {'placed': sum(flags['placed'] for flags in
+                                  self._cell_flags.itervalues()),
+                    'cells': len(self._source),
+                    'elapsed': time()-self._start}
+        self._stats['timeouts'] += 1
+        self._trace.event('timeout', **progress)
+        raise EmbedTimeout(progress)
+
+    # checked
+    def formatSol(self):
+        '''Format the solution for ease of interpretation
+
+        output: paths (dict)    : (cell,cell) keyed dictionary of 4-tup qubit
+                                  paths
+                cell_map (dict) : cell keyed dict of assigned 4-tup qubits
+        '''
+
+        tups = self._graph.tuples
+
+        # generate inverse cell map
+        cell_map = {cell: tups[self._qubits[cell]] for cell in self._qubits}
+
+        # generate formatted paths dictionary
+        paths = {}
+        for key in self._paths:
+            path = self._paths[key]
+            if self._qubits[key[0]] != path[0]:
+                path = path[::-1]
+            paths[key] = [tups[qb] for qb in path]
+
+        return cell_map, paths
+
+    #######################################################################
+    #######################################################################
+    ### FORMATTING and CONVERSION ###
+
+    # checked, complete
+    def indexToLinear(self, tup, index0=False):
+        ''' convert a 4-tuple index to a linear qubit index. Tuple format
+        tup=(row,col,horiz?,index) with row,col,index starting from the
+        bottom left tile/qubit.
+        '''
+
+        qpr = 2*self.N*self.L     # qbits per row
+        qpt = 2*self.L       # qbits per tile
+
+        return (0 if index0 else 1) + \
+            qpr*tup[0] + qpt*tup[1] + self.L*tup[2] + tup[3]
+
+    # checked, complete
+    def indexToTuple(self, index, index0=False):
+        ''' converts a linear qubit index to a 4-tuple index. '''
 
-    log('Generating numAdj...')
-    # generate numAdj from source
-    _numAdj = {key: len(_source[key]) for key in _source}
-    log('complete\n')
+        qpr = 2*self.N*self.L     # qbits per row
+        qpt = 2*self.L       # qbits per tile
 
-    log('Generating numAdj2...')
-    # generate numAdj2
-    _numAdj2 = {}   # sum of numAdj over each cell adjacent to key
-    for key in _source:
-        _numAdj2[key] = sum([_numAdj[adj] for adj in _source[key]])
-    log('complete\n')
+        if not index0:
+            index -= 1
 
-    # initialise flags and reserved dictionaries
-    initFlags()
+        row, rem = divmod(index, qpr)
+        col, rem = divmod(rem, qpt)
+        horiz, ind = divmod(rem, self.L)
 
-    log('Initializing routing algorithm')
-    # configure routing algorithm
-    Routing.initialize(_qbitAdj)
+        return (row, col, horiz, ind)
+
+    #######################################################################
+    #######################################################################
+    ### INITIALIZATION METHODS ###
+
+    # checked, possibly include pro-processing for wire attraction
+    def initialize(self, source):
+        '''Initialise embedding solver'''
+
+        self.initTrace()
+        self._trace.event('start', M=self.M, N=self.N, L=self.L,
+                          cells=len(source))
+
+        self._source = source
+        self.initStats()
+
+        # set trial dependent parameters
+        self.reset()
 
-    # initialise _tile_occ
-    _tile_occ = {}
-    _tile_occ['r'] = [0 for _ in xrange(M)]
-    _tile_occ['c'] = [0 for _ in xrange(N)]
+    # checked
+    def reset(self):
+        '''Reset all trial specific parameters'''
 
-    # set _vacancy... need to have placed a cell first so set to -1
-    _vacancy = [-1, -1, -1, -1]
+        # generate numAdj from source
+        self._numAdj = {key: len(self._source[key]) for key in self._source}
+
+        # generate numAdj2
+        self._numAdj2 = {}   # sum of numAdj over each cell adjacent to key
+        for key in self._source:
+            self._numAdj2[key] = sum([self._numAdj[adj]
+                                      for adj in self._source[key]])
 
-    _reserved, _cells, _qbit_paths, _paths, _qubits = {}, {}, {}, {}, {}
+        # initialise flags and reserved dictionaries
+        self.initFlags()
 
-    # _reserved sets
-    for key in _qbitAdj:
-        _reserved[key] = set()
-        _cells[key] = None
-        _qbit_paths[key] = set()
+        # pre-compute search step costs
+        self.setQbitCost()
+
+        # configure routing algorithm
+        self._router.initialize(self._graph)
 
-    for key in _source:
-        _qubits[key] = None
+        # initialise _tile_occ
+        self._tile_occ = {}
+        self._tile_occ['r'] = [0 for _ in xrange(self.M)]
+        self._tile_occ['c'] = [0 for _ in xrange(self.N)]
 
-    _paths = {}
+        # set _vacancy... need to have placed a cell first so set to -1
+        self._vacancy = [-1, -1, -1, -1]
+        self._occ_dirty = True
 
-# checked, complete
-def setChimera(chimera_adj, m, n, l):
-    '''
-    updates the Chimera graph size.
+        # qbit indexed sets and cells
+        self._reserved = [set() for _ in xrange(self._graph.size)]
+        self._qbit_paths = [set() for _ in xrange(self._graph.size)]
+        self._cells = [None]*self._graph.size
 
-    inputs: m (int) : number of tile rows
-            n (int) : number of tile columns
-            l (int) : number of horizontal or vertical qubits per tile
+        self._qubits = {}
+        for key in self._source:
+            self._qubits[key] = None
 
-    outputs: none
-    '''
+        self._paths = {}
 
-    global _qbitAdj, M, N, L
-    
-    M, N, L = m, n, l
+    # checked, complete
+    def setChimera(self, chimera_adj, m, n, l):
+        '''
+        updates the Chimera graph size.
 
-    _qbitAdj = chimera_adj
-    
-    # sort each keyed list
-    for key in _qbitAdj:
-        _qbitAdj[key].sort()
+        inputs: m (int) : number of tile rows
+                n (int) : number of tile columns
+                l (int) : number of horizontal or vertical qubits per tile
 
+        outputs: none
+        '''
 
-# checked
-def initFlags():
-    '''Initialise *_flags and reserved dicts'''
-    global _numAdj, _qbitAdj, _cell_flags, _qbit_flags
+        self.M, self.N, self.L = m, n, l
 
-    log('Setting flags...')
+        # qubits missing from chimera_adj are treated as disabled
+        index = qubit_index(self.M, self.N, self.L)
+        edges = np.fromiter((index[q] for q1 in chimera_adj
+                             for q in chimera_adj[q1] for q in [q1, q]),
+                            dtype=int)
 
-    # initialise cell_flags
+        self._graph = graph_from_edges(self.M, self.N, self.L, edges)
 
-    for key in _numAdj:
-        d = {}
-        d['placed'] = False     # cell has assigned qubit
-        _cell_flags[key] = d
+    # checked, complete
+    def setQbitCost(self):
+        '''Compute the multi-source search cost of each step in the chimera
+        graph. Costs only depend on the target graph so are computed once per
+        embedding'''
 
-    # initialise qbit_flags
-    for key in _qbitAdj:
-        d = {}
-        d['taken'] = False      # qubit is used for routing
-        d['reserved'] = False   # qubit is reserved for adjacency
-        d['assigned'] = False   # qubit is assigned to cell
-        d['prox'] = set()       # qubit adjacent to assigned qbit
-        d['c_in'] = set()       # set of free adjacent internal qubits
-        d['c_out'] = 0          # number of free adjacent external qubits
-        _qbit_flags[key] = d
+        in_cost = self._consts['IN_TILE_COST']
+        out_cost = self._consts['OUT_TILE_COST']
 
-    log('complete\n')
+        # edge repulsion for each qubit
+        rep = self._consts['EDGE_REP_COST'] * \
+            np.maximum(np.abs(self._graph.row-.5*(self.M-1)),
+                       np.abs(self._graph.col-.5*(self.N-1)))
+        rep = rep.tolist()
+        tile = self._graph.tile
 
+        self._qbitCost = []
+        for qbit in xrange(self._graph.size):
+            steps = []
+            for qb in self._graph.adj[qbit]:
+                if tile[qb] == tile[qbit]:
+                    dcost = in_cost
+                else:
+                    dcost = out_cost
+                dcost += rep[qb]
+                steps.append((qb, dcost))
+            self._qbitCost.append(steps)
+
+    # checked
+    def initFlags(self):
+        '''Initialise *_flags and reserved dicts'''
+
+        # initialise cell_flags
+
+        for key in self._numAdj:
+            d = {}
+            d['placed'] = False     # cell has assigned qubit
+            self._cell_flags[key] = d
+
+        # initialise qbit flags
+        n = self._graph.size
+        self._is_taken = np.zeros(n, dtype=bool)
+        self._is_reserved = np.zeros(n, dtype=bool)
+        self._is_assigned = np.zeros(n, dtype=bool)
+        self._prox = [set() for _ in xrange(n)]
+        self._c_in = [set() for _ in xrange(n)]
+        self._c_out = np.zeros(n, dtype=int)
+        self._free = [True]*n
+        self._num_free = self._graph.degree.tolist()
+
+        # search buffers, per source slot buffers are allocated on first use
+        self._epoch = 0
+        self._search_bufs = []
+        self._visit_stamp = [0]*n
+        self._visit_count = [0]*n
+
+    # checked, complete
+    def setTileOcc(self, qbits, dec=False):
+        '''
+        '''
+
+        row, col = self._graph.row, self._graph.col
+        occ_r, occ_c = self._tile_occ['r'], self._tile_occ['c']
+        step, edge = (-1, 0) if dec else (1, 1)
+        for qbit in qbits:
+            r, c = row[qbit], col[qbit]
+            occ_r[r] += step
+            occ_c[c] += step
+            # vacancy only changes when a tile row or column empties or fills
+            if occ_r[r] == edge or occ_c[c] == edge:
+                self._occ_dirty = True
+
+    # checked, complete
+    def updateFree(self, qbits):
+        '''Refresh the free flags of the given qbits after a change of their
+        taken or reserved flags, and the free neighbour counts of their
+        neighbours'''
+
+        free, num_free = self._free, self._num_free
+        for qbit in qbits:
+            flag = not (self._is_taken[qbit] or self._is_reserved[qbit])
+            if flag != free[qbit]:
+                free[qbit] = flag
+                step = 1 if flag else -1
+                for qb in self._graph.adj[qbit]:
+                    num_free[qb] += step
+
+    # checked, complete
+    def setVacancy(self):
+        '''update and set _vacancy, only rescans the tile occupancy if a tile
+        row or column has emptied or filled since the last update'''
+
+        if not self._occ_dirty:
+            return
+
+        # compute left/right vacancy
+        occupied = map(lambda x: x > 0, self._tile_occ['c'])
+        left = occupied.index(True)
+        right = occupied[::-1].index(True)
+
+        # compute bottom/top vacancy
+        occupied = map(lambda x: x > 0, self._tile_occ['r'])
+        bot = occupied.index(True)
+        top = occupied[::-1].index(True)
+
+        self._vacancy = [left, right, bot, top]
+        self._occ_dirty = False
+
+    # checked, complete
+    def firstCell(self, M1=False):
+        '''returns the first cell to be placed'''
+
+        if len(self._numAdj.keys()) == 1:
+            self._trace.event('first_cell', cell=0)
+            return 0
+
+        # create adjacency worths for each cell
+        worth = {key: (self._numAdj[key], self._numAdj2[key])
+                 for key in self._numAdj}
+        # sort by decreasing worth
+        order = sorted(self._numAdj.keys(), key=lambda x: worth[x])[::-1]
+
+        ### method 1: max adj
+
+        if M1:
+            # determine how many cells have the maximum worth
+            num_max = worth.values().count(worth[order[0]])
+            # randomly select one of these cells
+            i = int(random()*num_max)
+            cell = order[i]
+
+        ### method 2: fully probabilistic
+        # probability is ~ numAdj**POW for some power
 
-# checked, complete
-def setTileOcc(qbits, dec=False):
-    '''
-    '''
-    global _tile_occ
-
-    for qbit in qbits:
-        if dec:
-            _tile_occ['r'][qbit[0]] -= 1
-            _tile_occ['c'][qbit[1]] -= 1
         else:
-            _tile_occ['r'][qbit[0]] += 1
-            _tile_occ['c'][qbit[1]] += 1
-
-
-# checked, complete
-def setVacancy():
-    '''update and set _vacancy'''
-
-    global _tile_occ, _vacancy
-
-    # compute left/right vacancy
-    occupied = map(lambda x: x > 0, _tile_occ['c'])
-    left = occupied.index(True)
-    right = occupied[::-1].index(True)
-
-    # compute bottom/top vacancy
-    occupied = map(lambda x: x > 0, _tile_occ['r'])
-    bot = occupied.index(True)
-    top = occupied[::-1].index(True)
-
-    _vacancy = [left, right, bot, top]
-
-
-# checked, complete
-def firstCell(M1=False):
-    '''returns the first cell to be placed'''
-    global _numAdj, _numAdj2
-
-    log('Selecting first cell\n')
-
-    if len(_numAdj.keys()) == 1:
-        log('\tselected cell 0\n\n')
-        return 0
-
-    # create adjacency worths for each cell
-    worth = {key: (_numAdj[key], _numAdj2[key]) for key in _numAdj}
-    # sort by decreasing worth
-    order = sorted(_numAdj.keys(), key=lambda x: worth[x])[::-1]
-
-    ### method 1: max adj
-
-    if M1:
-        log('\trunning method 1: max adjacency...')
-        # determine how many cells have the maximum worth
-        num_max = worth.values().count(worth[order[0]])
-        # randomly select one of these cells
-        i = int(random()*num_max)
-        cell = order[i]
-        log('done\n')
-
-    ### method 2: fully probabilistic
-    # probability is ~ numAdj**POW for some power
-
-    else:
-        log('\trunning method 2: probabilistic...')
-        # give a probability score for each cell
-        probs = {key: pow(worth[key][0], FIRST_PROB_POW) for key in worth}
-        # normalise and compute comparison values
-        total_prob = sum(probs.values())
-        comps = [0]
-        for key in order:
-            probs[key] /= total_prob
-            comps.append(comps[-1]+probs[key])
-        # randomly select starting key
-        i = max(bisect(comps, random()), 1)
-
-        cell = order[i-1]
-        log('done\n')
-
-    log('\tselected cell %d\n\n' % cell)
-    return cell
-
-
-# checked, complete
-def firstQubit(cell, M1=False):
-    '''Selects the qubit corresponding to the first cell'''
-    global _qbitAdj, _numAdj
-
-    log('Selecting first Qubit\n')
-    qb = None
-    adj = _numAdj[cell]
-
-    ### method 1: middle cell
-
-    if M1:
-        log('\trunning method 1: middle tile... ')
-        # select candidate tile(s)
-        n, m = [N//2], [M//2]
-        if N % 2 == 0:
-            n.append(N//2-1)
-        if M % 2 == 0:
-            m.append(M//2-1)
-        tiles = [(_n, _m) for _n in n for _m in m]
-
-        # shuffle tiles
-        shuffle(tiles)
-
-        for tile in tiles:
-            r, c = tile
-            # try to find suitable qubit
-            order = [(h, i) for h in xrange(2) for i in xrange(L)]
-            shuffle(order)
-            for h, i in order:
-                qbit = (r, c, h, i)
-                if len(_qbitAdj[qbit]) >= adj:
-                    qb = qbit
-                    break
-            else:
-                continue
-            break
-
-        log('done\n')
-
-    ### method 2: Gaussian dist
-
-    else:
-        log('\trunning method 2: gaussian dist... ')
+            # give a probability score for each cell
+            power = self._consts['FIRST_PROB_POW']
+            probs = {key: pow(worth[key][0], power) for key in worth}
+            # normalise and compute comparison values
+            total_prob = sum(probs.values())
+            comps = [0]
+            for key in order:
+                probs[key] /= total_prob
+                comps.append(comps[-1]+probs[key])
+            # randomly select starting key
+            i = max(bisect(comps, random()), 1)
+
+            cell = order[i-1]
+
+        self._trace.event('first_cell', cell=cell)
+        return cell
+
+    # checked, complete
+    def firstQubit(self, cell, M1=False):
+        '''Selects the qubit corresponding to the first cell'''
+
+        qb = None
+        adj = self._numAdj[cell]
+
+        ### method 1: middle cell
+
+        if M1:
+            # select candidate tile(s)
+            n, m = [self.N//2], [self.M//2]
+            if self.N % 2 == 0:
+                n.append(self.N//2-1)
+            if self.M % 2 == 0:
+                m.append(self.M//2-1)
+            tiles = [(_n, _m) for _n in n for _m in m]
+
+            # shuffle tiles
+            shuffle(tiles)
+
+            for tile in tiles:
+                r, c = tile
+                # try to find suitable qubit
+                order = [(h, i) for h in xrange(2) for i in xrange(self.L)]
+                shuffle(order)
+                for h, i in order:
+                    qbit = self._graph.qbit((r, c, h, i))
+                    if self._graph.degree[qbit] >= adj:
+                        qb = qbit
+                        break
+                else:
+                    continue
+                break
 
-        if N % 2:   # if odd rows
-            Y = np.arange(-(N//2), N//2+1)
-        else:
-            Y = .5+np.arange(-(N//2), N//2)
+        ### method 2: Gaussian dist
 
-        if M % 2:   # if odd rows
-            X = np.arange(-(M//2), M//2+1)
         else:
-            X = .5+np.arange(-(M//2), M//2)
-
-        # generate probabilities
-        CDF = []
-        for ax in [X, Y]:
-            Z = np.exp(-ax*ax/(2*FIRST_QBIT_SIG))
-            Z /= np.sum(Z)
-            cdf = [0.]
-            for z in Z:
-                cdf.append(cdf[-1]+z)
-            CDF.append(cdf)
-
-        # attempt to find qubit
-        attempt = 0
-        while attempt < FIRST_QBIT_ATTEMPTS:
-            attempt += 1
-            # pick tile
-            r = max(bisect(CDF[0], random()), 1)-1
-            c = max(bisect(CDF[1], random()), 1)-1
-            # pick qubit
-            order = [(h, i) for h in xrange(2) for i in xrange(L)]
-            shuffle(order)
-            for h, i in order:
-                qbit = (r, c, h, i)
-                if len(_qbitAdj[qbit]) >= adj:
-                    qb = qbit
-                    break
+            if self.N % 2:   # if odd rows
+                Y = np.arange(-(self.N//2), self.N//2+1)
             else:
-                continue
-            break
+                Y = .5+np.arange(-(self.N//2), self.N//2)
 
-        log('done\n')
+            if self.M % 2:   # if odd rows
+                X = np.arange(-(self.M//2), self.M//2+1)
+            else:
+                X = .5+np.arange(-(self.M//2), self.M//2)
+
+            # generate probabilities
+            CDF = []
+            for ax in [X, Y]:
+                Z = np.exp(-ax*ax/(2*FIRST_QBIT_SIG))
+                Z /= np.sum(Z)
+                cdf = [0.]
+                for z in Z:
+                    cdf.append(cdf[-1]+z)
+                CDF.append(cdf)
+
+            # attempt to find qubit
+            attempt = 0
+            while attempt < FIRST_QBIT_ATTEMPTS:
+                attempt += 1
+                # pick tile
+                r = max(bisect(CDF[0], random()), 1)-1
+                c = max(bisect(CDF[1], random()), 1)-1
+                # pick qubit
+                order = [(h, i) for h in xrange(2) for i in xrange(self.L)]
+                shuffle(order)
+                for h, i in order:
+                    qbit = self._graph.qbit((r, c, h, i))
+                    if self._graph.degree[qbit] >= adj:
+                        qb = qbit
+                        break
+                else:
+                    continue
+                break
 
-    if qb is None:
-        log('\n***Failed to identify a suitable qubit')
-        return None
+        self._trace.event('first_qubit', cell=cell, qbit=qb)
+        return qb
+
+    #######################################################################
+    #######################################################################
+    ### UPDATE METHODS ###
+
+    # checked
+    def assignQubit(self, cell, qbit):
+        '''Assign a qubit to QCA cell'''
+
+        # decrement numAdj for each edjacent cell
+        for adj in self._source[cell]:
+            self._numAdj[adj] -= 1
+
+        # set _qubits and _cells
+        self._qubits[cell] = qbit
+        self._cells[qbit] = cell
+
+        # update tile_occ and vacancy
+        if not self._is_reserved[qbit]:
+            self.setTileOcc([qbit])
+            self.setVacancy()
+
+        # update flags
+        self._cell_flags[cell]['placed'] = True
+
+        self._is_taken[qbit] = True
+        self._is_assigned[qbit] = True
+        self.updateFree([qbit])
+
+        # make adjacent qubits aware of place cell (for reserved check)
+        for qb in self._graph.adj[qbit]:
+            self._prox[qb].add(qbit)
+
+        self._router.disableQubits([qbit])
+
+    # unchecked
+    def assignPaths(self, paths, check=True):
+        '''Flag and assign routed paths. If check==True, also check qubit
+        reservations for nearby qubits'''
+
+        reserve_check = set()
+
+        for path in paths:
+            # get end points as key
+            key = tuple(map(lambda x: self._cells[x], [path[0], path[-1]]))
+            for qbit in path:
+                # take qbit
+                self._is_taken[qbit] = True
+                self._qbit_paths[qbit].add(key)
+                # if qbit is prox, flag for later reserved check
+                if self._prox[qbit]:
+                    reserve_check.update(self._prox[qbit])
+            self.updateFree(path)
+            # update tile_occ
+            self.setTileOcc(path[1:-1])
+            self._router.disableQubits(path[1:-1])
+            self._paths[key] = path
+
+        if not check:
+            return
+
+        # update vacancy
+        self.setVacancy()
+
+        # check for reservations
+        try:
+            self.reserveQubits(sorted(reserve_check))
+        except KeyError:
+            raise KeyError('Qubit reservation failed during path assignment')
 
-    log('\tselected qbit: %s\n\n' % (str(qb)))
-    return qb
+    # unchecked
+    def reserveQubits(self, qbits):
+        '''for each qbit in qbits, check if adjacent qubits should be
+        reserved. Reserve if appropriate.
+        '''
 
+        if not qbits:
+            return
 
-#######################################################################
-#######################################################################
-### UPDATE METHODS ###
+        #log('\n\nReserving locals qbits for: %s\n' % map(str, qbits))
 
+        for qbit in qbits:
+            #log('\nchecking qbit %s\n' % str(qbit))
+            # cell properties
+            cell = self._cells[qbit]
+            if cell is None:
+                raise KeyError('Qbit %s is not assigned to a cell...'
+                               % str(self._graph.tuples[qbit]))
+            num_adj = self._numAdj[cell]
+
+            #log('Required adjacency: %d\n' % num_adj)
+
+            # wipe old reservations
+            old_res = set()
+            if self._reserved[qbit]:
+                #log('releasing qbits: %s: \n' % map(str, _reserved[qbit]))
+                for qb in self._reserved[qbit]:
+                    self._is_reserved[qb] = False
+                self.setTileOcc(self._reserved[qbit], dec=True)
+                old_res = cp(self._reserved[qbit])
+                self._reserved[qbit].clear()
+                self.updateFree(old_res)
+
+            # get list of all adjacent unreserved qubits and count qbit type
+            qbs = []
+            tile = self._graph.tile[qbit]
+            self._c_in[qbit] = set()
+            self._c_out[qbit] = 0
+            for q in self._graph.adj[qbit]:
+                if self._free[q]:
+                    qbs.append(q)
+                    if self._graph.tile[q] == tile:
+                        self._c_in[qbit].add(q)
+                    else:
+                        self._c_out[qbit] += 1
+
+            # if exact amount of adjacent qubits available, reserve
+            if num_adj == len(qbs):
+                # log('Reserving all free qbits for qbit %s\n' % str(qbit))
+                # reserve all adjacent qubits
+                res_check = set()
+                for qb in qbs:
+                    self._is_reserved[qb] = True
+                    self._reserved[qbit].add(qb)
+                    res_check.update(self._prox[qb])
+                self.updateFree(qbs)
+                self.setTileOcc(qbs)
+                # if reserved qubits changed, check local reservations
+                if old_res == self._reserved[qbit]:
+                    self.reserveQubits(sorted(res_check-set(qbits)))
+
+            # check for insufficient qubits
+            elif num_adj > len(qbs):
+                raise KeyError('Insufficent free qubits for cell %s'
+                               % str(cell))
+
+        self.setVacancy()
+
+    # unchecked
+    def forgetQubit(self, qbit, check=True):
+        ''' release a given qubit. Returns a list of all connected paths which
+        should be forgotten before continuing with the embedding
+        '''
+
+        cell = self._cells[qbit]
+        if cell is None:
+            raise KeyError('Qbit has not been assigned to any cell')
+
+        qbs = set([qbit])    # set of qbits to decrement from _tile_occ
+
+        self._cells[qbit] = None
+        self._qubits[cell] = None
+
+        # update flags
+        self._cell_flags[cell]['placed'] = False
+
+        self._is_assigned[qbit] = False
+        self._is_taken[qbit] = False
+
+        # refresh source parameters
+        for adj in self._source[cell]:
+            self._numAdj[adj] += 1
+
+        # clear reserved list
+        for qb in self._reserved[qbit]:
+            self._is_reserved[qb] = False
+        qbs.update(self._reserved[qbit])
+        self._reserved[qbit].clear()
+        self.updateFree(qbs)
+
+        # get list of paths connected to qbit
+        paths = cp(self._qbit_paths[qbit])
+        self._qbit_paths[qbit].clear()
+
+        # update _tile_occ
+        self.setTileOcc(qbs, dec=True)
+
+        if check:
+            self.setVacancy()
+
+        for qb in self._graph.adj[qbit]:
+            self._prox[qb].remove(qbit)
+
+        self._router.enableQubits([qbit])
 
-# checked
-def assignQubit(cell, qbit):
-    '''Assign a qubit to QCA cell'''
+        return paths
 
-    global _numAdj, _source, _qubits, _cells
-    global _cell_flags, _qbit_flags, _qbitAdj
+    # unchecked
+    def forgetPath(self, key, check=True):
+        '''Free up qubits of the path with the given key and update appropriate
+        flags. If check==True, also check qubit reservations for nearby qubits.
+        '''
+
+        reserve_check = set()
+        path = cp(self._paths[key])
+        self._paths.pop(key)
+
+        if key in self._qbit_paths[path[0]]:
+            self._qbit_paths[path[0]].remove(key)
+        if key in self._qbit_paths[path[-1]]:
+            self._qbit_paths[path[-1]].remove(key)
+
+        for qbit in path[1:-1]:
+            self._is_taken[qbit] = False
+            self._qbit_paths[qbit].clear()
+            if self._prox[qbit]:
+                reserve_check.update(self._prox[qbit])
+        self.updateFree(path[1:-1])
+        self._router.enableQubits(path[1:-1])
+        self.setTileOcc(path[1:-1], dec=True)
+        if check:
+            self.reserveQubits(sorted(reserve_check))
+            self.setVacancy()
+
+    # unchecked
+    def forgetCell(self, cell):
+        '''Release the qubit of a placed cell and all of its paths. Qubit
+        reservations and vacancy are not updated'''
+
+        for key in self.forgetQubit(self._qubits[cell], check=False):
+            if key in self._paths:
+                self.forgetPath(key, check=False)
+
+    #######################################################################
+    #######################################################################
+    ### MULTI-SOURCE SEARCH ###
+
+    # checked, complete
+    def searchBuffer(self, slot):
+        '''Issue a new search epoch and return it with the (seen, done, cost,
+        heur) buffers of the given source slot. Entries stamped with an older
+        epoch are stale, so the buffers are reset in O(1)'''
+
+        while len(self._search_bufs) <= slot:
+            n = self._graph.size
+            self._search_bufs.append(([0]*n, [0]*n, [0]*n, [0]*n))
+
+        self._epoch += 1
+        return (self._epoch,) + self._search_bufs[slot]
+
+    # checked, complete
+    def ownReserved(self, src):
+        '''Reserved qbits of the source which are free for its own search'''
+
+        return set(qb for qb in self._reserved[src] if not self._is_taken[qb])
+
+    # checked, modify cost scheme if necessary
+    def extend_Dijkstra(self, src, avail, slot=0):
+        '''Generator for Dijkstra search extension over the qbits flagged in
+        the avail list, using the search buffers of the given slot'''
+
+        BIG_VAL = 2*self._graph.size     # large value for initial node cost
+
+        epoch, seen, done, costs = self.searchBuffer(slot)[:4]
+        own = self.ownReserved(src)
+
+        # initialise
+        seen[src], costs[src] = epoch, 0
+        heap = [(0, src)]       # frontier priority queue, lazy deletion
+
+        # tree growth loop
+        while heap:
+
+            # pick lowest cost qbit, ties go to the lowest qbit index
+            cost, qbit = heappop(heap)
+            if done[qbit] == epoch or cost != costs[qbit]:
+                continue
+            yield qbit
 
-    # decrement numAdj for each edjacent cell
-    for adj in _source[cell]:
-        _numAdj[adj] -= 1
+            # mark as visited
+            done[qbit] = epoch
 
-    # set _qubits and _cells
-    _qubits[cell] = qbit
-    _cells[qbit] = cell
+            # update costs of all unvisited adjacent nodes
+            for qb, dcost in self._qbitCost[qbit]:
+                if done[qb] == epoch or not (avail[qb] or qb in own):
+                    continue
+                new = cost+dcost
+                if new < (costs[qb] if seen[qb] == epoch else BIG_VAL):
+                    seen[qb], costs[qb] = epoch, new
+                    heappush(heap, (new, qb))
+
+    # checked, complete
+    def meetingTile(self, srcs):
+        '''Estimate the tile at which the search trees of the given sources
+        should meet: the tile nearest the mean source tile'''
+
+        n = max(len(srcs), 1)
+        r = sum(self._graph.row[src] for src in srcs)*1./n
+        c = sum(self._graph.col[src] for src in srcs)*1./n
+
+        return (int(round(r)), int(round(c)))
+
+    # checked, complete
+    def tileHeuristic(self, qbit, tile):
+        '''Admissible and consistent lower bound on the search cost from qbit
+        to any qubit in the given tile. Each tile step costs at least
+        OUT_TILE_COST plus the edge repulsion of the entered tile, which can be
+        at most EDGE_REP_COST smaller than that of the previously entered
+        tile'''
+
+        # tile distance
+        d = abs(self._graph.row[qbit]-tile[0]) + \
+            abs(self._graph.col[qbit]-tile[1])
+        if d == 0:
+            return 0
+
+        rep_cost = self._consts['EDGE_REP_COST']
+        rep = rep_cost*max(map(abs, [tile[0]-.5*(self.M-1),
+                                     tile[1]-.5*(self.N-1)]))
+
+        h = d*self._consts['OUT_TILE_COST']
+        for k in xrange(d):
+            if rep <= k*rep_cost:
+                break
+            h += rep - k*rep_cost
 
-    # update tile_occ and vacancy
-    if not _qbit_flags[qbit]['reserved']:
-        setTileOcc([qbit])
-        setVacancy()
+        return h
 
-    # update flags
-    _cell_flags[cell]['placed'] = True
+    # checked, complete
+    def extend_Astar(self, src, tile, avail, slot=0):
+        '''Generator for A* search extension towards the given meeting tile,
+        with the avail list and buffers as in extend_Dijkstra'''
 
-    _qbit_flags[qbit]['taken'] = True
-    _qbit_flags[qbit]['assigned'] = True
+        BIG_VAL = 2*self._graph.size     # large value for initial node cost
 
-    # make adjacent qubits aware of place cell (for reserved check)
-    for qb in _qbitAdj[qbit]:
-        _qbit_flags[qb]['prox'].add(qbit)
+        epoch, seen, done, costs, heurs = self.searchBuffer(slot)
+        own = self.ownReserved(src)
 
-    Routing.disableQubits([qbit])
+        # initialise
+        seen[src], costs[src] = epoch, 0
+        heurs[src] = self.tileHeuristic(src, tile)
+        heap = [(heurs[src], src)]  # frontier priority queue, lazy deletion
 
+        # tree growth loop
+        while heap:
 
-# unchecked
-def assignPaths(paths):
-    '''Flag and assign routed paths'''
+            # pick lowest estimated cost qbit, skip stale entries
+            est, qbit = heappop(heap)
+            if done[qbit] == epoch or est != costs[qbit]+heurs[qbit]:
+                continue
+            yield qbit
 
-    global _qbit_flags, _qbit_paths, _paths, _cells
+            # mark as visited
+            done[qbit] = epoch
 
-    reserve_check = set()
+            # update costs of all unvisited adjacent nodes
+            for qb, dcost in self._qbitCost[qbit]:
+                if done[qb] == epoch or not (avail[qb] or qb in own):
+                    continue
+                new = costs[qbit]+dcost
+                if seen[qb] != epoch:
+                    if new < BIG_VAL:
+                        seen[qb], costs[qb] = epoch, new
+                        heurs[qb] = self.tileHeuristic(qb, tile)
+                        heappush(heap, (new+heurs[qb], qb))
+                elif new < costs[qb]:
+                    costs[qb] = new
+                    heappush(heap, (new+heurs[qb], qb))
+
+    # checked, complete
+    def multiSourceSearch(self, srcs, adj, forb=set(), typ='Dijkstra'):
+        '''
+        Attempt to find the lowest cost suitable point with free paths to
+        the given sources
+        '''
+
+        # create path extension generator
+
+        if typ.upper() == 'DIJKSTRA':
+            extend_func = self.extend_Dijkstra
+        else:
+            tile = self.meetingTile(srcs)
+            extend_func = lambda src, avail, slot: \
+                self.extend_Astar(src, tile, avail, slot)
+
+        # maintained view of the free qbits, shared by all generators. The
+        # local reserved qbits of each source are only free for its own
+        # generator
+        avail = self._free
+
+        extend = {}
+        # initialise generator for each source in its own buffer slot
+        for slot, src in enumerate(srcs):
+            extend[src] = extend_func(src, avail, slot)
+            next(extend[src])   # burn src qbit and initialise
+
+        # visit counts for each qbit, stale if not stamped with this epoch
+        self._epoch += 1
+        epoch = self._epoch
+        stamp, visits = self._visit_stamp, self._visit_count
+
+        # search loop
+
+        while True:
+
+            cands = []  # candidate nodes
+
+            ## extend each source tree
+
+            for src in srcs:
+
+                # extend
+                try:
+                    node = next(extend[src])
+                except StopIteration:     # break if no more nodes to visit
+                    return None
+
+                # increment visited node count
+                if stamp[node] != epoch:
+                    stamp[node], visits[node] = epoch, 0
+                visits[node] += 1
+
+                # if node visited from all sources add as candidate
+                if visits[node] == len(srcs):
+                    if node in forb:
+                        continue
+                    cands.append(node)
+
+            ## check for suitable candidate
+
+            # sort by suitability
+            cands = sorted(map(lambda x: [self.suitability(x, srcs), x],
+                               cands))[::-1]
+
+            # filter out unsuitable qbits
+            cands = filter(lambda x: x[0] >= adj, cands)
+
+            # select qbit
+            if cands:
+                return cands    # return all candidate qbit
+
+    #######################################################################
+    #######################################################################
+    ### EMBEDDING SUB-ALGORITHMS ###
+
+    # checked
+    def checkFeasible(self, source):
+        '''Cheap necessary conditions for an embedding of the source graph in
+        the target graph. Each cell needs a qubit of at least its degree and
+        the Chimera graph is bipartite, so every triangle of cells needs at
+        least one path qubit. Edge-disjoint triangles need distinct path
+        qubits, which gives a lower bound on the number of qubits used.
+
+        output: feas (dict) : reasons (list) of proven infeasibility, empty
+                              if none found, min_qbits and free_qbits
+                              (int), the max cell and qubit degrees and
+                              whether the source is connected
+        '''
+
+        adj = {cell: set(source[cell]) for cell in source}
+        degree = self._graph.degree
+
+        # qubit and cell counts by degree
+        max_deg = max(len(adj[cell]) for cell in adj) if adj else 0
+        max_qdeg = int(degree.max()) if self._graph.size else 0
+        free = np.count_nonzero(degree)
+
+        # greedy edge-disjoint triangles
+        used = set()
+        num_tri = 0
+        for c1 in sorted(adj):
+            for c2 in sorted(c for c in adj[c1] if c > c1):
+                for c3 in sorted(c for c in adj[c2] & adj[c1] if c > c2):
+                    edges = [(c1, c2), (c2, c3), (c1, c3)]
+                    if not used.intersection(edges):
+                        used.update(edges)
+                        num_tri += 1
+
+        feas = {'reasons': [],
+                'min_qbits': len(adj)+num_tri,
+                'free_qbits': free,
+                'max_degree': max_deg,
+                'qbit_degree': max_qdeg,
+                'connected': True}
+        reasons = feas['reasons']
+
+        if max_deg > max_qdeg:
+            reasons.append('cells with more than %d neighbours: %d' % (
+                max_qdeg, sum(len(adj[cell]) > max_qdeg for cell in adj)))
+        else:
+            # degree 1 is covered by the qubit count
+            for k in xrange(2, max_deg+1):
+                num_cells = sum(len(adj[cell]) >= k for cell in adj)
+                num_qbits = np.count_nonzero(degree >= k)
+                if num_cells > num_qbits:
+                    reasons.append('%d cells of degree >= %d but only %d '
+                                   'such qubits' % (num_cells, k, num_qbits))
+                    break
 
-    for path in paths:
-        # get end points as key
-        key = tuple(map(lambda x: _cells[x], [path[0], path[-1]]))
-        for qbit in path:
-            # take qbit
-            _qbit_flags[qbit]['taken'] = True
-            _qbit_paths[qbit].add(key)
-            # if qbit is prox, flag for later reserved check
-            if _qbit_flags[qbit]['prox']:
-                reserve_check.update(_qbit_flags[qbit]['prox'])
-        # update tile_occ
-        setTileOcc(path[1:-1])
-        Routing.disableQubits(path[1:-1])
-        _paths[key] = path
+        if feas['min_qbits'] > free:
+            reasons.append('at least %d qubits needed but only %d free' % (
+                feas['min_qbits'], free))
+
+        # placement only grows from the first cell
+        if adj:
+            seen = set([min(adj)])
+            stack = [min(adj)]
+            while stack:
+                for c2 in adj[stack.pop()]:
+                    if not c2 in seen:
+                        seen.add(c2)
+                        stack.append(c2)
+            if len(seen) < len(adj):
+                feas['connected'] = False
+                reasons.append('source graph is disconnected')
+
+        return feas
+
+    # checked
+    def checkSol(self):
+        '''Check that embedding solution is valid'''
+
+        check = False
+
+        if not all(map(lambda x: not x is None, self._qubits.values())):
+            print self._paths
+            print self._qubits
+            raise KeyError('Not all cells were assigned a qubit')
+
+        for c1 in self._source:
+            for c2 in self._source[c1]:
+                if not ((c1, c2) in self._paths or (c2, c1) in self._paths):
+                    print('No path between %s and %s' % (str(c1), str(c2)))
+                    check = True
+        if check:
+            raise KeyError('Not all paths were placed')
+
+        # check all path connections are available, count non cell qbit uses
+        uses = np.zeros(self._graph.size, dtype=int)
+        for path in self._paths.values():
+            for i in xrange(len(path)-1):
+                q1, q2 = path[i: i+2]
+                if not q2 in self._graph.adj[q1]:
+                    print('No coupler available for %s to %s' %
+                          (str(self._graph.tuples[q1]),
+                           str(self._graph.tuples[q2])))
+                    check = True
+                if i > 0:
+                    uses[q1] += 1
+
+        if check:
+            raise KeyError('Not all couplers available')
+
+        for q in np.nonzero(uses > 1)[0]:
+            print('Qubit %s used in %d paths'
+                  % (str(self._graph.tuples[q]), uses[q]))
+
+        if np.any(uses > 1):
+            raise KeyError('Qubit shared among multiple paths')
+
+    # always changing... tentatively done
+    def suitability(self, qbit, srcs=[]):
+        '''Determine the effective number of free adjacent qubits. Effected by
+        the number of mutual free qubits for in-tile assigned qubits'''
+
+        adj = self._graph.adj[qbit]
+
+        # free adjacent qubits, adjacent end points always count as free
+        s = self._num_free[qbit] + sum(1 for qb in adj if qb in srcs)
+
+        # end points with a local reserved qubit adjacent to qbit
+        s += sum(1 for src in set(srcs)
+                 if not self._reserved[src].isdisjoint(adj))
+
+        # account for negotiating free qubits with other in-tile qubits
+        base = qbit - self._graph.index[qbit]
+        qbs = [base+l for l in xrange(self.L) if base+l != qbit]
+        qbs = filter(lambda x: self._is_assigned[x], qbs)
+        if not qbs:
+            return s
+
+        # free internal qbits
+        tile = self._graph.tile
+        c_in = set(qb for qb in adj
+                   if self._free[qb] and tile[qb] == tile[qbit])
+
+        for qb in qbs:
+            cell = self._cells[qb]
+            s -= max(0, self._numAdj[cell] - self._c_out[qb] -
+                     len(self._c_in[qb]-c_in))
+
+        return s
+
+    def placeCell(self, cell):
+        '''Attempt to find a suitable qbit to place input cell on.
+
+        inputs: cell(int)		: source index of cell to place
+
+        output: qbit(int)		: linear index of qbit to assign to cell
+                paths(list)		: list of paths from placed cell qubits to
+                                  qbit
+        '''
+
+        ### Initialise
+
+        seam_flag = False
+        qbit = None
+
+        # find qubits for placed adjacent cells
+        adj_qbits = [self._qubits[c] for c in self._source[cell]
+                     if self._cell_flags[c]['placed']]
+
+        # find required availability of target qbit
+        avb = len(self._source[cell])
+        self._trace.event('place', cell=cell, adj=adj_qbits, avb=avb)
+
+        # multisourcesearch parameters
+        forb = set()        # list of forbidden qbit for multisourcesearch
+        search_count = 0    # counter for number of failed searches
+
+        # every time a seam is opened, we should check to see if there is a
+        # better qubit to consider
+        while qbit is None:
+
+            self.checkDeadline()
+
+            ### Open Seam
+
+            if seam_flag:
+                seam_flag = False
+
+                # check for vacancies
+                if not any(self._vacancy):
+                    self._trace.event('seam_fail', cell=cell,
+                                      reason='no vacancy')
+                    raise KeyError('Out of room')
+
+                # find available seams
+                t = time()
+                seams = self.availableSeams(adj_qbits)
+
+                # score seams, only the selected seam is fully analysed
+                seam_costs = self.seamCosts(seams, adj_qbits)
+
+                if len(seam_costs) == 0:
+                    self._stats['time']['seam'] += time()-t
+                    self._trace.event('seam_fail', cell=cell,
+                                      reason='no seams')
+                    return None, []
+
+                # select seam to open
+                seam = self.selectSeam(seam_costs)
+                seam_dict = self.genSeamDict((seam['sm'], seam['dr']),
+                                             adj_qbits)
+                self._stats['time']['seam'] += time()-t
+                self._trace.event('seam', cell=cell, sm=seam_dict['sm'],
+                                  dr=seam_dict['dr'],
+                                  vacancy=tuple(self._vacancy))
+
+                # open seam, nested phase times are not counted as open
+                t, nested = time(), sum(self._stats['time'].values())
+                success = self.openSeam(**seam_dict)
+                self._stats['time']['open'] += time()-t - \
+                    (sum(self._stats['time'].values())-nested)
+
+                if not success:
+                    self._trace.event('seam_fail', cell=cell,
+                                      reason='open failed')
+                    return None, []
+                self._stats['seams'] += 1
+
+                # update adjacent qubits
+                adj_qbits = [self._qubits[c] for c in self._source[cell]
+                             if self._cell_flags[c]['placed']]
+                self._trace.event('seam_opened', cell=cell, adj=adj_qbits)
+
+            ### Pick qubit to assign
+
+            # run multisource search method, get list of candidate qbits
+            t = time()
+            qbits = self.multiSourceSearch(adj_qbits, avb, forb=forb,
+                                           typ=SEARCH_TYPE)
+            self._stats['time']['search'] += time()-t
+            self._stats['searches'] += 1
+
+            # check if found
+            self._trace.event('search', cell=cell, cands=qbits)
+            if not qbits:
+                self._stats['retries'] += 1
+                seam_flag = True
+                continue
 
-    # update vacancy
-    setVacancy()
+            # check each candidate qbit from multisourcesearch in order
+            for qbit in qbits:
 
-    # check for reservations
-    try:
-        reserveQubits(list(reserve_check))
-    except KeyError:
-        raise KeyError('Qubit reservation failed during path assignment')
+                suit, qbit = qbit
+                self._stats['cands'] += 1
 
+                ### Find paths
 
-# unchecked
-def reserveQubits(qbits):
-    '''for each qbit in qbits, check if adjacent qubits should be
-    reserved. Reserve if appropriate.
-    '''
-    global _cells, _numAdj, _qbit_flags, _reserved
+                routes = [[qb, qbit] for qb in adj_qbits]
+                end_points = list(set([it for rt in routes for it in rt]))
+                # find best consistent paths
+                t = time()
+                cost = self._router.route(routes, self._reserved,
+                                          writePath=ROUTE_PATH)
+                self._stats['time']['route'] += time()-t
+                self._stats['route_calls'] += 1
 
-    if not qbits:
-        return
+                # check successful routing
 
-    #log('\n\nReserving locals qbits for: %s\n' % map(str, qbits))
+                self._trace.event('route', cell=cell, qbit=qbit, cost=cost)
+                if cost >= Routing.COST_BREAK:
+                    # disable end points
+                    self._router.disableQubits(end_points)
+                    continue
 
-    for qbit in qbits:
-        #log('\nchecking qbit %s\n' % str(qbit))
-        # cell properties
-        try:
-            cell = _cells[qbit]
-            if cell is None:
-                raise KeyError
-        except KeyError:
-            raise KeyError('Qbit %s is not assigned to a cell...'
-                           % str(qbit))
-        num_adj = _numAdj[cell]
-
-        #log('Required adjacency: %d\n' % num_adj)
-
-        # wipe old reservations
-        old_res = set()
-        if _reserved[qbit]:
-            #log('releasing qbits: %s: \n' % map(str, _reserved[qbit]))
-            for qb in _reserved[qbit]:
-                _qbit_flags[qb]['reserved'] = False
-            setTileOcc(_reserved[qbit], dec=True)
-            old_res = cp(_reserved[qbit])
-            _reserved[qbit].clear()
-
-        # get list of all adjacent unreserved qubits and count qbit type
-        qbs = []
-        _qbit_flags[qbit]['c_in'] = set()
-        _qbit_flags[qbit]['c_out'] = 0
-        for q in _qbitAdj[qbit]:
-            if not (_qbit_flags[q]['taken'] or _qbit_flags[q]['reserved']):
-                qbs.append(q)
-                if q[0:2] == qbit[0:2]:
-                    _qbit_flags[qbit]['c_in'].add(q)
+                break
+            else:
+                qbit = None
+                search_count += 1
+                self._stats['retries'] += 1
+                if search_count >= MAX_SEARCH_COUNT:
+                    seam_flag = True
+                    search_count = 0
+                    forb.clear()
                 else:
-                    _qbit_flags[qbit]['c_out'] += 1
-
-        # if exact amount of adjacent qubits available, reserve
-        if num_adj == len(qbs):
-            # log('Reserving all free qbits for qbit %s\n' % str(qbit))
-            # reserve all adjacent qubits
-            res_check = set()
-            for qb in qbs:
-                _qbit_flags[qb]['reserved'] = True
-                _reserved[qbit].add(qb)
-                res_check.update(_qbit_flags[qb]['prox'])
-            setTileOcc(qbs)
-            # if reserved qubits changed, check local qubits for reservations
-            if old_res == _reserved[qbit]:
-                reserveQubits(res_check-set(qbits))
-
-        # check for insufficient qubits
-        elif num_adj > len(qbs):
-            raise KeyError('Insufficent free qubits for cell %s' % str(cell))
-
-    setVacancy()
-
-
-# unchecked
-def forgetQubit(qbit, check=True):
-    ''' release a given qubit. Returns a list of all connected paths which
-    should be forgotten before continuing with the embedding
-    '''
-
-    global _cells, _cell_flags, _numAdj, _source, _qubits
-    global _qbit_flags, _reserved, _qbit_paths, _qbitAdj
-
-    try:
-        cell = _cells[qbit]
-    except KeyError:
-        log('Qbit has not been assigned to any cell')
-        raise KeyError('Qbit has not been assigned to any cell')
-
-    qbs = set([qbit])    # set of qbits to decrement from _tile_occ
-
-    _cells[qbit] = None
-    _qubits[cell] = None
-
-    # update flags
-    _cell_flags[cell]['placed'] = False
+                    forb.update(map(lambda x: x[1], qbits))
 
-    _qbit_flags[qbit]['assigned'] = False
-    _qbit_flags[qbit]['taken'] = False
+        # get paths
+        paths = cp(self._router.getPaths().values())
 
-    # refresh source parameters
-    for adj in _source[cell]:
-        _numAdj[adj] += 1
+        # disable path qubits
+        qbs = list(set([it for path in paths for it in path]))
+        self._router.disableQubits(qbs)
 
-    # clear reserved list
-    for qb in _reserved[qbit]:
-        _qbit_flags[qb]['reserved'] = False
-    qbs.update(_reserved[qbit])
-    _reserved[qbit].clear()
+        self._trace.event('placed', cell=cell, qbit=qbit)
+    #    log('\n')
+        return qbit, paths
 
-    # get list of paths connected to qbit
-    paths = cp(_qbit_paths[qbit])
-    _qbit_paths[qbit].clear()
+    ### SEAM OPENING ###
 
-    # update _tile_occ
-    setTileOcc(qbs, dec=True)
+    ## seam format: seam= [(vert,ind),dir]
+    #	horz	-> flag for horizontal or vertical seam
+    # 	ind		-> index of seam from bottom-left
+    # 	dir		-> flag for opening direction; True opens away from b-l
 
-    if check:
-        setVacancy()
+    # unchecked
+    def availableSeams(self, qbits):
+        ''' returns a list of possible seams to split given a list of qbits.
+        Seams are candidates if they are next to one of the qubits and can
+        be'''
 
-    for qb in _qbitAdj[qbit]:
-        _qbit_flags[qb]['prox'].remove(qbit)
-
-    Routing.enableQubits([qbit])
-
-    return paths
+        seams = set()
 
+        for qbit in qbits:
+            r, c = int(self._graph.row[qbit]), int(self._graph.col[qbit])
 
-# unchecked
-def forgetPath(key, check=True):
-    '''Free up qubits of the path with the given key and update appropriate
-    flags. If check==True, also check qubit reservations for nearby qubits.
-    '''
-    global _paths, _qbit_flags, _qbit_paths
+            # left/right seams
 
-    reserve_check = set()
-    path = cp(_paths[key])
-    _paths.pop(key)
+            if self._vacancy[0] > 0 and c > self._vacancy[0]:     # open left
+                if c > 1:
+                    seams.add(((1, c), False))
+                seams.add(((1, c+1), False))
 
-    if key in _qbit_paths[path[0]]:
-        _qbit_paths[path[0]].remove(key)
-    if key in _qbit_paths[path[-1]]:
-        _qbit_paths[path[-1]].remove(key)
+            # open right
+            if self._vacancy[1] > 0 and c < ((self.N-1)-self._vacancy[1]):
+                seams.add(((1, c), True))
+                if c < (self.N-2):
+                    seams.add(((1, c+1), True))
 
-    for qbit in path[1:-1]:
-        _qbit_flags[qbit]['taken'] = False
-        _qbit_paths[qbit].clear()
-        if _qbit_flags[qbit]['prox']:
-            reserve_check.update(_qbit_flags[qbit]['prox'])
-    Routing.enableQubits(path[1:-1])
-    setTileOcc(path[1:-1], dec=True)
-    if check:
-        reserveQubits(reserve_check)
-        setVacancy()
+            # down/up seams
 
+            if self._vacancy[2] > 0 and r > self._vacancy[2]: 	# open down
+                if r > 1:
+                    seams.add(((0, r), False))
+                seams.add(((0, r+1), False))
 
-#######################################################################
-#######################################################################
-### MULTI-SOURCE SEARCH ###
+            # open up
+            if self._vacancy[3] > 0 and r < ((self.M-1)-self._vacancy[3]):
+                seams.add(((0, r), True))
+                if r < (self.M-2):
+                    seams.add(((0, r+1), True))
 
+        return seams
 
-# checked, modify cost scheme if necessary
-def extend_Dijkstra(src):
-    '''Generator for Dijkstra search extension'''
-    global _qbitAdj, _qbit_flags, M, N
+    def prepSeam(self, seam):
+        '''prepare parameters for seam opening'''
 
-    BIG_VAL = 2*len(_qbitAdj)   # large value for initial node cost
+        sm, dr = seam
 
-    # initialise
-    visited = {}
-    for qbit in _qbitAdj:
-        if _qbit_flags[qbit]['taken'] or _qbit_flags[qbit]['reserved']:
-            visited[qbit] = True
-        else:
-            visited[qbit] = False
-
-    costs = {qbit: BIG_VAL for qbit in _qbitAdj}
-    next_qb = set()
-    next_qb.add(src)
-    costs[src] = 0
+        # flags for qubits on the mobile side of seam
+        coord = [self._graph.row, self._graph.col][sm[0]]
+        if dr:  # increasing index
+            mobile = coord >= sm[1]
+        else:   # decreasing index
+            mobile = coord < sm[1]
+
+        # local functions
+
+        def check_qb(qb):
+            '''check if qb lies on the mobile side of seam'''
+            return bool(mobile[qb])
+
+        # list of qubits to be moved
+        qbits = np.nonzero(mobile & self._is_assigned)[0].tolist()
+
+        # dict of connectors to be 'moved' for each path
+        paths = {}
+        num_halfs = {}
+
+        for key in self._paths:
+            path = self._paths[key]
+            d = []
+            nf, nh, nn = 0, 0, 0
+            for i in xrange(1, len(path)):
+                connect = [path[i-1], path[i]]
+                n1, n2 = map(check_qb, connect)
+                if n1 and n2:       # completely on mobile side of seam
+                    d.append([connect, 'full'])
+                    nf += 1
+                elif n1 or n2:      # cut by seam
+                    d.append([connect, 'half', n1])
+                    nh += 1
+                else:               # not affected by seam
+                    d.append([connect, 'none'])
+                    nn += 1
+            if nf+nh > 0:
+                paths[key] = d
+                num_halfs[key] = nh
+
+        return qbits, paths, num_halfs
+
+    # unchecked
+    def genSeamDict(self, seam, adj_qbits):
+        '''generate a dict of seam opening parameters'''
+
+        ## local functions
+
+        sm, dr = seam
+        step = 1 if dr else -1
+
+        def target_qb(qb):
+            '''returns the target qubit for a given qubit under the specified
+            seam and direction, None if the target is not on the processor'''
+
+            return self._graph.linear(self._graph.shift(qb, sm[0], step))
+
+        qbits, paths, num_halfs = self.prepSeam(seam)
+        if len(qbits) + len(paths) == 0:
+            return None
 
-    # tree growth loop
-    while next_qb:
+        ## check for qbit conflicts
+        qbit_confs = []
+        for qb in qbits:
+            tg = target_qb(qb)
+            # conflict unless target qbit exists and is suitable, targets
+            # can be unsuitable on graphs with disabled qubits or couplers
+            if tg is None or \
+                    self._graph.degree[tg] < len(self._source[self._cells[qb]]):
+                qbit_confs.append(qb)
+
+        ## check for path conflicts
+        path_confs = set()
+        for key in paths:
+            full_conns = filter(lambda x: x[1] == 'full', paths[key])
+            for conn in map(lambda x: x[0], full_conns):
+                q1, q2 = map(target_qb, conn)
+                if q1 is None:
+                    raise KeyError(self._graph.shift(conn[0], sm[0], step))
+                if not q2 in self._graph.adj[q1]:
+                    path_confs.add(key)
+                    break
 
-        # pick lowest cost qbit and yield
-        qbit = sorted(next_qb, key=lambda x: costs[x])[0]
-        next_qb.remove(qbit)
-        yield qbit
+        # clean up qbits and connects
+        for qb in qbit_confs:
+            qbits.remove(qb)
+        for key in path_confs:
+            paths.pop(key)
 
-        # mark as visited
-        visited[qbit] = True
+        # give score based on nearest seam to mean qbit
+        mean_qbit = [sum(int(coord[qb]) for qb in adj_qbits)/len(adj_qbits)
+                     for coord in [self._graph.row, self._graph.col]]
 
-        # update costs of all unvisited adjacent nodes
-        for qb in _qbitAdj[qbit]:
-            if not visited[qb]:
-                # add cost increment
-                dcost = IN_TILE_COST if qb[0:2] == qbit[0:2] else OUT_TILE_COST
-                # include edge repulsion
-                dcost += EDGE_REP_COST*max(map(abs, [qb[0]-.5*(M-1),
-                                                     qb[1]-.5*(N-1)]))
-                costs[qb] = min(costs[qb], costs[qbit]+dcost)
-                next_qb.add(qb)
+        seam_dist = abs(mean_qbit[sm[0]]-sm[1]-.5)
 
+        ### compute cost
 
-# unchecked...implement later
-def extend_Astar():
-    '''
-    '''
+        # number of qbit and paths to repair
+        nq, np = map(len, [qbit_confs, path_confs])
+        # number of paths to extend
+        ne = 0
+        for key in paths:
+            ne += num_halfs[key]
+
+        c = self._consts
+        cost = nq*c['SEAM_QBIT_COST']+np*c['SEAM_PATH_COST'] + \
+            ne*c['SEAM_EXT_COST']
+        cost += seam_dist*c['SEAM_DIST_COST']
+
+        seam_dict = {'sm': sm,
+                     'dr': dr,
+                     'cost': cost,
+                     'qbits': qbits,
+                     'paths': paths,
+                     'qb_conf': qbit_confs,
+                     'pt_conf': path_confs,
+                     'tg_fn': target_qb,
+                     'par': [nq, np, ne, seam_dist]}
+
+        return seam_dict
+
+    # checked, complete
+    def seamCosts(self, seams, adj_qbits):
+        '''Opening costs of the given seams as computed by genSeamDict, from
+        one vectorised snapshot of the assigned qubits and path connectors.
+        Seams which genSeamDict skips are dropped. Returns a list of dicts of
+        the seam (sm, dr), cost and cost parameters (par) in seam order'''
+
+        n = self._graph.size
+        row, col = self._graph.row, self._graph.col
+
+        # sorted couplers as q1*n+q2 keys for adjacency checks
+        edges = np.repeat(np.arange(n), self._graph.degree)*n + \
+            self._graph.indices.astype(int)
+        edges.sort()
+
+        # assigned qubits and the degree required of their targets
+        qbits = np.nonzero(self._is_assigned)[0]
+        need = np.array([len(self._source[self._cells[qb]])
+                         for qb in qbits], dtype=int)
+
+        # path index and end qubits of every path connector
+        q1, q2, pid = [], [], []
+        for k, path in enumerate(self._paths.itervalues()):
+            q1 += path[:-1]
+            q2 += path[1:]
+            pid += [k]*(len(path)-1)
+        q1, q2, pid = [np.array(x, dtype=int) for x in [q1, q2, pid]]
+        num_paths = len(self._paths)
+
+        mean_qbit = [sum(int(coord[qb]) for qb in adj_qbits)/len(adj_qbits)
+                     for coord in [row, col]]
+
+        c = self._consts
+        targets = {}    # target qubit of every qubit for each (axis, step)
+        seam_costs = []
+        for seam in seams:
+            sm, dr = seam
+            step = 1 if dr else -1
+            coord = [row, col][sm[0]]
+
+            if not (sm[0], step) in targets:
+                stride = [self.N*2*self.L, 2*self.L][sm[0]]
+                target = np.arange(n) + step*stride
+                size = [self.M, self.N][sm[0]]
+                target[(coord+step < 0) | (coord+step >= size)] = -1
+                targets[(sm[0], step)] = target
+            target = targets[(sm[0], step)]
+
+            # flags for qubits on the mobile side of seam
+            mobile = coord >= sm[1] if dr else coord < sm[1]
+
+            # moved qubits and connectors
+            moved = mobile[qbits]
+            n1, n2 = mobile[q1], mobile[q2]
+            full, half = n1 & n2, n1 ^ n2
+            hit = np.zeros(num_paths, dtype=bool)
+            hit[pid[full | half]] = True
+            if not (moved.any() or hit.any()):
+                continue
 
-    pass
+            # full connectors moved off the processor are left to
+            # genSeamDict, which fails on them
+            t1, t2 = target[q1[full]], target[q2[full]]
+            if np.any(t1 < 0):
+                seam_dict = self.genSeamDict(seam, adj_qbits)
+                if seam_dict is not None:
+                    seam_costs.append({key: seam_dict[key] for key in
+                                       ['sm', 'dr', 'cost', 'par']})
+                continue
 
+            # qbit conflicts, see genSeamDict
+            tg = target[qbits[moved]]
+            good = tg >= 0
+            good[good] = self._graph.degree[tg[good]] >= need[moved][good]
+            nq = int(np.count_nonzero(~good))
 
-# checked, complete
-def multiSourceSearch(srcs, adj, forb=set(), typ='Dijkstra'):
-    '''
-    Attempt to find the lowest cost suitable point with free paths to
-    the given sources
-    '''
+            # path conflicts and connectors to extend on the kept paths
+            conn = (t2 >= 0) & np.in1d(t1*n+t2, edges)
+            conf = np.zeros(num_paths, dtype=bool)
+            conf[pid[full][~conn]] = True
+            npt = int(np.count_nonzero(conf))
+            ne = int(np.count_nonzero(half & ~conf[pid]))
 
-    global _qbitAdj, _reserved
+            seam_dist = abs(mean_qbit[sm[0]]-sm[1]-.5)
 
-    # create path extension generator
+            cost = nq*c['SEAM_QBIT_COST']+npt*c['SEAM_PATH_COST'] + \
+                ne*c['SEAM_EXT_COST']
+            cost += seam_dist*c['SEAM_DIST_COST']
 
-    if typ.upper() == 'DIJKSTRA':
-        extend_func = extend_Dijkstra
-    else:
-        extend_func = extend_Astar
+            seam_costs.append({'sm': sm, 'dr': dr, 'cost': cost,
+                               'par': [nq, npt, ne, seam_dist]})
 
-    extend = {}
-    # initialise generator for each source
-    for src in srcs:
-        # release local reserved qbits (only for current src)
-        for qb in _reserved[src]:
-            _qbit_flags[qb]['reserved'] = False
+        return seam_costs
 
-        # create generator
-        extend[src] = extend_func(src)
-        next(extend[src])   # burn src qbit and initialise
+    def moveQbit(self, qbit, tg_fn):
+        ''' Move a qubit under seam opening. Handles forgetting and
+        replacing the qubit'''
 
-        # reset local reserved abits (forbid for other srcs)
-        for qb in _reserved[src]:
-                _qbit_flags[qb]['reserved'] = True
+        old_qb, new_qb = qbit, tg_fn(qbit)
+        cell = self._cells[old_qb]
 
-    # set visit counts for each qbit
-    visits = {qbit: 0 for qbit in _qbitAdj}
+        self._trace.event('move_qbit', old=old_qb, new=new_qb)
+        # forget old qubit and flags,  old paths sohuld be handled elsewhere
+        self.forgetQubit(old_qb)
 
-    # search loop
+        # map to new qubit
+        self.assignQubit(cell, new_qb)
 
-    while True:
+    def newPath(self, key, path, tg_fn):
+        '''create new path'''
 
-        cands = []  # candidate nodes
+        new_path = []
+        # print path
+        for i in xrange(len(path)):
+            conn, typ = path[i][0:2]
+            new_conn = map(tg_fn, conn)
+            if typ == 'full':
+                if i == 0:
+                    new_path.append(new_conn[0])
+                new_path.append(new_conn[1])
+            elif typ == 'half':
+                if path[i][2]:
+                    if i == 0:
+                        new_path.append(new_conn[0])
+                    new_path.append(conn[0])
+                    new_path.append(conn[1])
+                else:
+                    if i == 0:
+                        new_path.append(conn[0])
+                    new_path.append(conn[1])
+                    new_path.append(new_conn[1])
+            elif typ == 'none':
+                if i == 0:
+                    new_path.append(conn[0])
+                new_path.append(conn[1])
+            else:
+                raise ValueError('Invalid coupler')
 
-        ## extend each source tree
+        return new_path
 
-        for src in srcs:
+    def movePath(self, key, path, tg_fn):
+        ''' Move a path under seam opening. Handles forgetting and replacing'''
 
-            # extend
-            try:
-                node = next(extend[src])
-            except StopIteration:     # break if no more nodes to visit
-                return None
+        self.forgetPath(key)
 
-            # increment visited node count
-            visits[node] += 1
+        new_path = []
+        self._trace.event('move_path', key=key)
+        # print path
+        for i in xrange(len(path)):
+            conn, typ = path[i][0:2]
+            new_conn = map(tg_fn, conn)
+            if typ == 'full':
+                if i == 0:
+                    new_path.append(new_conn[0])
+                new_path.append(new_conn[1])
+            elif typ == 'half':
+                if path[i][2]:
+                    if i == 0:
+                        new_path.append(new_conn[0])
+                    new_path.append(conn[0])
+                    new_path.append(conn[1])
+                else:
+                    if i == 0:
+                        new_path.append(conn[0])
+                    new_path.append(conn[1])
+                    new_path.append(new_conn[1])
+            elif typ == 'none':
+                if i == 0:
+                    new_path.append(conn[0])
+                new_path.append(conn[1])
+            else:
+                raise ValueError('Invalid coupler')
+        # print new_path
+        self.assignPaths([new_path])
+
+    # unchecked
+    def openSeam(self, sm, dr, cost, qbits, paths, qb_conf, pt_conf, tg_fn,
+                 par):
+        ''' recursively open seam'''
+
+        ## erase conflicts
+
+        # erase qbit conflicts and update broken paths
+        cell_conf = map(lambda x: self._cells[x], qb_conf)
+        for qb in qb_conf:
+            new_paths = self.forgetQubit(qb)
+            pt_conf.update(new_paths)
+            for pt in new_paths:
+                if pt in paths:
+                    paths.pop(pt)
+
+        if self._trace:
+            self._trace.event('seam_conflicts', qbits=list(qb_conf),
+                              paths=list(pt_conf))
+
+        # erase path conflicts
+        for path in pt_conf:
+            self.forgetPath(path)
+
+        # retain path keys between good qbits
+        pt_rp = []
+        for key in pt_conf:
+            if self._cell_flags[key[0]]['placed'] and \
+                    self._cell_flags[key[1]]['placed']:
+                pt_rp.append(key)
+
+        ## STORE OLD VALUES AND WIPE SEAM TARGET REGION
+
+        # map of new qbits for each cell
+        qbit_dict = {self._cells[qb]: tg_fn(qb) for qb in qbits}
+
+        # map of new paths
+        path_dict = {key: self.newPath(key, paths[key], tg_fn)
+                     for key in paths}
+
+        # wipe old qubits and paths
+        for qb in qbits:
+            self.forgetQubit(qb, False)
+        for key in paths:
+            self.forgetPath(key, False)
 
-            # if node visited from all sources add as candidate
-            if visits[node] == len(srcs):
-                if node in forb:
-                    continue
-                cands.append(node)
+        # assign new qubits and paths
+        for cell in qbit_dict:
+            self.assignQubit(cell, qbit_dict[cell])
 
-        ## check for suitable candidate
+        self.assignPaths(path_dict.values())
 
-        # sort by suitability
-        cands = sorted(map(lambda x: [suitability(x, srcs), x], cands))[::-1]
+        # update all reserved qubits
+        self.reserveQubits([qb for qb in self._qubits.values()
+                            if qb is not None])
 
-        # filter out unsuitable qbits
-        cands = filter(lambda x: x[0] >= adj, cands)
+        ## repair broken paths
 
-        # select qbit
-        if cands:
-            return cands    # return all candidate qbit
+        self.checkDeadline()
 
+        # only place paths between moved qubits
+        routes = []
+        for pt in pt_rp:
+            rt = map(lambda x: self._qubits[x], pt)
+            routes.append(rt)
+        t = time()
+        cost = self._router.route(routes, self._reserved,
+                                  writePath=ROUTE_PATH)
+        self._stats['time']['route'] += time()-t
+        self._stats['route_calls'] += 1
 
-#######################################################################
-#######################################################################
-### EMBEDDING SUB-ALGORITHMS ###
-
-# checked
-def checkSol():
-    '''Check that embedding solution is valid'''
-    global _qubits, _paths, _source, _qbitAdj
-
-    log('\n\nChecking Solution...\n\n')
-
-    check = False
-
-    if not all(map(lambda x: not x is None, _qubits.values())):
-        print _paths
-        print _qubits
-        raise KeyError('Not all cells were assigned a qubit')
-
-    for c1 in _source:
-        for c2 in _source[c1]:
-            if not ((c1, c2) in _paths or (c2, c1) in _paths):
-                print('No path between %s and %s' % (str(c1), str(c2)))
-                check = True
-    if check:
-        raise KeyError('Not all paths were placed')
-
-    # check all path connections are available and count uses of non cell qbits
-    uses = {q: 0 for q in _qbitAdj}
-    for path in _paths.values():
-        for i in xrange(len(path)-1):
-            q1, q2 = path[i: i+2]
-            if not q2 in _qbitAdj[q1]:
-                print('No coupler available for %s to %s' % (str(q1), str(q2)))
-                check = True
-            if i > 0:
-                uses[q1] += 1
+        # check successful routing
+        self._trace.event('seam_route', routes=routes, cost=cost)
+        if cost >= Routing.COST_BREAK:
+            raise KeyError('Routing failed for paths between moved qbits in \
+        seam opening... fix code later')
 
-    if check:
-        raise KeyError('Not all couplers available')
+        # get paths
+        fixed_paths = cp(self._router.getPaths().values())
 
-    for q in uses:
-        if uses[q] > 1:
-            print('Qubit %s used in %d paths' % (str(q), uses[q]))
+        # disable path qubits
+        qbs = list(set([it for path in fixed_paths for it in path]))
+        self._router.disableQubits(qbs)
 
-    if any(map(lambda x: x > 1, uses.values())):
-        raise KeyError('Qubit shared among multiple paths')
-
-
-# always changing... tentatively done
-def suitability(qbit, srcs=[]):
-    '''Determine the effective number of free adjacent qubits. Effected by the
-    number of mutual free qubits for in-tile assigned qubits'''
-    global _reserved, _qbit_flags, _numAdj, _cells, L
-
-    s = 0
-    res_flags = {src: 0 for src in srcs}
+        # assign paths and update reservations
+        self.assignPaths(fixed_paths)
 
-    c_in = set()
-    for qb in _qbitAdj[qbit]:
-        # check for special cases for end points
-        for src in srcs:
-            if qb in _reserved[src]:
-                res_flags[src] = 1
-        if qb in srcs:
-            s += 1
-        # general bulk condition
-        elif not (_qbit_flags[qb]['taken'] or _qbit_flags[qb]['reserved']):
-            s += 1
-            # note as free internal qbit if so
-            if qb[0:2] == qbit[0:2]:
-                c_in.add(qb)
+        ## repair qbit placements, should automatically deal with paths
 
-    # account for negotiating free qubits with other in-tile qubits
-    r, c, h, l0 = qbit
-    qbs = [(r, c, h, l) for l in xrange(L) if l != l0]
-    qbs = filter(lambda x: x in _cells and _qbit_flags[x]['assigned'], qbs)
+        # order qbits to be placed by decreasing adjacency
+        cell_ord = sorted(cell_conf, key=lambda x: -self._numAdj[x])
+        self._trace.event('seam_replace', cells=cell_ord)
 
-    for qb in qbs:
-        cell = _cells[qb]
-        s -= max(0, _numAdj[cell] - _qbit_flags[qb]['c_out'] -
-                 len(_qbit_flags[qb]['c_in']-c_in))
+        for cell in cell_ord:
+            new_qb, new_paths = self.placeCell(cell)     # recursive call
 
-    return s+sum(res_flags.values())
+            # abort on failed placement
+            if new_qb is None:
+                return False
+                raise KeyError('Failed cell %s placement in seam \
+            opening' % str(cell))
 
+            # assign qubit and paths
+            self.assignQubit(cell, new_qb)
+            self.assignPaths(new_paths)
 
-def placeCell(cell):
-    '''Attempt to find a suitable qbit to place input cell on.
+            # handle reservations
+            self.reserveQubits([new_qb])
 
-    inputs: cell(int)		: source index of cell to place
+        return True
 
-    output: qbit(tuple)		: 4-tup for qbit to assign to cell
-            paths(list)		: list of paths from placed cell qubits to
-                              qbit
-    '''
+    def selectSeam(self, seam_dicts):
+        '''select which seam to open based on minimum cost. If multiple
+        seams have the same cost randomly select one. Only the sm, dr, cost
+        and par keys of the seam dicts are used'''
 
-    global _qbitAdj, _source, _qubits
-    global _cell_flags, _qbit_flags, _reserved, _vacancy
+        seams = sorted(seam_dicts, key=lambda x: x['cost'])
 
-    log('\n'+'#'*30+'\n')
-    log('Placing cell: %s\n' % str(cell))
+        if self._trace:
+            self._trace.event('seam_cands', seams=[
+                (seam['sm'], seam['dr'], seam['cost'], seam['par'])
+                for seam in seams])
 
-    ### Initialise
+        cands = filter(lambda x: x['cost'] == seams[0]['cost'], seams)
 
-    seam_flag = False
-    qbit = None
-
-    # find qubits for placed adjacent cells
-    adj_qbits = [_qubits[c] for c in _source[cell] if _cell_flags[c]['placed']]
-    log('Adjacent qbits: %s\n' % str(adj_qbits))
-
-    # find required availability of target qbit
-    avb = len(_source[cell])
-    log('Required availability: %d\n' % avb)
-
-    # multisourcesearch parameters
-    forb = set()        # list of forbidden qbit for multisourcesearch
-    search_count = 0    # counter for number of failed searches
-
-    # every time a seam is opened, we should check to see if there is a
-    # better qubit to consider
-    while qbit is None:
-
-        ### Open Seam
+        return cands[int(random()*len(cands))]
 
-        if seam_flag:
-            log('Running Seam Opening Routine\n')
-            seam_flag = False
+    # NEW METHODS FOR WIRE SHORTENING
+    def shorten_wire_paths(self):
+        '''find the wires. Find a qbit path for each wire that most resemble's
+        the length of the wire path. To do this, find the shortest possible
+        path and lengthen the path until it is an appropriate length'''
 
-            # check for vacancies
-            if not any(_vacancy):
-                log('No vacant columns/rows to open\n\n')
-                raise KeyError('Out of room')
+        wires, nodes = self.get_wires()
+        wires = sorted(wires, key=lambda x: len(x))
 
-            # find available seams
-            seams = availableSeams(adj_qbits)
+        all_paths = dict(self._paths)
+        all_qbs = dict(self._qubits)
 
-            # analyse seams
-            seam_dicts = map(lambda s: genSeamDict(s, adj_qbits), seams)
-            seam_dicts = filter(None, seam_dicts)
+        pre_ex = sum(map(lambda x: len(x)-2, self._paths.values()))
 
-            if len(seam_dicts) == 0:
-                log('No suitable seams detected\n')
-                return None, []
+        print "There are %d cells, there are %d in qbit flags" %(len(self._cells), self._graph.size)
+        # clear qbit flags except the nodes (which do not move)
+        qb_nodes = []
+        for c in nodes:
+            qb_nodes.append(self._qubits[c])
+        self._is_taken[:] = False
+        self._is_taken[qb_nodes] = True
 
-            # select seam to open
-            seam_dict = selectSeam(seam_dicts)
-            log('current vacancy: %s\n' % str(_vacancy))
-            log('selected seam %s :: %s\n' % (str(seam_dict['sm']),
-                                              str(seam_dict['dr'])))
+        update = True
 
-            # open seam
-            success = openSeam(**seam_dict)
+        qb_wires = []
+        elongate = []
 
-            if not success:
-                log('Failed to open seam\n\n')
-                return None, []
+        for wire in wires:
 
-            # update adjacent qubits
-            log('Seam successfully opened... \n')
-            adj_qbits = [_qubits[c] for c in _source[cell]
-                         if _cell_flags[c]['placed']]
-            log('New adjacent qbits: %s\n' % str(adj_qbits))
+            # get the shortest path for the wire
+            qb_wire = self.get_wire_path(self._qubits[wire[0]],
+                                         self._qubits[wire[-1]], qb_nodes)
 
-        ### Pick qubit to assign
+            # set flags, add qb_wire to correct list
+            # qb_wires are for wires that are already the best length
+            # elongate are for wires that need to be lengthened
+            if qb_wire:
+                for qb in qb_wire:
+                    self._is_taken[qb] = True
 
-        # run multisource search method, get list of candidate qbits
-        qbits = multiSourceSearch(adj_qbits, avb, forb=forb)
+                if len(qb_wire) < len(wire):
+                    elongate.append((wire, qb_wire))
+                else:
+                    qb_wires.append((wire, qb_wire))
 
-        # check if found
-        if not qbits:
-            log('multiSourceSearch failed\n')
-            seam_flag = True
-            continue
+            else:
+                for qb in wire:
+                    if qb in nodes:
+                        continue
+                    self._is_taken[all_qbs[qb]] = False
+
+        # lengthen wires taht need lenthening
+        for w, qb_w in elongate:
+            if WIRE_SEARCH.upper() == 'DP':
+                qb_w = self.bounded_path(qb_w, len(w))
+            else:
+                qb_w = self.lengthen(qb_w, w, qb_nodes, 1)
+            if qb_w is None:
+                update = False
+            qb_wires.append((w, qb_w))
 
-        log('Found %d candidate qubits: %s \n'
-            % (len(qbits), map(lambda x: str(x[1]), qbits)))
+        # updatek paths and qbs
+        if update:
+            for w, qb_w in qb_wires:
+                self.update_mapping(qb_w, w, nodes, all_paths, all_qbs)
 
-        # check each candidate qbit from multisourcesearch in order
-        for qbit in qbits:
+        # ensure correct flags
+        used_qb = []
+        for path in all_paths.values():
+            used_qb.extend(path)
 
-            suit, qbit = qbit
+        is_used = np.zeros(self._graph.size, dtype=bool)
+        is_used[used_qb] = True
+        self._is_taken &= is_used
+
+        post_ex = sum(map(lambda x: len(x)-2, all_paths.values()))
+
+        # reject mappings which share a qubit, e.g. between a wire with no
+        # new path and the wires that took its released qubits
+        if update:
+            uses = np.bincount(all_qbs.values() + [qb for path in
+                               all_paths.values() for qb in path[1:-1]],
+                               minlength=self._graph.size)
+            update = not np.any(uses > 1)
+
+        # if improvements are found, save them
+        if post_ex < pre_ex and update:
+            self._paths = all_paths
+            self._qubits = all_qbs
+            return (pre_ex - post_ex)
+        # otherwise restore older correct mappings
+        else:
+            print "Removing long paths failed, using earlier embedding"
+            used_qb = []
+            for path in self._paths.values():
+                used_qb.extend(path)
+            self._is_taken[:] = False
+            self._is_taken[used_qb] = True
+            return 0
+
+    def get_wire_path(self, head, end_qb, nodes):
+        '''get the best qbit path for the qca circuit wire'''
+        visited = []
+        complete, paths = self.extend_path([head], end_qb, nodes, visited)
+        if complete:
+            return paths
+
+        # get new paths until one reaches the end (simple djikstra's)
+        while paths:
+            curr_path = paths.pop(0)
+            complete, new_paths = self.extend_path(curr_path, end_qb, nodes,
+                                                   visited)
+            if complete:
+                return new_paths
+
+            added = False
+            for i in xrange(len(paths)):
+                if new_paths and len(paths[i]) > len(new_paths[0]):
+                    added = True
+                    for p in new_paths:
+                        paths.insert(i, p)
+                    break
 
-            log('Trying qbit: %s with suitability %s ...'
-                % (str(qbit), str(suit)))
+            if not added:
+                for p in new_paths:
+                    paths.append(p)
+
+    def extend_path(self, curr_path, end_qb, nodes, visited):
+        '''given a current path, returns the a list of the possible next
+        paths'''
+
+        head = curr_path[-1]
+        paths = []
+        next_qbs = self._graph.adj[head]
+        arrived = False
+        # append the curr path with all possibilities
+        for qb in next_qbs:
+            if arrived:
+                if not self._is_taken[qb]:
+                    return (True, curr_path + [qb])
+            elif qb == end_qb:
+                if qb in nodes or not self._is_taken[qb]:
+                    return (True, curr_path + [qb])
+                else:
+                    arrived = True
+            elif not self._is_taken[qb] and \
+                qb not in curr_path and qb not in visited:
+                visited.append(qb)
+                paths.append(curr_path + [qb])
+
+        return (False, paths)
+
+    def bounded_path(self, qb_wire, length):
+        '''Replace the shortest qbit path of a wire by a free path between the
+        same end qbits with at least length qubits, as close to length as
+        possible. Dynamic programming over (qbit, steps) states finds the
+        qubits reachable from the head in each number of steps within a
+        corridor of tiles around the shortest path. A simple path is then
+        extracted backwards from the end with bounded backtracking. The
+        corridor is widened up to WIRE_CORRIDOR tiles. Returns None and
+        keeps the shortest path if no path is found'''
+
+        head, end = qb_wire[0], qb_wire[-1]
+        row, col = self._graph.row, self._graph.col
+        rows = [row[qb] for qb in qb_wire]
+        cols = [col[qb] for qb in qb_wire]
+
+        # release the shortest path, the end qbits stay taken
+        self._is_taken[qb_wire[1:-1]] = False
+
+        for margin in xrange(WIRE_CORRIDOR+1):
+
+            r0, r1 = min(rows)-margin, max(rows)+margin
+            c0, c1 = min(cols)-margin, max(cols)+margin
+
+            def free(qb):
+                '''check if qb is an available qbit in the corridor'''
+                return not self._is_taken[qb] and \
+                    r0 <= row[qb] <= r1 and c0 <= col[qb] <= c1
+
+            # qbits reachable from the head in each number of steps, the end
+            # may only be the last qbit of the path
+            reach = [set([head])]
+            for steps in xrange(1, length+WIRE_SLACK):
+                front = set()
+                for qbit in reach[-1]:
+                    if qbit == end:
+                        continue
+                    for qb in self._graph.adj[qbit]:
+                        if qb == end or free(qb):
+                            front.add(qb)
+                reach.append(front)
+
+            for steps in xrange(length-1, length+WIRE_SLACK):
+                if end in reach[steps]:
+                    path = self.extract_path(reach, steps, head, end)
+                    if path is not None:
+                        self._is_taken[path] = True
+                        return path
+
+        self._is_taken[qb_wire] = True
+        return None
 
-            ### Find paths
+    def extract_path(self, reach, steps, head, end):
+        '''Extract a simple qbit path with the given number of steps from
+        the head to the end, using the reachable qbit sets of bounded_path.
+        Backtracking is bounded by WIRE_BACKTRACK steps per path qubit.
+        Returns None if no simple path is found'''
 
-            routes = [[qb, qbit] for qb in adj_qbits]
-            end_points = list(set([it for rt in routes for it in rt]))
-            # find best consistent paths
-            cost = Routing.Routing(routes, _reserved, writePath=ROUTE_PATH)
+        def preds(qbit, k):
+            '''unused qbits adjacent to qbit reachable in k steps'''
+            return iter([qb for qb in self._graph.adj[qbit]
+                         if qb in reach[k] and not qb in used])
 
-            # check successful routing
+        path = [end]
+        used = set(path)
+        stack = [preds(end, steps-1)]
+        budget = WIRE_BACKTRACK*(steps+1)
 
-            if cost >= Routing.COST_BREAK:
-                log('routing failed...\n')
-                # disable end points
-                Routing.disableQubits(end_points)
+        while stack and budget > 0:
+            try:
+                qb = next(stack[-1])
+            except StopIteration:
+                stack.pop()
+                used.discard(path.pop())
+                continue
+            budget -= 1
+            if qb in used:
                 continue
+            k = steps-len(path)     # steps from the head to qb
+            path.append(qb)
+            used.add(qb)
+            if k == 0:
+                return path[::-1]
+            stack.append(preds(qb, k-1))
 
-            log('\t success\n')
-            break
-        else:
-            log('No suitable qbit found\n')
-            qbit = None
-            search_count += 1
-            if search_count >= MAX_SEARCH_COUNT:
-                seam_flag = True
-                search_count = 0
-                forb.clear()
-            else:
-                forb.update(map(lambda x: x[1], qbits))
+        return None
 
-    # get paths
-    paths = cp(Routing.getPaths().values())
+    def lengthen(self, qb_wire, wire, nodes, count):
+        '''increase the length of a path'''
 
-    # disable path qubits
-    qbs = list(set([it for path in paths for it in path]))
-    Routing.disableQubits(qbs)
+        # local functions, the path is extended in 4-tup coordinates
 
-    log('Placed on qubit: %s\n\n' % str(qbit))
-#    log('Paths: \n')
-#    for path in paths:
-#        log('\t %s \n' % str(path))
-#    log('\n')
-    return qbit, paths
+        def taken(qb):
+            '''check if the 4-tup qb is taken'''
+            return self._is_taken[self._graph.qbit(qb)]
 
+        def take(qb, flag=True):
+            '''set the taken flag of the 4-tup qb'''
+            self._is_taken[self._graph.qbit(qb)] = flag
 
-### SEAM OPENING ###
+        qb_wire = [self._graph.tuples[qb] for qb in qb_wire]
 
-## seam format: seam= [(vert,ind),dir]
-#	horz	-> flag for horizontal or vertical seam
-# 	ind		-> index of seam from bottom-left
-# 	dir		-> flag for opening direction; True opens away from b-l
+        n = len(wire) - len(qb_wire)
+        i = 0
+        # method to increase path length by 4
+        while n >= 3 and i+1 < len(qb_wire):
+            qb = qb_wire[i]
 
+            # if the next qb is perpendicular move a tile over,
+            # switch orientation twice, then move back to the original tile
+            if qb_wire[i+1][2] != qb[2]:
 
-# unchecked
-def availableSeams(qbits):
-    ''' returns a list of possible seams to split given a list of qbits. Seams
-    are candidates if they are next to one of the qubits and can be'''
+                if qb[0] + (qb[2]^1) >= 8 or qb[1] + qb[2] >= 8:
+                    i += 1
+                    continue
 
-    global _vacancy, N, M, _tile_occ
+                qb1 = (qb[0] + (qb[2]^1), qb[1] + qb[2], qb[2], qb[3])
 
-    seams = set()
+                if taken(qb1):
 
-    for qbit in qbits:
-        # left/right seams
+                    if qb[0] + (-1)*(qb[2]^1) < 0 or qb[1] + (-1)*qb[2] < 0:
+                        i += 1
+                        continue
 
-        if _vacancy[0] > 0 and qbit[1] > _vacancy[0]:     # open left
-            if qbit[1] > 1:
-                seams.add(((1, qbit[1]), False))
-            seams.add(((1, qbit[1]+1), False))
+                    qb1 = (qb[0] + (-1)*(qb[2]^1), qb[1] + (-1)*qb[2], qb[2], qb[3])
 
-        if _vacancy[1] > 0 and qbit[1] < ((N-1)-_vacancy[1]):  # open right
-            seams.add(((1, qbit[1]), True))
-            if qbit[1] < (N-2):
-                seams.add(((1, qbit[1]+1), True))
+                    if taken(qb1):
+                        i += 1
+                        continue
 
-        # down/up seams
+                found = False
+                for j in xrange(self.L):
+                    qb2 = (qb1[0], qb1[1], qb1[2]^1, j)
+                    if not taken(qb2):
+                        found = True
+                        break
 
-        if _vacancy[2] > 0 and qbit[0] > _vacancy[2]: 	# open down
-            if qbit[0] > 1:
-                seams.add(((0, qbit[0]), False))
-            seams.add(((0, qbit[0]+1), False))
+                if not found:
+                    i += 1
+                    continue
 
-        if _vacancy[3] > 0 and qbit[0] < ((M-1)-_vacancy[3]):  # open up
-            seams.add(((0, qbit[0]), True))
-            if qbit[0] < (M-2):
-                seams.add(((0, qbit[0]+1), True))
+                found = False
+                for j in xrange(self.L):
+                    qb3 = (qb1[0], qb1[1], qb1[2], j)
+                    qb4 = (qb[0], qb[1], qb[2], j)
+                    if not taken(qb3) and qb3 != qb1 \
+                        and not taken(qb4) and qb4 != qb:
 
-    return seams
+                        found = True
+                        break
 
+                if not found:
+                    i += 1
+                    continue
 
-def prepSeam(seam):
-    '''prepare parameters for seam opening'''
+                qb_wire.insert(i + 1, qb4)
+                qb_wire.insert(i + 1, qb3)
+                qb_wire.insert(i + 1, qb2)
+                qb_wire.insert(i + 1, qb1)
+
+                take(qb1)
+                take(qb2)
+                take(qb3)
+                take(qb4)
+
+                n -= 4
+
+            # if the next qb is parallel switch orientation twice,
+            # move to the correct tile, switch orientation again
+            elif qb_wire[i+1][2] == qb[2]:
+                found = False
+                for j in xrange(self.L):
+                    qb1 = (qb[0], qb[1], qb[2]^1, j)
+                    if not taken(qb1):
+                        found = True
+                        break
 
-    global _qbit_flags,  _paths
+                if not found:
+                    i += 1
+                    continue
 
-    sm, dr = seam
+                found = False
+                for j in xrange(self.L):
+                    qb2 = (qb[0], qb[1], qb[2], j)
 
-    # local functions
+                    if qb_wire[i+1][0] == qb[0]:
+                        m = qb_wire[i+1][1] - qb[1]
+                    else:
+                        m = qb_wire[i+1][0] - qb[0]
 
-    def check_qb(qb):
-        '''check if qb lies on the mobile side of seam'''
+                    if qb[0] + (m)*(qb[2]^1) < 0 or qb[1] + (m)*qb[2] < 0 \
+                        or qb[0] + (m)*(qb[2]^1) >= 8 or qb[1] + (m)*qb[2] >= 8:
+                        i += 1
+                        continue
+                    qb3 = (qb[0] + (m)*(qb[2]^1), qb[1] + (m)*qb[2], qb[2], j)
 
-        if dr:  # increasing index
-            return qb[sm[0]] >= sm[1]
-        else:   # decreasing index
-            return qb[sm[0]] < sm[1]
-
-    # list of qubits to be moved
-    qbits = []
-    for qb in filter(check_qb, _qbit_flags):
-        if _qbit_flags[qb]['assigned']:
-                qbits.append(qb)
-
-    # dict of connectors to be 'moved' for each path
-    paths = {}
-    num_halfs = {}
-
-    for key in _paths:
-        path = _paths[key]
-        d = []
-        nf, nh, nn = 0, 0, 0
-        for i in xrange(1, len(path)):
-            connect = [path[i-1], path[i]]
-            n1, n2 = map(check_qb, connect)
-            if n1 and n2:       # completely on mobile side of seam
-                d.append([connect, 'full'])
-                nf += 1
-            elif n1 or n2:      # cut by seam
-                d.append([connect, 'half', n1])
-                nh += 1
-            else:               # not affected by seam
-                d.append([connect, 'none'])
-                nn += 1
-        if nf+nh > 0:
-            paths[key] = d
-            num_halfs[key] = nh
-
-    return qbits, paths, num_halfs
-
-
-# unchecked
-def genSeamDict(seam, adj_qbits):
-    '''generate a dict of seam opening parameters'''
-
-    global _qbit_flags, _paths, _qbitAdj, _source, _cells, _qbit_paths
-
-    ## local functions
-
-    sm, dr = seam
-
-    def target_qb(qb):
-        '''returns the target qubit for a given qubit under the specified
-        seam and direction'''
-
-        q = list(qb)
-        if dr:
-            q[sm[0]] += 1
-        else:
-            q[sm[0]] -= 1
-        return tuple(q)
+                    if not taken(qb2) and \
+                        not taken(qb3) and qb2 != qb:
 
-    qbits, paths, num_halfs = prepSeam(seam)
-    if len(qbits) + len(paths) == 0:
-        return None
+                        found = True
+                        break
 
-    ## check for qbit conflicts
-    qbit_confs = []
-    for qb in qbits:
-        tg = target_qb(qb)
-        # throw exception unless target qbit exists and is suitable
-        try:
-            assert len(_qbitAdj[tg]) >= len(_source[_cells[qb]])
-        except KeyError:
-            qbit_confs.append(qb)
-
-    ## check for path conflicts
-    map_conn = lambda conn: map(target_qb, conn)
-    path_confs = set()
-    for key in paths:
-        full_conns = filter(lambda x: x[1] == 'full', paths[key])
-        new_conns = map(lambda x: map_conn(x[0]), full_conns)
-        for conn in new_conns:
-            if not conn[1] in _qbitAdj[conn[0]]:
-                path_confs.add(key)
-                break
+                if not found:
+                    i += 1
+                    continue
 
-    # clean up qbits and connects
-    for qb in qbit_confs:
-        qbits.remove(qb)
-    for key in path_confs:
-        paths.pop(key)
+                found = False
+                for j in xrange(self.L):
+                    qb4 = (qb3[0], qb3[1], qb3[2]^1, j)
+                    if not taken(qb4):
+                        found = True
+                        break
 
-    # give score based on nearest seam to mean qbit
-    mean_qbit = reduce(lambda x, y: (x[0]+y[0], x[1]+y[1]), adj_qbits)
-    mean_qbit = map(lambda x: x/len(adj_qbits), mean_qbit)
+                if not found:
+                    i += 1
+                    continue
 
-    seam_dist = abs(mean_qbit[sm[0]]-sm[1]-.5)
+                qb_wire.insert(i + 1, qb4)
+                qb_wire.insert(i + 1, qb3)
+                qb_wire.insert(i + 1, qb2)
+                qb_wire.insert(i + 1, qb1)
+
+                take(qb1)
+                take(qb2)
+                take(qb3)
+                take(qb4)
+
+                n -= 4
+
+        i = 0
+        # method to increase path length by 2
+        while n > 0 and i+1 < len(qb_wire):
+            qb = qb_wire[i]
+
+            # must be in the same tile
+            # switch orientation twice
+            if qb_wire[i+1][2] != qb[2]:
+                found = False
+                for j in xrange(self.L):
+                    qb1 = (qb[0], qb[1], qb[2]^1, j)
+                    if not taken(qb1):
+                        found = True
+                        break
 
-    ### compute cost
+                if not found:
+                    i += 1
+                    continue
 
-    # number of qbit and paths to repair
-    nq, np = map(len, [qbit_confs, path_confs])
-    # number of paths to extend
-    ne = 0
-    for key in paths:
-        ne += num_halfs[key]
+                found = False
+                for j in xrange(self.L):
+                    qb2 = (qb[0], qb[1], qb[2], j)
+                    if not taken(qb2) and qb2 != qb:
+                        found = True
+                        break
 
-    cost = nq*SEAM_QBIT_COST+np*SEAM_PATH_COST+ne*SEAM_EXT_COST
-    cost += seam_dist*SEAM_DIST_COST
+                if not found:
+                    i += 1
+                    continue
 
-    seam_dict = {'sm': sm,
-                 'dr': dr,
-                 'cost': cost,
-                 'qbits': qbits,
-                 'paths': paths,
-                 'qb_conf': qbit_confs,
-                 'pt_conf': path_confs,
-                 'tg_fn': target_qb,
-                 'par': [nq, np, ne, seam_dist]}
+                qb_wire.insert(i + 1, qb2)
+                qb_wire.insert(i + 1, qb1)
 
-    return seam_dict
+                take(qb1)
+                take(qb2)
 
+                n -= 2
 
-def moveQbit(qbit, tg_fn):
-    ''' Move a qubit under seam opening. Handles forgetting and
-    replacing the qubit'''
+            elif qb_wire[i+1][2] == qb[2]:
+                i += 1
 
-    global _cells, _qubits
+        # if unable to lengthen enough, create a new different shortest path,
+        # and try lengthening again
+        if n > 0:
+            holder_qb = []
+            if count > len(qb_wire):
+                return None
+            for j in xrange(0,count):
+                if self._graph.qbit(qb_wire[j]) in nodes:
+                    continue
+                holder_qb.append(qb_wire[j])
+            for qb in qb_wire[count:]:
+                if self._graph.qbit(qb_wire[j]) in nodes:
+                    continue
+                take(qb, False)
 
-    old_qb, new_qb = qbit, tg_fn(qbit)
-    cell = _cells[old_qb]
+            new_qb_wire = self.get_wire_path(self._graph.qbit(qb_wire[0]),
+                                        self._graph.qbit(qb_wire[-1]), nodes)
+            if not new_qb_wire:
+                return None
 
-    log('qbit: %s \t -> \t %s\n' % (str(old_qb), str(new_qb)))
-    # forget old qubit and flags,  old paths sohuld be handled elsewhere
-    forgetQubit(old_qb)
+            for qb in holder_qb:
+                take(qb, False)
+            for qb in new_qb_wire:
+                self._is_taken[qb] = True
 
-    # map to new qubit
-    assignQubit(cell, new_qb)
+            return self.lengthen(new_qb_wire, wire, nodes, count + 1)
 
+        return map(self._graph.qbit, qb_wire)
 
-def newPath(key, path, tg_fn):
-    '''create new path'''
+    def update_mapping(self, qb_wire, wire, nodes, all_paths, all_qbs):
+        '''update paths and qbs'''
 
-    new_path = []
-    # print path
-    for i in xrange(len(path)):
-        conn, typ = path[i][0:2]
-        new_conn = map(tg_fn, conn)
-        if typ == 'full':
-            if i == 0:
-                new_path.append(new_conn[0])
-            new_path.append(new_conn[1])
-        elif typ == 'half':
-            if path[i][2]:
-                if i == 0:
-                    new_path.append(new_conn[0])
-                new_path.append(conn[0])
-                new_path.append(conn[1])
+        # remove old unused paths
+        for i in xrange(1, len(wire)):
+            if (wire[i-1], wire[i]) in all_paths:
+                del all_paths[(wire[i-1], wire[i])]
+            elif (wire[i], wire[i-1]) in all_paths:
+                del all_paths[(wire[i], wire[i-1])]
             else:
-                if i == 0:
-                    new_path.append(conn[0])
-                new_path.append(conn[1])
-                new_path.append(new_conn[1])
-        elif typ == 'none':
-            if i == 0:
-                new_path.append(conn[0])
-            new_path.append(conn[1])
-        else:
-            log('Invalid coupler type in movePath\n')
-            raise ValueError('Invalid coupler')
+                print "ERROR: Can't find path in paths"
 
-    return new_path
+        # add new paths and qbs
+        if len(qb_wire) > len(wire):
+            for i in xrange(len(wire)):
+                all_qbs[wire[i]] = qb_wire[i]
+                if i > 0 and i < len(wire) - 1:
+                    all_paths[(wire[i-1],wire[i])] = [qb_wire[i-1], qb_wire[i]]
 
-
-def movePath(key, path, tg_fn):
-    ''' Move a path under seam opening. Handles forgetting and replacing'''
-
-    global _paths
-
-    forgetPath(key)
-
-    new_path = []
-    log('Moving path: %s \n' % str(key))
-    # print path
-    for i in xrange(len(path)):
-        conn, typ = path[i][0:2]
-        new_conn = map(tg_fn, conn)
-        if typ == 'full':
-            if i == 0:
-                new_path.append(new_conn[0])
-            new_path.append(new_conn[1])
-        elif typ == 'half':
-            if path[i][2]:
-                if i == 0:
-                    new_path.append(new_conn[0])
-                new_path.append(conn[0])
-                new_path.append(conn[1])
-            else:
-                if i == 0:
-                    new_path.append(conn[0])
-                new_path.append(conn[1])
-                new_path.append(new_conn[1])
-        elif typ == 'none':
-            if i == 0:
-                new_path.append(conn[0])
-            new_path.append(conn[1])
+            all_paths[(wire[len(wire) - 2], wire[len(wire) - 1])] = qb_wire[len(wire) - 2:]
         else:
-            log('Invalid coupler type in movePath\n')
-            raise ValueError('Invalid coupler')
-    # print new_path
-    assignPaths([new_path])
-
-
-# unchecked
-def openSeam(sm, dr, cost, qbits, paths, qb_conf, pt_conf, tg_fn, par):
-    ''' recursively open seam'''
-
-    global _cells, _numAdj, M, N, L, _qbitAdj, _cell_flags, _qubits, _reserved
-    ## erase conflicts
-
-    log('Broken qubits: \n %s \n\n' % str(qb_conf))
-
-    # erase qbit conflicts and update broken paths
-    log('Erasing %d broken qubits...\n' % len(qb_conf))
-    cell_conf = map(lambda x: _cells[x], qb_conf)
-    for qb in qb_conf:
-        new_paths = forgetQubit(qb)
-        log('%s: %s\n' % (str(qb), str(new_paths)))
-        pt_conf.update(new_paths)
-        for pt in new_paths:
-            if pt in paths:
-                paths.pop(pt)
-    log(' done\n')
-
-    # erase path conflicts
-    log('Erasing %d broken paths...\n' % len(pt_conf))
-    for path in pt_conf:
-        log('path: %s\n' % str(path))
-        forgetPath(path)
-    log(' done\n')
-
-    # retain path keys between good qbits
-    pt_rp = []
-    for key in pt_conf:
-        if _cell_flags[key[0]]['placed'] and _cell_flags[key[1]]['placed']:
-            pt_rp.append(key)
-
-    ## STORE OLD VALUES AND WIPE SEAM TARGET REGION
-
-    # map of new qbits for each cell
-    qbit_dict = {_cells[qb]: tg_fn(qb) for qb in qbits}
-
-    # map of new paths
-    path_dict = {key: newPath(key, paths[key], tg_fn) for key in paths}
-
-    # wipe old qubits and paths
-    log('Wiping old values...\n')
-    log('\t qbits...')
-    for qb in qbits:
-        forgetQubit(qb, False)
-    log('done\n')
-    log('\t paths...')
-    for key in paths:
-        forgetPath(key, False)
-    log('done\n')
-
-    # assign new qubits and paths
-    log('Assigning new values...\n')
-    for cell in qbit_dict:
-        assignQubit(cell, qbit_dict[cell])
-
-    assignPaths(path_dict.values())
-
-    # update all reserved qubits
-    log('updating all reservations...\n')
-    reserveQubits(filter(None, _qubits.values()))
-
-    ## repair broken paths
-
-    # only place paths between moved qubits
-    log('Attempting to replace broken routes between moved qubits\n')
-    routes = []
-    for pt in pt_rp:
-        rt = map(lambda x: _qubits[x], pt)
-        routes.append(rt)
-    cost = Routing.Routing(routes, _reserved,  writePath=ROUTE_PATH)
-
-    # check successful routing
-    if cost >= Routing.COST_BREAK:
-        log('routing failed...\n')
-        raise KeyError('Routing failed for paths between moved qbits in \
-        seam opening... fix code later')
-
-    # get paths
-    log('Routing successfull, preparing to assign new paths\n')
-    fixed_paths = cp(Routing.getPaths().values())
-
-    # disable path qubits
-    log('Disabling new paths\n')
-    qbs = list(set([it for path in fixed_paths for it in path]))
-    Routing.disableQubits(qbs)
-
-    # assign paths and update reservations
-    log('Assigning new paths \n')
-    assignPaths(fixed_paths)
+            for i in xrange(len(qb_wire)):
+                all_qbs[wire[i]] = qb_wire[i]
+                if i > 0 and i < len(wire) - 1:
+                    all_paths[(wire[i-1],wire[i])] = [qb_wire[i-1], qb_wire[i]]
+
+            all_paths[(wire[len(wire) - 2], wire[len(wire) - 1])] = qb_wire[len(wire) - 2:]
+
+    def get_wires(self):
+        '''get the wires (defined as segments where every cell only has 2
+        connections) of a qca circuit'''
+
+        wires = []
+        cells = self._qubits.keys()
+        nodes = []
+
+        # find the first node (cell with more than 2 connections), start there
+        curr_c = None
+        for cell in cells:
+            if len(self._source[cell]) > 2:
+                curr_c = cell
+                cells.remove(cell)
+                break
 
-    ## repair qbit placements, should automatically deal with paths
+        # for all cells left
+        next_c = None
+        curr_wire = []
+        while cells:
+            # add to current wire
+            curr_wire.append(curr_c)
+
+            # if we reach a node, save current wire, start a new one
+            adj_cells = self._source[curr_c]
+            if len(adj_cells) > 2:
+                nodes.append(curr_c)
+                if len(curr_wire) > 1:
+                    wires.append(curr_wire)
+                    curr_wire = [curr_c]
+
+            # find the next cell connected to this cell
+            next_c = None
+            for cell in adj_cells:
+                if cell in cells:
+                    next_c = cell
+                    break
 
-    # order qbits to be placed by decreasing adjacency
-    log('Preparing new qbit placements \n')
-    cell_ord = sorted(cell_conf, key=lambda x: -_numAdj[x])
+            # if next cell is already in a wire, add the end node to the wire
+            if next_c is None:
+                for cell in adj_cells:
+                    if cell in nodes and cell not in curr_wire:
+                        curr_wire.append(cell)
+
+            # find a new node to start a new wire from
+            if next_c is None:
+                for node in nodes:
+                    for pcell in self._source[node]:
+                        if pcell in cells:
+                            wires.append(curr_wire)
+                            curr_wire = [node]
+                            next_c = pcell
+                            break
+                    if next_c:
+                        break
 
-    for cell in cell_ord:
-        log('cell: %s ...' % str(cell))
-        new_qb, new_paths = placeCell(cell)     # recursive call
+            curr_c = next_c
+            cells.remove(next_c)
 
-        # abort on failed placement
-        if new_qb is None:
-            return False
-            raise KeyError('Failed cell %s placement in seam \
-            opening' % str(cell))
+        curr_wire.append(curr_c)
+        wires.append(curr_wire)
+        return wires, nodes
 
-        # assign qubit and paths
-        assignQubit(cell, new_qb)
-        assignPaths(new_paths)
+    #######################################################################
+    #######################################################################
+    ### MAIN ###
 
-        # handle reservations
-        reserveQubits([new_qb])
+    # unchecked
+    def placeCells(self, cells):
+        '''Place the given cells and, breadth first, every unplaced cell
+        connected to them'''
 
-    return True
+        # update do* lists
+        doNow = sorted(cells, key=lambda x: -self._numAdj[x])
+        doNext = set()
 
+        # if doNow is non-empty, there are still cells to place
+        while doNow:
 
-def selectSeam(seam_dicts):
-    '''select which seam to open based on minimum cost. If multiple
-    seams have the same cost randomly select one'''
+            self._trace.event('todo', cells=doNow)
+            # place each cell in doNow
 
-    seams = sorted(seam_dicts, key=lambda x: x['cost'])
+            for cell in doNow:
 
-    log('Seam candidates:\n')
-    for seam in seams:
-        log('%s :: %5s   cost = %.1f \t %s\n'
-            % (str(seam['sm']), str(seam['dr']),
-               seam['cost'], str(seam['par'])))
+                self.checkDeadline()
 
-    cands = filter(lambda x: x['cost'] == seams[0]['cost'], seams)
+                # find qbit and paths from placed cells
+                qbit, paths = self.placeCell(cell)
 
-    return cands[int(random()*len(cands))]
+                # abort on failed placement
+                if qbit is None:
+                    print 'No placement of cell %s found' % str(cell)
+                    raise
 
+                # assign qubit and paths
+                self.assignQubit(cell, qbit)
+                self.assignPaths(paths)
 
-# NEW METHODS FOR WIRE SHORTENING
-def shorten_wire_paths():
-    '''find the wires. Find a qbit path for each wire that most resemble's
-    the length of the wire path. To do this, find the shortest possible path
-    and lengthen the path until it is an appropriate length'''
+                # handle reservations
+                self.reserveQubits([qbit])
 
-    global _paths
-    global _qubits
-    global _qbit_flags
+                # add unplaced adjacent cells to doNext
+                for c2 in self._source[cell]:
+                    if not (self._cell_flags[c2]['placed'] or c2 in doNow):
+                        doNext.add(c2)
 
-    wires, nodes = get_wires()
-    wires = sorted(wires, key=lambda x: len(x))
+            # update doNow and clear doNext
 
-    all_paths = dict(_paths)
-    all_qbs = dict(_qubits)
+            doNow = sorted(doNext, key=lambda x: -self._numAdj[x])
+            doNext.clear()
 
-    pre_ex = sum(map(lambda x: len(x)-2, _paths.values()))
+    # unchecked
+    def loadSol(self, cell_map, paths):
+        '''Assign the qubits and paths of a formatted solution, see formatSol.
+        Qubits off the processor and paths to unassigned cells are skipped.
+        Qubit reservations are not set'''
 
-    print "There are %d cells, there are %d in qbit flags" %(len(_cells), len(_qbit_flags))
-    # clear qbit flags except the nodes (which do not move)
-    qb_nodes = []
-    for c in nodes:
-        qb_nodes.append(_qubits[c])
-    for qb in _cells:
-        _qbit_flags[qb]['taken'] = qb in qb_nodes
+        for cell in cell_map:
+            qbit = self._graph.linear(cell_map[cell])
+            if cell in self._source and qbit is not None:
+                self.assignQubit(cell, qbit)
 
-    update = True
+        for key in paths:
+            path = map(self._graph.linear, paths[key])
+            if None in path or not all(self._cell_flags[c]['placed']
+                                       for c in key if c in self._cell_flags):
+                continue
+            self.assignPaths([path], check=False)
 
-    qb_wires = []
-    elongate = []
+    # unchecked
+    def damagedSol(self):
+        '''Find the placed cells on inactive qubits and the paths which use
+        an inactive qubit or coupler'''
 
-    for wire in wires:
+        cells = [cell for cell in self._qubits if self._qubits[cell] is not
+                 None and self._graph.degree[self._qubits[cell]] == 0]
 
-        # get the shortest path for the wire
-        qb_wire = get_wire_path(_qubits[wire[0]], _qubits[wire[-1]], qb_nodes)
+        keys = []
+        for key, path in self._paths.iteritems():
+            for i in xrange(len(path)-1):
+                if not path[i+1] in self._graph.adj[path[i]]:
+                    keys.append(key)
+                    break
 
-        # set flags, add qb_wire to correct list
-        # qb_wires are for wires that are already the best length
-        # elongate are for wires that need to be lengthened
-        if qb_wire:
-            for qb in qb_wire:
-                _qbit_flags[qb]['taken'] = True
+        return cells, keys
 
-            if len(qb_wire) < len(wire):
-                elongate.append((wire, qb_wire))
-            else:
-                qb_wires.append((wire, qb_wire))
+    # unchecked
+    def repairSource(self, source, cell_map, paths):
+        '''Repair an embedding of the source graph after qubits or couplers
+        of the target have been disabled. Only the cells and paths which use
+        a disabled qubit or coupler are forgotten and then re-routed or
+        re-placed, all other paths are kept. Returns the formatted cell_map
+        and paths, see formatSol'''
 
-        else:
-            for qb in wire:
-                if qb in nodes:
-                    continue
-                _qbit_flags[all_qbs[qb]]['taken'] = False
-
-    # lengthen wires taht need lenthening
-    for w, qb_w in elongate:
-        qb_w = lengthen(qb_w, w, qb_nodes, 1)
-        if qb_w is None:
-            update = False
-        qb_wires.append((w, qb_w))
-
-    # updatek paths and qbs
-    if update:
-        for w, qb_w in qb_wires:
-            update_mapping(qb_w, w, nodes, all_paths, all_qbs)
-
-    # ensure correct flags
-    used_qb = []
-    for path in all_paths.values():
-        used_qb.extend(path)
-
-    for qb in _qbit_flags:
-        if _qbit_flags[qb]['taken']:
-            if qb not in used_qb:
-                _qbit_flags[qb]['taken'] = False
-
-    post_ex = sum(map(lambda x: len(x)-2, all_paths.values()))
-
-    # if improvements are found, save them
-    if post_ex < pre_ex and update:
-        _paths = all_paths
-        _qubits = all_qbs
-        return (pre_ex - post_ex)
-    # otherwise restore older correct mappings
-    else:
-        print "Removing long paths failed, using earlier embedding"
-        used_qb = []
-        for path in _paths.values():
-            used_qb.extend(path)
-        for qb in _qbit_flags:
-            _qbit_flags[qb]['taken'] = qb in used_qb
-        return 0
+        self.initialize(source)
+        self.loadSol(cell_map, paths)
 
+        ### REMOVE DAMAGE ###
 
-def get_wire_path(head, end_qb, nodes):
-    '''get the best qbit path for the qca circuit wire'''
-    visited = []
-    complete, paths = extend_path([head], end_qb, nodes, visited)
-    if complete:
-        return paths
+        cells, keys = self.damagedSol()
+        self._trace.event('repair', cells=cells, paths=keys)
 
-    # get new paths until one reaches the end (simple djikstra's)
-    while paths:
-        curr_path = paths.pop(0)
-        complete, new_paths = extend_path(curr_path, end_qb, nodes, visited)
-        if complete:
-            return new_paths
+        for key in keys:
+            self.forgetPath(key, check=False)
+        for cell in cells:
+            self.forgetCell(cell)
 
-        added = False
-        for i in xrange(len(paths)):
-            if new_paths and len(paths[i]) > len(new_paths[0]):
-                added = True
-                for p in new_paths:
-                    paths.insert(i, p)
+        # placed cells need enough free adjacent qubits for their new paths
+        while True:
+            crowded = [cell for cell, qbit in self._qubits.iteritems()
+                       if qbit is not None and self._numAdj[cell] >
+                       sum(not self._is_taken[qb]
+                           for qb in self._graph.adj[qbit])]
+            if not crowded:
                 break
+            self._trace.event('repair_crowded', cells=crowded)
+            for cell in crowded:
+                self.forgetCell(cell)
 
-        if not added:
-            for p in new_paths:
-                paths.append(p)
-
-
-def extend_path(curr_path, end_qb, nodes, visited):
-    '''given a current path, returns the a list of the possible next paths'''
-
-    head = curr_path[-1]
-    paths = []
-    next_qbs = _qbitAdj[head]
-    arrived = False
-    # append the curr path with all possibilities
-    for qb in next_qbs:
-        if arrived:
-            if not _qbit_flags[qb]['taken']:
-                return (True, curr_path + [qb])
-        elif qb == end_qb:
-            if qb in nodes or not _qbit_flags[qb]['taken']:
-                return (True, curr_path + [qb])
-            else:
-                arrived = True
-        elif not _qbit_flags[qb]['taken'] and \
-            qb not in curr_path and qb not in visited:
-            visited.append(qb)
-            paths.append(curr_path + [qb])
-
-    return (False, paths)
-
-
-def lengthen(qb_wire, wire, nodes, count):
-    '''increase the length of a path'''
-
-    global _qbit_flags
-
-    n = len(wire) - len(qb_wire)
-    i = 0
-    # method to increase path length by 4
-    while n >= 3 and i+1 < len(qb_wire):
-        qb = qb_wire[i]
+        qbits = sorted(qb for qb in self._qubits.values() if qb is not None)
+        if not qbits:
+            raise KeyError('No intact cells to repair from')
+        self.setVacancy()
+        self.reserveQubits(qbits)
 
-        # if the next qb is perpendicular move a tile over,
-        # switch orientation twice, then move back to the original tile
-        if qb_wire[i+1][2] != qb[2]:
+        ### RE-ROUTE BROKEN PATHS ###
 
-            if qb[0] + (qb[2]^1) >= 8 or qb[1] + qb[2] >= 8:
-                i += 1
+        for key in keys:
+            if not all(self._cell_flags[c]['placed'] for c in key):
                 continue
+            route = [self._qubits[c] for c in key]
+            t = time()
+            cost = self._router.route([route], self._reserved,
+                                      writePath=ROUTE_PATH)
+            self._stats['time']['route'] += time()-t
+            self._stats['route_calls'] += 1
+            self._trace.event('repair_route', key=key, cost=cost)
+            if cost < Routing.COST_BREAK:
+                path = self._router.getPaths().values()[0]
+                self._router.disableQubits(path)
+                self.assignPaths([path])
+            else:
+                # re-place the second cell instead
+                self._router.disableQubits(route)
+                self.forgetCell(key[1])
+                self.setVacancy()
+                self.reserveQubits(sorted(
+                    qb for qb in self._qubits.values() if qb is not None))
 
-            qb1 = (qb[0] + (qb[2]^1), qb[1] + qb[2], qb[2], qb[3])
+        ### RE-PLACE CELLS ###
 
-            if _qbit_flags[qb1]['taken']:
+        placed = lambda c: self._cell_flags[c]['placed']
+        todo = [cell for cell in source if not placed(cell)]
+        self._stats['repaired'] = len(todo)
 
-                if qb[0] + (-1)*(qb[2]^1) < 0 or qb[1] + (-1)*qb[2] < 0:
-                    i += 1
-                    continue
+        self.placeCells([cell for cell in todo
+                         if any(map(placed, source[cell]))])
 
-                qb1 = (qb[0] + (-1)*(qb[2]^1), qb[1] + (-1)*qb[2], qb[2], qb[3])
+        if not all(map(placed, source)):
+            raise KeyError('Cells without intact neighbours were lost')
 
-                if _qbit_flags[qb1]['taken']:
-                    i += 1
-                    continue
+        self.checkSol()
+        cell_map, paths = self.formatSol()
 
-            found = False
-            for j in xrange(L):
-                qb2 = (qb1[0], qb1[1], qb1[2]^1, j)
-                if not _qbit_flags[qb2]['taken']:
-                    found = True
-                    break
+        self._trace.event('complete', cells=len(cell_map),
+                          qbits=np.count_nonzero(self._is_taken))
 
-            if not found:
-                i += 1
-                continue
+        return cell_map, paths
 
-            found = False
-            for j in xrange(L):
-                qb3 = (qb1[0], qb1[1], qb1[2], j)
-                qb4 = (qb[0], qb[1], qb[2], j)
-                if not _qbit_flags[qb3]['taken'] and qb3 != qb1 \
-                    and not _qbit_flags[qb4]['taken'] and qb4 != qb:
+    def timedRun(self, func, *args):
+        '''Run an embedding method and record its total time. The trace of
+        a failed embedding is dumped before re-raising'''
 
-                    found = True
-                    break
+        t = time()
+        try:
+            sol = func(*args)
+        except:
+            # dump the trace of the failed embedding before re-raising
+            exc = sys.exc_info()
+            if self._stats:
+                self._stats['time']['total'] = time()-t
+            if self._trace:
+                self._trace.event('failed', error=repr(exc[1]))
+                self.dumpTrace()
+            raise exc[0], exc[1], exc[2]
 
-            if not found:
-                i += 1
-                continue
+        self._stats['time']['total'] = time()-t
 
-            qb_wire.insert(i + 1, qb4)
-            qb_wire.insert(i + 1, qb3)
-            qb_wire.insert(i + 1, qb2)
-            qb_wire.insert(i + 1, qb1)
-
-            _qbit_flags[qb1]['taken'] = True
-            _qbit_flags[qb2]['taken'] = True
-            _qbit_flags[qb3]['taken'] = True
-            _qbit_flags[qb4]['taken'] = True
-
-            n -= 4
-
-        # if the next qb is parallel switch orientation twice,
-        # move to the correct tile, switch orientation again
-        elif qb_wire[i+1][2] == qb[2]:
-            found = False
-            for j in xrange(L):
-                qb1 = (qb[0], qb[1], qb[2]^1, j)
-                if not _qbit_flags[qb1]['taken']:
-                    found = True
-                    break
+        return sol
 
-            if not found:
-                i += 1
-                continue
+    # unchecked
+    def embedSource(self, source):
+        '''Place every cell of the source graph and route the connecting
+        paths. Returns the formatted cell_map and paths, see formatSol'''
 
-            found = False
-            for j in xrange(L):
-                qb2 = (qb[0], qb[1], qb[2], j)
+        ### INITIALIZE ###
 
-                if qb_wire[i+1][0] == qb[0]:
-                    m = qb_wire[i+1][1] - qb[1]
-                else:
-                    m = qb_wire[i+1][0] - qb[0]
+        self.initialize(source)
 
-                if qb[0] + (m)*(qb[2]^1) < 0 or qb[1] + (m)*qb[2] < 0 \
-                    or qb[0] + (m)*(qb[2]^1) >= 8 or qb[1] + (m)*qb[2] >= 8:
-                    i += 1
-                    continue
-                qb3 = (qb[0] + (m)*(qb[2]^1), qb[1] + (m)*qb[2], qb[2], j)
+        if PRECHECK:
+            feas = self.checkFeasible(source)
+            if feas['reasons']:
+                self._trace.event('infeasible', **feas)
+                raise KeyError('Infeasible: %s' % '; '.join(feas['reasons']))
 
-                if not _qbit_flags[qb2]['taken'] and \
-                    not _qbit_flags[qb3]['taken'] and qb2 != qb:
+        ### INITIAL SEED ###
 
-                    found = True
-                    break
+        # select first cell
+        cell = self.firstCell()
 
-            if not found:
-                i += 1
-                continue
+        # select first qubit
+        qbit = self.firstQubit(cell)
 
-            found = False
-            for j in xrange(L):
-                qb4 = (qb3[0], qb3[1], qb3[2]^1, j)
-                if not _qbit_flags[qb4]['taken']:
-                    found = True
-                    break
+        if qbit is None:
+            raise KeyError('No suitable first qubit found')
 
-            if not found:
-                i += 1
-                continue
+        # take first qubit
+        self.assignQubit(cell, qbit)
 
-            qb_wire.insert(i + 1, qb4)
-            qb_wire.insert(i + 1, qb3)
-            qb_wire.insert(i + 1, qb2)
-            qb_wire.insert(i + 1, qb1)
-
-            _qbit_flags[qb1]['taken'] = True
-            _qbit_flags[qb2]['taken'] = True
-            _qbit_flags[qb3]['taken'] = True
-            _qbit_flags[qb4]['taken'] = True
-
-            n -= 4
-
-    i = 0
-    # method to increase path length by 2
-    while n > 0 and i+1 < len(qb_wire):
-        qb = qb_wire[i]
-
-        # must be in the same tile
-        # switch orientation twice
-        if qb_wire[i+1][2] != qb[2]:
-            found = False
-            for j in xrange(L):
-                qb1 = (qb[0], qb[1], qb[2]^1, j)
-                if not _qbit_flags[qb1]['taken']:
-                    found = True
-                    break
+        # handle reservations
+        self.reserveQubits([qbit])
 
-            if not found:
-                i += 1
-                continue
+        ### GENERAL PLACEMENT LOOP ###
 
-            found = False
-            for j in xrange(L):
-                qb2 = (qb[0], qb[1], qb[2], j)
-                if not _qbit_flags[qb2]['taken'] and qb2 != qb:
-                    found = True
-                    break
+        self.placeCells(source[cell])
 
-            if not found:
-                i += 1
-                continue
+        # post processing path shortening
+#        self.shorten_wire_paths()
 
-            qb_wire.insert(i + 1, qb2)
-            qb_wire.insert(i + 1, qb1)
+        self.checkSol()
+        cell_map, paths = self.formatSol()
 
-            _qbit_flags[qb1]['taken'] = True
-            _qbit_flags[qb2]['taken'] = True
+        self._trace.event('complete', cells=len(cell_map),
+                          qbits=np.count_nonzero(self._is_taken))
 
-            n -= 2
+        return cell_map, paths
 
-        elif qb_wire[i+1][2] == qb[2]:
-            i += 1
+    def denseEmbed(self, source, write=False, stats=False, budget=None,
+                   profile=None):
+        '''
+        Attempts to find an embedding of the source graph into a global
+        target Chimera graph. If the time budget runs out, EmbedTimeout is
+        raised with the partial progress.
 
-    # if unable to lengthen enough, create a new different shortest path,
-    # and try lengthening again
-    if n > 0:
-        holder_qb = []
-        if count > len(qb_wire):
-            return None
-        for j in xrange(0,count):
-            if qb_wire[j] in nodes:
-                continue
-            holder_qb.append(qb_wire[j])
-        for qb in qb_wire[count:]:
-            if qb_wire[j] in nodes:
-                continue
-            _qbit_flags[qb]['taken'] = False
+        inputs:	source(dict)	: adjacency dict: source graph
+                budget(float)	: time budget in seconds, None for no limit
+                profile(dict)	: cost profile, or the name or file of one,
+                                  used for this embedding only. See
+                                  loadProfile
 
-        new_qb_wire = get_wire_path(qb_wire[0], qb_wire[-1], nodes)
-        if not new_qb_wire:
-            return None
+        outputs: qubits (dict)	: source node indexed mapping of assigned
+                                 qubits.
+                 routes (dict)	: (node1,node2) indexed dictionary of qubit
+                                 routes; node1 < node2
+                 stats (dict)	: phase timings and counters, only returned
+                                 if stats is True. See initStats
+        '''
 
-        for qb in holder_qb:
-            _qbit_flags[qb]['taken'] = False
-        for qb in new_qb_wire:
-            _qbit_flags[qb]['taken'] = True
+        # reset first so a failed embedding never reports stale stats
+        self.initStats()
 
-        qb_wire = lengthen(new_qb_wire, wire, nodes, count + 1)
+        old_profile = None
+        if profile is not None:
+            if not isinstance(profile, dict):
+                profile = loadProfile(profile)
+            old_profile = self.getProfile()
+            self.setProfile(profile)
 
-    return qb_wire
+        self.setBudget(budget)
+        try:
+            cell_map, paths = self.timedRun(self.embedSource, source)
+        finally:
+            self.setBudget(None)
+            if old_profile is not None:
+                self.setProfile(old_profile)
+
+        if WRITE and write:
+            print 'writing solution',
+            try:
+                if not (WRITE_PATH is None):
+                    fname = WRITE_PATH
+                    fp = open(fname, 'w')
+                elif WRITE_DIR:
+                    regex = re.compile('^sol[0-9]+$')   # default name format
+                    old_sols = filter(regex.match, os.listdir(WRITE_DIR))
+                    old_ext = map(lambda x: int(x[3::]), old_sols)  # 3 for 'sol'
+                    old_max = max(old_ext) if len(old_ext) > 0 else -1
+                    fname = WRITE_DIR + 'sol%d' % (old_max+1)
+                else:
+                    fname = None
+                    raise IOError('No valid file destination')
+
+                if not fname is None:
+                    fp = open(fname, 'w')
+                    self.writeSol(fp)
+                    fp.close()
+            except IOError as e:
+                print e.message
+                print 'Invalid filename: %s' % fname
+
+        if stats:
+            return cell_map, paths, self.getStats()
+        return cell_map, paths
+
+    def repairEmbed(self, source, cell_map, paths, stats=False,
+                    fallback=True, budget=None):
+        '''
+        Repairs an embedding of the source graph, as returned by denseEmbed,
+        after qubits or couplers of the target Chimera graph were disabled.
+        Only the damaged cells and paths are re-placed, so the cost scales
+        with the damage rather than the size of the source graph.
+
+        inputs:	source(dict)	: adjacency dict: source graph
+                cell_map(dict)	: source node indexed 4-tup qubits
+                paths(dict)		: (node1,node2) indexed 4-tup qubit paths
+                fallback(bool)	: run a full embedding if the repair fails
+                budget(float)	: time budget in seconds for the repair and
+                                  any fallback, None for no limit
+
+        outputs: see denseEmbed
+        '''
+
+        self.setBudget(budget)
+        try:
+            cell_map, paths = self.timedRun(self.repairSource, source,
+                                            cell_map, paths)
+        except EmbedTimeout:
+            raise
+        except Exception as e:
+            if not fallback:
+                raise
+            if VERBOSE:
+                print 'Repair failed: %s, running full embedding' % repr(e)
+            cell_map, paths = self.timedRun(self.embedSource, source)
+        finally:
+            self.setBudget(None)
 
+        if stats:
+            return cell_map, paths, self.getStats()
+        return cell_map, paths
 
-def update_mapping(qb_wire, wire, nodes, all_paths, all_qbs):
-    '''update paths and qbs'''
 
-    # remove old unused paths
-    for i in xrange(1, len(wire)):
-        if (wire[i-1], wire[i]) in all_paths:
-            del all_paths[(wire[i-1], wire[i])]
-        elif (wire[i], wire[i-1]) in all_paths:
-            del all_paths[(wire[i], wire[i-1])]
-        else:
-            print "ERROR: Can't find path in paths"
-
-    # add new paths and qbs
-    if len(qb_wire) > len(wire):
-        for i in xrange(len(wire)):
-            all_qbs[wire[i]] = qb_wire[i]
-            if i > 0 and i < len(wire) - 1:
-                all_paths[(wire[i-1],wire[i])] = [qb_wire[i-1], qb_wire[i]]
-
-        all_paths[(wire[len(wire) - 2], wire[len(wire) - 1])] = qb_wire[len(wire) - 2:]
-    else:
-        for i in xrange(len(qb_wire)):
-            all_qbs[wire[i]] = qb_wire[i]
-            if i > 0 and i < len(wire) - 1:
-                all_paths[(wire[i-1],wire[i])] = [qb_wire[i-1], qb_wire[i]]
-
-        all_paths[(wire[len(wire) - 2], wire[len(wire) - 1])] = qb_wire[len(wire) - 2:]
-
-
-def get_wires():
-    '''get the wires (defined as segments where every cell only has 2
-    connections) of a qca circuit'''
-
-    wires = []
-    cells = _qubits.keys()
-    nodes = []
-
-    # find the first node (cell with more than 2 connections) and start there
-    curr_c = None
-    for cell in cells:
-        if len(_source[cell]) > 2:
-            curr_c = cell
-            cells.remove(cell)
-            break
-
-    # for all cells left
-    next_c = None
-    curr_wire = []
-    while cells:
-        # add to current wire
-        curr_wire.append(curr_c)
+#######################################################################
+#######################################################################
+### MODULE INTERFACE ###
 
-        # if we reach a node, save current wire, start a new one
-        adj_cells = _source[curr_c]
-        if len(adj_cells) > 2:
-            nodes.append(curr_c)
-            if len(curr_wire) > 1:
-                wires.append(curr_wire)
-                curr_wire = [curr_c]
+_state = EmbedderState()    # embedder state used by the module level interface
 
-        # find the next cell connected to this cell
-        next_c = None
-        for cell in adj_cells:
-            if cell in cells:
-                next_c = cell
-                break
 
-        # if next cell is already in a wire, add the end node to the wire
-        if next_c is None:
-            for cell in adj_cells:
-                if cell in nodes and cell not in curr_wire:
-                    curr_wire.append(cell)
-
-        # find a new node to start a new wire from
-        if next_c is None:
-            for node in nodes:
-                for pcell in _source[node]:
-                    if pcell in cells:
-                        wires.append(curr_wire)
-                        curr_wire = [node]
-                        next_c = pcell
-                        break
-                if next_c:
-                    break
+def setChimera(chimera_adj, m, n, l):
+    '''Set the target graph of the module level embedder'''
+    _state.setChimera(chimera_adj, m, n, l)
 
-        curr_c = next_c
-        cells.remove(next_c)
 
-    curr_wire.append(curr_c)
-    wires.append(curr_wire)
-    return wires, nodes
+def indexToLinear(tup, index0=False):
+    '''Linear index of a 4-tup qubit in the module level embedder'''
+    return _state.indexToLinear(tup, index0)
 
 
-#######################################################################
-#######################################################################
-### MAIN ###
+def indexToTuple(index, index0=False):
+    '''4-tup of a linear qubit index in the module level embedder'''
+    return _state.indexToTuple(index, index0)
 
 
-# unchecked
-def denseEmbed(source, write=False):
-    '''
-    Attempts to find an embedding of the source graph into a global
-    target Chimera graph.
+def denseEmbed(source, write=False, stats=False, budget=None, profile=None):
+    '''Run Dense Placement with the module level embedder. See
+    EmbedderState.denseEmbed'''
+    return _state.denseEmbed(source, write, stats, budget, profile)
 
-    inputs:	source(dict)	: adjacency dict: source graph
 
-    outputs: qubits (dict)	: source node indexed mapping of assigned
-                             qubits.
-             routes (dict)	: (node1,node2) indexed dictionary of qubit
-                             routes; node1 < node2
-             info (dict)	: dsescribe later ...
-    '''
+def repairEmbed(source, cell_map, paths, stats=False, fallback=True,
+                budget=None):
+    '''Repair an embedding with the module level embedder. See
+    EmbedderState.repairEmbed'''
+    return _state.repairEmbed(source, cell_map, paths, stats, fallback,
+                              budget)
 
-    global _source, _cell_flags, _numAdj, _qbitAdj
 
-    ### INITIALIZE ###
+def checkFeasible(source):
+    '''Feasibility pre-check with the module level embedder. See
+    EmbedderState.checkFeasible'''
+    return _state.checkFeasible(source)
 
-    initialize(source)
 
-    ### INITIAL SEED ###
+def getStats():
+    '''Phase timings and counters of the module level embedder's last
+    embedding'''
+    return _state.getStats()
 
-    # select first cell
-    cell = firstCell()
 
-    # select first qubit
-    qbit = firstQubit(cell)
+def mergeStats(total, stats):
+    '''Accumulate the timings and counters of stats into total, in place.
+    Keys missing from total are added'''
 
-    if qbit is None:
-        #print 'No suitable first qubit found'
-        sys.exit()
+    for key, val in stats.iteritems():
+        if isinstance(val, dict):
+            mergeStats(total.setdefault(key, {}), val)
+        else:
+            total[key] = total.get(key, 0) + val
+    return total
 
-    # take first qubit
-    assignQubit(cell, qbit)
 
-    # handle reservations
-    reserveQubits([qbit])
+def getProfile():
+    '''Cost profile of the module level embedder, see
+    EmbedderState.getProfile'''
+    return _state.getProfile()
 
-    # update do* lists
-    doNow = sorted(source[cell], key=lambda x: -_numAdj[x])
-    doNext = set()
 
-    ### GENERAL PLACEMENT LOOP ###
+def setProfile(profile):
+    '''Set a cost profile for the module level embedder only'''
+    _state.setProfile(profile)
 
-    # if doNow is non-empty, there are still cells to place
-    while doNow:
 
-        log('\n\n')
-        log('*'*50 + '\n')
-        log('*'*50 + '\n')
-        log('*'*50 + '\n')
-        log('toDo: %s\n' % str(doNow))
-        # place each cell in doNow
+def checkProfile(profile):
+    '''Raise KeyError if a cost profile sets an unknown constant'''
 
-        for cell in doNow:
+    embed, routing = profile.get('embed', {}), profile.get('routing', {})
+    for key in set(embed) - set(PROFILE_PARAMS):
+        raise KeyError('Unknown embed profile constant: %s' % key)
+    for key in set(routing) - set(Routing.PROFILE_PARAMS):
+        raise KeyError('Unknown routing profile constant: %s' % key)
 
-            # find qbit and paths from placed cells
-            qbit, paths = placeCell(cell)
 
-            # abort on failed placement
-            if qbit is None:
-                print 'No placement of cell %s found' % str(cell)
-                raise
+def profileFile(name):
+    '''File of a named cost profile in PROFILE_DIR. Names with a
+    directory or the .json extension are taken as file names'''
 
-            # assign qubit and paths
-            assignQubit(cell, qbit)
-            assignPaths(paths)
+    if os.path.dirname(name) or name.endswith('.json'):
+        return name
+    return os.path.join(PROFILE_DIR, name + '.json')
 
-            # handle reservations
-            reserveQubits([qbit])
 
-            # add unplaced adjacent cells to doNext
-            for c2 in source[cell]:
-                if not (_cell_flags[c2]['placed'] or c2 in doNow):
-                    doNext.add(c2)
+def loadProfile(name):
+    '''Load a cost profile by name or file name. The profile is checked but
+    not set, see EmbedderState.setProfile'''
 
-        # update doNow and clear doNext
+    fname = profileFile(name)
+    try:
+        with open(fname, 'r') as fp:
+            profile = json.load(fp)
+    except (IOError, ValueError) as e:
+        raise IOError('Failed to load profile %s: %s' % (fname, e))
 
-        doNow = sorted(doNext, key=lambda x: -_numAdj[x])
-        doNext.clear()
+    checkProfile(profile)
+    return profile
 
-    # post processing path shortening
-#    shorten_wire_paths()
 
-    checkSol()
-    log('\n\n***Embedding complete\n\n')
-    cell_map, paths = formatSol()
+def saveProfile(name, profile):
+    '''Write a cost profile by name or file name, see loadProfile'''
 
-    logSol(cell_map, paths)
-    killLog()
+    fname = profileFile(name)
+    if os.path.dirname(fname) and not os.path.isdir(os.path.dirname(fname)):
+        os.makedirs(os.path.dirname(fname))
 
-    if WRITE and write:
-        print 'writing solution',
-        try:
-            if not (WRITE_PATH is None):
-                fname = WRITE_PATH
-                fp = open(fname, 'w')
-            elif WRITE_DIR:
-                regex = re.compile('^sol[0-9]+$')   # default name format
-                old_sols = filter(regex.match, os.listdir(WRITE_DIR))
-                old_ext = map(lambda x: int(x[3::]), old_sols)  # 3 for 'sol'
-                old_max = max(old_ext) if len(old_ext) > 0 else -1
-                fname = WRITE_DIR + 'sol%d' % (old_max+1)
-            else:
-                fname = None
-                raise IOError('No valid file destination')
-
-            if not fname is None:
-                fp = open(fname, 'w')
-                writeSol(fp)
-                fp.close()
-        except IOError as e:
-            print e.message
-            print 'Invalid filename: %s' % fname
-
-    return cell_map, paths
+    with open(fname, 'w') as fp:
+        json.dump(profile, fp, indent=4, sort_keys=True,
+                  separators=(',', ': '))
+        fp.write('\n')
@@ -6,26 +6,15 @@
 # Last Modified: 06.05.2015
 #---------------------------------------------------------
 
+import numpy as np
+
 from math import exp
-from copy import deepcopy as cp
+from heapq import heappush, heappop
+from itertools import count
+from time import time
 
 ### GLOBALS ###
 
-# VARIABLES
-
-_paths = []         # potential paths during each iteration
-_allPaths = {}      # path for each route
-_curr_used = {}     # flag for path inclusion of a qbit (by any path)
-
-_is_shared = {}     # flag for qbit sharing between paths
-_is_used = {}       # count of number of paths through qbit
-_active = {}        # flag for active qbits
-
-_qbitAdj = {}       # adjacency dict for qubits
-
-_sharing_cost = 1.0    # cost scaler assigned for shared qbits
-_hist_cost = {}        # persistent cost
-
 # CONSTANTS
 
 COST_BASE = 1.0             # base cost for adding a new qubit
@@ -37,284 +26,365 @@ INC_SHARING = 1.0       # increment in sharing cost per iteration
 BREAK_SHARING = 20      # threshold for sharing cost to assert failed routing
 RATE_FORGET = 0.001     # forget rate for hist_cost: as exp(-RATE_FORGET)
 
+# constants which can be set by a cost profile for each router, see
+# embed.loadProfile
+PROFILE_PARAMS = ['COST_BASE', 'COST_HISTORY', 'INC_SHARING', 'BREAK_SHARING',
+                  'RATE_FORGET']
 
-def initialize(qbitAdj):
-    '''Initialise routing solver. Only call once per embedding trial'''
-    global _paths, _allPaths, _curr_used, _is_shared
-    global _is_used, _active, _qbitAdj, _hist_cost, _sharing_cost
-
-    _qbitAdj = cp(qbitAdj)
 
-    _paths, _allPaths = [], {}
-    _curr_used, _is_shared, _is_used, _active, _hist_cost = {}, {}, {}, {}, {}
+class Router:
+    '''Negotiated congestion router for qubit chains. Each instance holds its
+    own routing state for a single target graph'''
 
-    _sharing_cost = 1.0
+    def __init__(self, graph=None):
+        '''Create a router, initialised for the given ChimeraGraph if any'''
 
-    for key in qbitAdj:
-        _curr_used[key] = False
-        _is_shared[key] = False
-        _is_used[key] = 0
-        _active[key] = True
-        _hist_cost[key] = 0
+        self._paths = []        # search frontier heap of (cost, order, qbit)
+        self._parent = []       # qbit indexed parent in the search tree
+        self._cost = []         # qbit indexed path cost in the search tree
+        self._allPaths = {}     # path for each route
+        self._curr_used = []    # flag for path inclusion of a qbit
 
+        self._is_shared = set()     # set of qbits shared between paths
+        self._is_used = []      # count of number of paths through qbit
+        self._num_ends = []     # count of number of paths ending on qbit
+        self._active = []       # flag for active qbits
 
-def resetFlags():
-    '''Reset is_shared and is_used flags'''
+        self._qbitAdj = []      # adjacency list for qubits, linear indexed
 
-    global _is_shared, _is_used, _allPaths
+        self._sharing_cost = 1.0    # cost scaler assigned for shared qbits
+        self._hist_cost = []        # persistent cost
 
-    for key in _is_shared:
-        _is_shared[key] = False
-        _is_used[key] = 0
+        self._num_iters = 0     # routing iterations since initialize
+        self._num_ripups = 0    # paths ripped up for rerouting
 
+        self.deadline = None    # time after which routing gives up, if any
 
-def updateFlags():
-    '''Update is_shared and is_used flags'''
-    global _allPaths, _is_shared, _is_used
+        # tunable cost constants of this router, see setProfile
+        self._consts = {key: globals()[key] for key in PROFILE_PARAMS}
 
-    resetFlags()
-    end_lists = {key: 0 for key in _is_shared}
+        if graph is not None:
+            self.initialize(graph)
 
-    # update used count
-    for path in _allPaths.values():
-        end_lists[path[0]] += 1
-        end_lists[path[-1]] += 1
-        for key in path:
-            _is_used[key] += 1
+    def initialize(self, graph):
+        '''Initialise routing solver for the given ChimeraGraph. Only call once
+        per embedding trial'''
 
-    # account for path ends
-    for key in end_lists:
-        if end_lists[key] > 1:
-            _is_used[key] -= (end_lists[key]-1)
+        self._qbitAdj = graph.adj    # read only, no need to copy
 
-    # flag shared qubits
-    for key in _is_shared:
-        if _is_used[key] > 1:
-            _is_shared[key] = True
+        self._paths, self._allPaths = [], {}
+        self._parent, self._cost = [None]*graph.size, [0]*graph.size
 
+        self._sharing_cost = 1.0
 
-def resetData():
-    '''Reset trial specific data'''
-    global _paths, _is_used, _qbitAdj, _sharing_cost
+        self._curr_used = np.zeros(graph.size, dtype=bool)
+        self._is_shared = set()
+        self._is_used = [0]*graph.size
+        self._num_ends = [0]*graph.size
+        self._active = np.ones(graph.size, dtype=bool)
+        self._hist_cost = np.zeros(graph.size, dtype=float)
 
-    _is_used = {k: 0 for k in _qbitAdj}
-    _paths = []
-    _sharing_cost = 1.0
+        self.initStats()
 
+    def setShared(self, qbits):
+        '''Update the is_shared flag of the given qbits'''
 
-def genHist():
-    '''Update hist_cost'''
-    global _hist_cost, _is_shared
+        for qbit in qbits:
+            if self._is_used[qbit] > 1:
+                self._is_shared.add(qbit)
+            else:
+                self._is_shared.discard(qbit)
 
-    for key in _hist_cost:
-        if _hist_cost[key] > 0:
-            _hist_cost[key] *= exp(-RATE_FORGET)
-        if _is_shared[key]:
-            _hist_cost[key] += COST_HISTORY
+    def addPath(self, key, path):
+        '''Add a routed path and update the is_used and is_shared flags of its
+        qbits. Paths sharing an end point only count once on that end point'''
 
+        for qbit in path:
+            self._is_used[qbit] += 1
 
-def sortPaths():
-    '''Sort paths by cost '''
-    global _paths
-
-    if len(_paths) == 0:
-        #print 'InternalRoutingError: no detected paths for indexOfPath'
-        return -1
-
-    # sort paths by cost
-    _paths.sort(key=lambda x: x[0])
-
-
-def nodeCost(qbit):
-    '''Calculate cost of given node'''
-    global _is_used, _is_shared, _hist_cost, _sharing_cost
-
-    if _is_shared[qbit]:
-        return _is_used[qbit]*(COST_BASE+_hist_cost[qbit])*_sharing_cost
-    else:
-        return _is_used[qbit]*(COST_BASE+_hist_cost[qbit])
-
+        for qbit in [path[0], path[-1]]:
+            self._num_ends[qbit] += 1
+            if self._num_ends[qbit] > 1:
+                self._is_used[qbit] -= 1
 
-def expandPath(unavailable = []):
-    '''Expand lowest cost path'''
-    global _paths, _is_used, _curr_used, _qbitAdj
+        self.setShared(path)
+        self._allPaths[key] = path
 
-    # select expanding path, remove path from list of paths
-    path = _paths.pop(0)
-    # possible extensions
-    extensions = [qb for qb in _qbitAdj[path[-1]] if not _curr_used[qb]]
+    def ripPath(self, key):
+        '''Remove a routed path and update the is_used and is_shared flags of
+        its qbits'''
 
-    new_paths = []
-    for qbit in extensions:
-        _curr_used[qbit] = True
-        # new path
-        temp_new = cp(path)
-        temp_new.append(qbit)
-        # new cost
-        _is_used[qbit] += 1            # cost including new qbit
-        temp_new[0] += nodeCost(qbit)
-        _is_used[qbit] -= 1            # qbit only used if goal reached
-        # add extended paths to list of paths
-        new_paths.append(temp_new)
+        path = self._allPaths.pop(key)
 
-    _paths += new_paths
-    return new_paths
+        for qbit in [path[0], path[-1]]:
+            if self._num_ends[qbit] > 1:
+                self._is_used[qbit] += 1
+            self._num_ends[qbit] -= 1
 
+        for qbit in path:
+            self._is_used[qbit] -= 1
+
+        self.setShared(path)
+
+    def resetFlags(self):
+        '''Rip up all paths, resetting the is_shared and is_used flags'''
 
-def bestPath(route, reserved):
-    '''Determine the best path for the given route'''
-    global _paths, _curr_used
+        for key in self._allPaths.keys():
+            self.ripPath(key)
 
-    if route[0] == route[1]:
-        print 'bestPath ERROR: start is same as goal!'
-        return 0
-
-    # initialise path
-    new_path, goal = [0, route[0]], route[1]    # first value of path is cost
-    _paths.append(new_path)     # add to paths
-    check = False
+    def resetData(self):
+        '''Reset trial specific data'''
 
-    # free reserved qbits
-    for qb in reserved[route[0]].union(reserved[route[1]]):
-        _curr_used[qb] = False
+        self.resetFlags()
+        self._paths = []
+        self._sharing_cost = 1.0
 
-    _curr_used[route[1]] = False    # free last qbit
+    def genHist(self):
+        '''Update hist_cost. Unused qbits have zero hist_cost so the forget
+        factor can be applied to all qbits at once'''
+
+        self._hist_cost *= exp(-self._consts['RATE_FORGET'])
+        for qbit in self._is_shared:
+            self._hist_cost[qbit] += self._consts['COST_HISTORY']
+
+    def nodeCost(self, qbit):
+        '''Calculate cost of given node'''
+
+        cost = self._is_used[qbit] * \
+            (self._consts['COST_BASE']+self._hist_cost[qbit])
+        if qbit in self._is_shared:
+            return cost*self._sharing_cost
+        else:
+            return cost
+
+    def expandPath(self, goal, order):
+        '''Expand lowest cost path. Each qbit joins the search tree when first
+        reached and is pushed onto the frontier with a unique insertion order,
+        so equal cost paths are expanded first come first served. Returns True
+        if the goal qbit was reached'''
+
+        # select expanding qbit, remove from frontier
+        cost, _, qbit = heappop(self._paths)
+
+        for qb in self._qbitAdj[qbit]:
+            if self._curr_used[qb]:
+                continue
+            self._curr_used[qb] = True
+            self._parent[qb] = qbit
+            # new cost
+            self._is_used[qb] += 1           # cost including new qbit
+            self._cost[qb] = cost+self.nodeCost(qb)
+            self._is_used[qb] -= 1           # qbit only used if goal reached
+            if qb == goal:
+                return True
+            # add extended path to frontier
+            heappush(self._paths, (self._cost[qb], next(order), qb))
+
+        return False
+
+    def bestPath(self, route, reserved):
+        '''Determine the best path for the given route'''
+
+        if route[0] == route[1]:
+            print 'bestPath ERROR: start is same as goal!'
+            return 0
+
+        # initialise path
+        start, goal = route
+        self._cost[start], self._parent[start] = 0, None
+        order = count(1)
+        self._paths = [(0, 0, start)]
+        check = False
 
-    while not check and _paths:
-        sortPaths()        # sort paths by increasing cost
-        new_paths = expandPath()    # expand cheapest path
-        # check for goal
-        for path in new_paths:
-            if path[-1] == goal:
-                check = True
-                output = path[1::]
-                break
+        # free reserved qbits
+        for qb in reserved[route[0]].union(reserved[route[1]]):
+            self._curr_used[qb] = False
+
+        self._curr_used[route[1]] = False    # free last qbit
+
+        while not check and self._paths:
+            check = self.expandPath(goal, order)     # expand cheapest path
 
-    if not check:
-        print 'bestPath ERROR: ran out of paths... unconnected graph?'
-        return 0
+        if not check:
+            print 'bestPath ERROR: ran out of paths... unconnected graph?'
+            return 0
 
-    # reset values
-    _paths = []
-    for key in _curr_used:
-        _curr_used[key] = False
+        # trace back path
+        output = [goal]
+        while output[-1] != start:
+            output.append(self._parent[output[-1]])
+        output.reverse()
+
+        # reset values
+        self._paths = []
+        self._curr_used[:] = False
+
+        return output
+
+    # not implemented
+    def writeToFile(self, writePath):
+        '''Write routing status to file'''
+
+        print('writeToFile for routing is not implemented')
+        return
+
+        fp = open(writePath, 'a')    # append to file
+        fp.write('new:\n')
+
+        for path in self._allPaths.values():
+            for qbit in path:
+                pass
+
+    def enableQubits(self, qbits):
+        '''enable given qubits if inactive'''
+
+        #print('\n***Enabling qubits: \n%s\n' % str(qbits))
+        for qbit in qbits:
+            # only enable inactive qubits in the current target graph
+            if not self._active[qbit]:
+                self._active[qbit] = True
+                self._hist_cost[qbit] = 0
+
+    def disableQubits(self, qbits):
+        '''disable given qubits if active'''
+
+        #print('\n***Disabling qubits: \n%s\n' % str(qbits))
+        for qbit in qbits:
+            # only disable active qubits in the current target graph
+            if self._active[qbit]:
+                self._active[qbit] = False
+                self._hist_cost[qbit] = COST_DISABLED
+
+    def resetQubits(self):
+        '''Reset active status and hist_cost of all qubits'''
+
+        self._active[:] = True
+        self._hist_cost[:] = 0
+
+    def getPaths(self):
+        '''Return paths'''
+        return self._allPaths
+
+    def getProfile(self):
+        '''Routing constants of this router, keyed by name'''
+        return dict(self._consts)
+
+    def setProfile(self, consts):
+        '''Set routing constants of this router only. Constants missing from
+        consts are unchanged'''
+
+        for key in set(consts) - set(PROFILE_PARAMS):
+            raise KeyError('Unknown routing profile constant: %s' % key)
+        self._consts.update(consts)
 
-    return output
+    def initStats(self):
+        '''Reset the routing iteration and rip-up counters'''
+        self._num_iters, self._num_ripups = 0, 0
 
+    def getStats(self):
+        '''Return the number of routing iterations and path rip-ups since the
+        last initialize'''
+        return {'route_iters': self._num_iters, 'ripups': self._num_ripups}
 
-# not implemented
-def writeToFile(writePath):
-    '''Write routing status to file'''
-    global _allPaths
+    def route(self, routes, reserved, writePath=''):
+        '''Run routing algorithm. Find the lowest cost mutual paths for the
+        list of routes to facilitate. Special consideration is given to
+        reserved qubits so they must be passed as an input.'''
 
-    print('writeToFile for routing is not implemented')
-    return
+        ## Reset Data
+        self.resetData()
 
-    fp = open(writePath, 'a')    # append to file
-    fp.write('new:\n')
+        ## Negotiated Congestion and Routing
 
-    for path in _allPaths.values():
-        for qbit in path:
-            pass
+        rt_set = set([it for rt in routes for it in rt])    # route qbits
+        res_qbits = set()   # set of reserved qubits.
+        for s in reserved:
+            res_qbits.update(s)
+        marked = list(rt_set | res_qbits)   # qbits unavailable to all routes
 
+        # enable end qubits for routes
+        self.enableQubits(rt_set)
 
-def enableQubits(qbits):
-    '''enable given qubits if inactive'''
-    global _active, _hist_cost
+        inc_sharing = self._consts['INC_SHARING']
+        break_sharing = self._consts['BREAK_SHARING']
 
-    #print('\n***Enabling qubits: \n%s\n' % str(qbits))
-    for qbit in qbits:
-        # only enable inactive qubits in the current target graph
-        if qbit in _active and _active[qbit] is False:
-            _active[qbit] = True
-            _hist_cost[qbit] = 0
+        # iteration loop
+        while True:
 
+            # release flags
+            self._num_iters += 1
+            self._num_ripups += len(self._allPaths)
+            self.resetFlags()
 
-def disableQubits(qbits):
-    '''disable given qubits if active'''
-    global _active, _hist_cost
+            for i in xrange(len(routes)):
+                # mark off all end-points and reserved qbits as used
+                self._curr_used[marked] = True
+                rt = routes[i]
+                # find best path for route
+                self.addPath(i, self.bestPath(rt, reserved))
 
-    #print('\n***Disabling qubits: \n%s\n' % str(qbits))
-    for qbit in qbits:
-        # only disable active qubits in the current target graph
-        if qbit in _active and _active[qbit] is True:
-            _active[qbit] = False
-            _hist_cost[qbit] = COST_DISABLED
+            self.genHist()   # update hist_cost
 
+            # write to file
+            if writePath:
+                self.writeToFile(writePath)
+
+            # update sharing cost
+            self._sharing_cost += inc_sharing
+            if self._sharing_cost > break_sharing or not self._is_shared:
+                break
 
-def resetQubits():
-    '''Reset active status and hist_cost of all qubits'''
+            # give up on unresolved sharing once past the deadline
+            if self.deadline is not None and time() > self.deadline:
+                return COST_BREAK
 
-    for qbit in _active:
-        _active[qbit] = True
-        _hist_cost[qbit] = 0
+        ## Handle end conditions
 
+        # No route found
+        if self._sharing_cost > break_sharing:
+                #print 'Routing BREAK ERROR: the routing timed out'
+                return COST_BREAK
 
-def getPaths():
-    '''Return paths'''
-    return _allPaths
+        # Compute total paths cost
+        cost = sum([self.nodeCost(x) for path in self._allPaths.values()
+                    for x in path])
 
-def Routing(routes, reserved, writePath=''):
-    '''Run routing algorithm. Find the lowest cost mutual paths for the list
-    of routes to facilitate. Special consideration is given to reserved qubits
-    so they must be passed as an input.'''
-    global _flags, _paths, _allPaths, _sharing_cost, _curr_used
+        # disable end points
+        self.disableQubits(rt_set)
 
-    ## Reset Data
-    resetData()
+        return cost
 
-    ## Negotiated Congestion and Routing
 
-    _is_shared[_is_shared.keys()[0]] = True    # set loop condition
+### MODULE INTERFACE ###
 
-    rt_set = set([it for rt in routes for it in rt])    # list of route qbits
-    res_qbits = set()   # set of reserved qubits.
-    for s in reserved.values():
-        res_qbits.update(s)
+_router = Router()  # router used by the module level interface
 
-    # enable end qubits for routes
-    enableQubits(rt_set)
 
-    # iteration loop
-    while any(_is_shared.values()):
+def initialize(graph):
+    '''Initialise the module level router for the given ChimeraGraph'''
+    _router.initialize(graph)
 
-        # release flags
-        resetFlags()
-        _allPaths = {}
 
-        for i in xrange(len(routes)):
-            # mark off all end-points as used
-            for rt in routes:
-                _curr_used[rt[0]] = True
-                _curr_used[rt[1]] = True
-            for qb in res_qbits:
-                _curr_used[qb] = True
-            rt = routes[i]
-            _allPaths[i] = bestPath(rt, reserved)  # find best path for route
-            updateFlags()                # update flags
+def enableQubits(qbits):
+    '''Enable qubits in the module level router'''
+    _router.enableQubits(qbits)
 
-        genHist()   # update hist_cost
 
-        # write to file
-        if writePath:
-            writeToFile(writePath)
+def disableQubits(qbits):
+    '''Disable qubits in the module level router'''
+    _router.disableQubits(qbits)
 
-        # update sharing cost
-        _sharing_cost += INC_SHARING
-        if _sharing_cost > BREAK_SHARING:
-            break
 
-    ## Handle end conditions
+def resetQubits():
+    '''Reset all qubits in the module level router'''
+    _router.resetQubits()
 
-    # No route found
-    if _sharing_cost > BREAK_SHARING:
-            #print 'Routing BREAK ERROR: the routing timed out'
-            return COST_BREAK
 
-    # Compute total paths cost
-    cost = sum([nodeCost(x) for path in _allPaths.values() for x in path])
+def getPaths():
+    '''Paths found by the module level router'''
+    return _router.getPaths()
 
-    # disable end points
-    disableQubits(rt_set)
 
-    return cost
+def Routing(routes, reserved, writePath=''):
+    '''Run the module level router. See Router.route'''
+    return _router.route(routes, reserved, writePath)
@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+
+#---------------------------------------------------------
+# Name: embed_file.py
+# Purpose: Reading and writing of single embedding files in the binary
+#          format and in the original text format
+# Author: Jacob Retallick
+# Created: 17.10.2026
+#---------------------------------------------------------
+
+import numpy as np
+import struct
+import json
+import re
+
+# The binary format is an 8 byte magic string, the byte length of a JSON
+# metadata block as a little-endian uint32, the metadata padded to a multiple
+# of 8 bytes, and a single little-endian int32 array holding in order: the
+# cell labels, the model offsets (one more than the number of cells) and the
+# models as 0-indexed linear qubit indices in the embedding's M x N x L
+# active range. The model of cells[i] is qbits[offsets[i]:offsets[i+1]].
+
+MAGIC = 'QCAEMB01'
+BIN_EXT = '.emb'    # default extension of binary embedding files
+TEXT_EXT = '.txt'   # default extension of text embedding files
+
+# metadata keys in text file order, paths are relative to the file
+META_KEYS = ['chimera_file', 'qca_file', 'full_adj', 'use_dense',
+             'M', 'N', 'L', 'M0', 'N0']
+
+_DTYPE = np.dtype('<i4')
+
+
+def is_binary(fname):
+    '''Check whether a file is a binary embedding file'''
+
+    try:
+        with open(fname, 'rb') as fp:
+            return fp.read(len(MAGIC)) == MAGIC
+    except IOError:
+        return False
+
+
+def write_binary(fname, meta, models):
+    '''Write an embedding to file in the binary format.
+
+    inputs: fname (str)     : output filename
+            meta (dict)     : values of META_KEYS
+            models (dict)   : cell keyed lists of local (m, n, h, l) qubits
+    '''
+
+    M, N, L = meta['M'], meta['N'], meta['L']
+
+    cells = sorted(models)
+    sizes = [len(models[cell]) for cell in cells]
+    offsets = np.zeros(len(cells)+1, dtype=int)
+    offsets[1:] = np.cumsum(sizes)
+
+    qbits = np.array([qb for cell in cells for qb in models[cell]],
+                     dtype=int).reshape([-1, 4])
+    qbits = np.ravel_multi_index(qbits.T, [M, N, 2, L])
+
+    header = {key: meta[key] for key in META_KEYS}
+    header['cells'] = len(cells)
+    header['qbits'] = int(offsets[-1])
+    header = json.dumps(header, sort_keys=True)
+    header += ' '*(-(len(MAGIC)+4+len(header)) % 8)
+
+    try:
+        fp = open(fname, 'wb')
+    except:
+        print('Failed to open file: {0}'.format(fname))
+        raise IOError
+
+    fp.write(MAGIC)
+    fp.write(struct.pack('<I', len(header)))
+    fp.write(header)
+    data = np.concatenate([cells, offsets, qbits]).astype(_DTYPE)
+    fp.write(data.tostring())
+    fp.close()
+
+
+def read_binary(fname):
+    '''Memory-map a binary embedding file. Returns the metadata dict and the
+    cells, offsets and qbits arrays, which are read only views of the file'''
+
+    try:
+        fp = open(fname, 'rb')
+    except:
+        print('Failed to open file: {0}'.format(fname))
+        raise IOError
+
+    if fp.read(len(MAGIC)) != MAGIC:
+        fp.close()
+        print('Not a binary embedding file: {0}'.format(fname))
+        raise IOError
+
+    size, = struct.unpack('<I', fp.read(4))
+    meta = json.loads(fp.read(size))
+    fp.close()
+
+    nc, nq = meta['cells'], meta['qbits']
+    data = np.memmap(fname, dtype=_DTYPE, mode='r',
+                     offset=len(MAGIC)+4+size, shape=(2*nc+1+nq,))
+
+    return meta, data[:nc], data[nc:2*nc+1], data[2*nc+1:]
+
+
+def load_binary(fname):
+    '''Load an embedding from a binary file. Returns the metadata dict and
+    the cell keyed lists of local (m, n, h, l) qubits'''
+
+    meta, cells, offsets, qbits = read_binary(fname)
+
+    tups = np.unravel_index(qbits, [meta['M'], meta['N'], 2, meta['L']])
+    tups = zip(*[x.tolist() for x in tups])
+    offsets = offsets.tolist()
+    models = {cell: tups[offsets[i]:offsets[i+1]]
+              for i, cell in enumerate(cells.tolist())}
+
+    return {key: meta[key] for key in META_KEYS}, models
+
+
+def write_text(fname, meta, models):
+    '''Write an embedding to file in the text format. Inputs as in
+    write_binary'''
+
+    try:
+        fp = open(fname, 'w')
+    except:
+        print('Failed to open file: {0}'.format(fname))
+        raise IOError
+
+    # chimera and qca file
+    fp.write('chimera_file: {0}\n'.format(meta['chimera_file']))
+    fp.write('qca_file: {0}\n\n'.format(meta['qca_file']))
+
+    # adjacency and embedding type
+    fp.write('full_adj: {0}\n'.format(meta['full_adj']))
+    fp.write('use_dense: {0}\n\n'.format(meta['use_dense']))
+
+    # chimera parameters
+    for key in ['M', 'N', 'L', 'M0']:
+        fp.write('{0}: {1}\n'.format(key, meta[key]))
+    fp.write('N0: {0}\n\n'.format(meta['N0']))
+
+    # cell models
+    for cell in models:
+        fp.write('{0}: {1}\n'.format(cell,
+                 ';'.join(str(tuple(qb)) for qb in models[cell])))
+
+    fp.close()
+
+
+def load_text(fname):
+    '''Load an embedding from a text file. Returns as load_binary'''
+
+    try:
+        fp = open(fname, 'r')
+    except:
+        print('Failed to open file: {0}'.format(fname))
+        raise IOError
+
+    # parse file
+    info = {}
+    cells = []
+    for line in fp:
+        if '#' in line or len(line) < 3:
+            continue
+        key, data = [x.strip() for x in line.split(':')]
+        info[key] = data
+        if key.isdigit():
+            cells.append(key)
+    fp.close()
+
+    meta = {key: info[key] for key in META_KEYS}
+    for key in ['full_adj', 'use_dense']:
+        meta[key] = info[key] == 'True'
+    for key in ['M', 'N', 'L', 'M0', 'N0']:
+        meta[key] = int(info[key])
+
+    regex = re.compile('[0-9]+')
+    str_to_tuple = lambda s: tuple([int(x) for x in regex.findall(s)])
+    models = {int(cell): [str_to_tuple(s) for s in info[cell].split(';')]
+              for cell in cells}
+
+    return meta, models
+
+
+def load_embedding(fname):
+    '''Load an embedding file in either format. Returns as load_binary'''
+
+    if is_binary(fname):
+        return load_binary(fname)
+    return load_text(fname)
+
+
+def save_embedding(fname, meta, models, binary=True):
+    '''Write an embedding file in the binary or text format'''
+
+    if binary:
+        write_binary(fname, meta, models)
+    else:
+        write_text(fname, meta, models)
@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+
+#---------------------------------------------------------
+# Name: packing.py
+# Purpose: Packing of multiple independent circuit instances into disjoint
+#          tile windows of one Chimera graph
+# Author: Jacob Retallick
+# Created: 17.10.2026
+#---------------------------------------------------------
+
+import numpy as np
+
+from core.classes import Embedding
+from core.cache import find_placement
+
+MAX_DENSE_RUNS = 12     # dense placement runs per instance before giving up
+MAX_WINDOW_RUNS = 3     # windows of one size tried before growing the window
+
+
+def window_adj(chimera_adj, free, M0, N0, M, N):
+    '''Adjacency dict of the M x N window of tiles at (M0, N0), offset to
+    zero. Qubits of tiles not in the free set are dropped'''
+
+    check = lambda m, n, h, l: M0 <= m < M0+M and N0 <= n < N0+N and \
+        (m, n) in free
+    offset = lambda m, n, h, l: (m-M0, n-N0, h, l)
+
+    return {offset(*q1): [offset(*q2) for q2 in chimera_adj[q1] if check(*q2)]
+            for q1 in chimera_adj if check(*q1)}
+
+
+def free_windows(free, M, N, bm, bn):
+    '''Generate the offsets of all bm x bn windows of free tiles in an M x N
+    processor, row by row from the top left'''
+
+    for m0 in xrange(M-bm+1):
+        for n0 in xrange(N-bn+1):
+            if all((m, n) in free for m in xrange(m0, m0+bm)
+                   for n in xrange(n0, n0+bn)):
+                yield m0, n0
+
+
+def ranked_windows(chimera_adj, free, M, N, bm, bn):
+    '''Offsets of all bm x bn windows of free tiles, ordered by decreasing
+    number of active qubits and then row by row from the top left'''
+
+    active = {}
+    for m, n, h, l in chimera_adj:
+        if chimera_adj[(m, n, h, l)]:
+            active[(m, n)] = active.get((m, n), 0) + 1
+
+    score = lambda m0, n0: sum(active.get((m, n), 0)
+                               for m in xrange(m0, m0+bm)
+                               for n in xrange(n0, n0+bn))
+
+    return sorted(free_windows(free, M, N, bm, bn),
+                  key=lambda w: -score(*w))
+
+
+def grow_window(bm, bn, suggest, M, N):
+    '''Size of the next window after a failed dense placement run: the
+    suggested size clamped to the processor if that is larger, otherwise one
+    more tile row or column along the shorter side which can still grow.
+    Returns None if the window already spans the processor'''
+
+    if suggest is not None:
+        sm, sn = min(max(suggest[0], bm), M), min(max(suggest[1], bn), N)
+        if (sm, sn) != (bm, bn):
+            return sm, sn
+
+    if bm < M and (bm <= bn or bn >= N):
+        return bm+1, bn
+    if bn < N:
+        return bm, bn+1
+    return None
+
+
+def bounding_box(models):
+    '''Tile offset and size (M0, N0, M, N) of the tiles used by the models'''
+
+    qbits = [qb for cell in models for qb in models[cell]]
+    M0, N0 = min(q[0] for q in qbits), min(q[1] for q in qbits)
+    return M0, N0, max(q[0] for q in qbits)-M0+1, \
+        max(q[1] for q in qbits)-N0+1
+
+
+def make_instance(base, models, chimera_adj):
+    '''Embedding of the circuit of base with the given models in processor
+    coordinates. The active range is the bounding box of the models'''
+
+    M0, N0, M, N = bounding_box(models)
+
+    inst = Embedding(base.qca_file)
+    inst.set_embedder(base.use_dense)
+    inst.set_qca(base.J, base.cells, base.full_adj)
+    inst.set_chimera(None, {'M': [M0, M0+M], 'N': [N0, N0+N]}, M, N)
+    inst.chimera_adj = inst.refine_chimera(chimera_adj)
+    inst.models = {cell: [(m-M0, n-N0, h, l) for m, n, h, l in models[cell]]
+                   for cell in models}
+    inst.good = True
+
+    return inst
+
+
+def dense_instance(base, chimera_adj, free, M, N, size=None):
+    '''Run dense placement of the circuit of base in windows of free tiles.
+    Windows start at the given size, or the smallest square which could hold
+    one qubit per cell, clamped to the processor. Up to MAX_WINDOW_RUNS
+    windows of each size are tried, those with the most active qubits
+    first, before the window grows. Once it spans the processor the
+    remaining windows are tried. Returns the models in processor coordinates
+    or None'''
+
+    L = base.L or 4
+    if size is None:
+        cells = len(base.get_reduced_qca_adj()[0])
+        side = int(np.ceil(np.sqrt(cells/(2.*L))))
+        size = (side, side)
+    bm, bn = min(size[0], M), min(size[1], N)
+
+    runs = 0
+    while True:
+        # no larger window can be free if none of this size is
+        windows = ranked_windows(chimera_adj, free, M, N, bm, bn)
+        if not windows:
+            return None
+
+        suggest = None
+        for count, (M0, N0) in enumerate(windows, 1):
+            if runs >= MAX_DENSE_RUNS:
+                return None
+            runs += 1
+
+            trial = Embedding(base.qca_file)
+            trial.set_embedder(True)
+            trial.set_qca(base.J, base.cells, base.full_adj)
+            trial.set_chimera(window_adj(chimera_adj, free, M0, N0, bm, bn),
+                              {'M': [M0, M0+bm], 'N': [N0, N0+bn]}, bm, bn, L)
+            trial.run_embedding()
+
+            if trial.good:
+                return {cell: [(m+M0, n+N0, h, l) for m, n, h, l in
+                               trial.models[cell]] for cell in trial.models}
+
+            # grow once enough windows of this size have failed, as
+            # suggested by the pre-check if possible
+            suggest = trial.suggest_range()
+            if count >= MAX_WINDOW_RUNS and \
+                    grow_window(bm, bn, suggest, M, N) is not None:
+                break
+
+        size = grow_window(bm, bn, suggest, M, N)
+        if size is None:
+            return None
+        bm, bn = size
+
+
+def pack_circuits(circuits, chimera_adj, M, N, counts=None, verbose=True):
+    '''Place as many instances of the given circuits as possible in disjoint
+    tile windows of a Chimera graph. Circuits take turns, so instance counts
+    stay balanced. The first instance of each circuit is found by dense
+    placement and later instances reuse it at any free tile offset or
+    Chimera symmetry, falling back to dense placement where defects or used
+    tiles prevent this.
+
+    inputs: circuits (list)     : Embedding objects with the qca structure set
+            chimera_adj (dict)  : full adjacency dict of the M x N processor
+            M, N (int)          : number of tile rows and columns
+            counts (list)       : maximum number of instances of each
+                                  circuit, no limit if None
+
+    output: instances (list)    : (circuit index, Embedding) pairs of the
+                                  placed instances, in placement order
+    '''
+
+    free = set((m, n) for m in xrange(M) for n in xrange(N))
+    templates = [None]*len(circuits)    # models of the first instances
+    placed = [0]*len(circuits)
+    instances = []
+
+    active = range(len(circuits))
+    while active:
+        for ind in list(active):
+            if counts is not None and placed[ind] >= counts[ind]:
+                active.remove(ind)
+                continue
+
+            base = circuits[ind]
+            models = None
+            if templates[ind] is not None:
+                qca_adj = base.get_reduced_qca_adj()[1]
+                free_adj = window_adj(chimera_adj, free, 0, 0, M, N)
+                models = find_placement(templates[ind], qca_adj, free_adj,
+                                        M, N)
+            if models is None:
+                size = None
+                if templates[ind] is not None:
+                    size = bounding_box(templates[ind])[2:]
+                models = dense_instance(base, chimera_adj, free, M, N, size)
+            if models is None:
+                active.remove(ind)
+                continue
+
+            if templates[ind] is None:
+                M0, N0 = bounding_box(models)[:2]
+                templates[ind] = {cell: [(m-M0, n-N0, h, l) for m, n, h, l
+                                         in models[cell]] for cell in models}
+
+            inst = make_instance(base, models, chimera_adj)
+            M0, N0 = inst.active_range['M'][0], inst.active_range['N'][0]
+            free.difference_update((m, n) for m in xrange(M0, M0+inst.M)
+                                   for n in xrange(N0, N0+inst.N))
+            instances.append((ind, inst))
+            placed[ind] += 1
+
+            if verbose:
+                print('Placed instance {0} of circuit {1} in tiles '
+                      '{2}x{3} at ({4}, {5})'.format(placed[ind], ind,
+                                                    inst.M, inst.N, M0, N0))
+
+    return instances
@@ -2,6 +2,7 @@ from PyQt4 import QtGui, QtCore
 from core.dwave_sol import DWAVE_Sol
 from core.matrix_seriation import seriate
 from core.chimera import tuple_to_linear
+from core.embed_file import load_embedding
 
 import sys, os, re, json
 
@@ -327,45 +328,23 @@ class MainWindow(QtGui.QMainWindow):
         ''' '''
 
         try:
-            fp = open(fname, 'r')
-        except IOError:
+            meta, models = load_embedding(fname)
+        except (IOError, KeyError, ValueError):
             print('Failed to load embed file: {0}'.format(os.path.basename(fname)))
             raise IOError
 
         dir_name = os.path.dirname(fname)
 
-        all_data = [{}]
-        data = all_data[-1]
-
-        for line in fp:
-            if len(line)<3:
-                if data:
-                    all_data.append({})
-                    data = all_data[-1]
-            else:
-                key, s = line.split(':')
-                data[key] = s.strip()
-        if not all_data[-1]:
-            all_data.pop()
-
-        fp.close()
-
-        chim_file = os.path.join(dir_name, all_data[0]['chimera_file'])
-        qca_file = os.path.join(dir_name, all_data[0]['qca_file'])
-
-        full_adj = all_data[1]['full_adj'] == 'True'
-        use_dense = all_data[1]['use_dense'] == 'True'
+        chim_file = os.path.join(dir_name, meta['chimera_file'])
+        qca_file = os.path.join(dir_name, meta['qca_file'])
 
-        M, N, L, M0, N0 = [int(all_data[2][k]) for k in ['M', 'N', 'L', 'M0', 'N0']]
-        regex = re.compile('[0-9]+')
-        fmap = lambda qb: [int(x) for x in regex.findall(qb)]
-        models = {int(k): [fmap(qb) for qb in all_data[3][k].split(';')]  for k in all_data[3]}
+        full_adj = meta['full_adj']
+        use_dense = meta['use_dense']
 
         # append M0, N0 to models
-        for k in models:
-            for qb in models[k]:
-                qb[0] += M0
-                qb[1] += N0
+        M0, N0 = meta['M0'], meta['N0']
+        models = {k: [[m+M0, n+N0, h, l] for m, n, h, l in models[k]]
+                  for k in models}
 
         # format output to dict
         output = {'chim_file':  chim_file,
@@ -312,13 +312,14 @@ class ChimeraWidget(QtGui.QScrollArea):
         self.canvas.setLayout(self.layout)
 
     def updateChimera(self, filename):
-        '''Process a chimera specification file and update the widget'''
+        '''Process a chimera specification file and update the widget.
+        Returns True if the file was loaded'''
 
         try:
             M, N, adj = load_chimera_file(filename)
         except IOError:
             print('Failed to load given file...')
-            return
+            return False
 
         # forget old grid layout
         for tile in self.tiles:
@@ -352,6 +353,8 @@ class ChimeraWidget(QtGui.QScrollArea):
 
         self.canvas.update()
 
+        return True
+
     def onTileClick(self, m, n):
         '''If a tile is clicked and shift-flag False, start subgraph
         select. If a tile is clicked and shift-flag True, end subgraph
@@ -520,6 +523,21 @@ class ChimeraWidget(QtGui.QScrollArea):
 
         return M, N, adj, self.active_range
 
+    def getFreeGraph(self):
+        '''Return the adjacency dict of the full chimera graph without the
+        qubits used by embeddings'''
+
+        node_check = lambda m, n, h, l: len(self.adj[(m, n, h, l)]) > 0 and\
+            not self.tiles[(m, n)].nodes[(h, l)].used
+
+        adj = {k1: [] for k1 in self.adj}
+
+        for k1 in adj:
+            if node_check(*k1):
+                adj[k1] = [k2 for k2 in self.adj[k1] if node_check(*k2)]
+
+        return adj
+
     # ADD EMBEDDING
 
     def addEmbedding(self, embedding, ind):
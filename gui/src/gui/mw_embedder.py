@@ -16,7 +16,10 @@ import gui_settings as settings
 from qca_widget import QCAWidget
 from chimera_widget import ChimeraWidget
 from core.classes import Embedding, get_embedder_flags
+from core.packing import pack_circuits
 from core.chimera import tuple_to_linear
+from core.embed_file import save_embedding, BIN_EXT, TEXT_EXT
+import core.core_settings as core_settings
 
 class MainWindow(QtGui.QMainWindow):
     '''Main Window widget for embedder application'''
@@ -43,6 +46,7 @@ class MainWindow(QtGui.QMainWindow):
         self.qca_active = False     # True when QCAWidget set
         self.full_adj = True        # True when using full adjacency
         self.use_dense = True       # True if using Dense Placement embedder
+        self.use_cache = True       # True if reusing cached embeddings
         self.tile_style = 0         # tile style
 
         self.embeddings = {}        # list of embeddings
@@ -75,8 +79,8 @@ class MainWindow(QtGui.QMainWindow):
 
         # Chimera widget
         self.chimera_widget = ChimeraWidget(self)
-        self.chimera_file = os.path.relpath(settings.CHIMERA_DEFAULT_FILE)
-        self.chimera_widget.updateChimera(self.chimera_file)
+        if self.chimera_widget.updateChimera(settings.CHIMERA_DEFAULT_FILE):
+            self.chimera_file = os.path.relpath(settings.CHIMERA_DEFAULT_FILE)
         self.action_save_chimera_svg.setEnabled(True)
 
         hbox.addWidget(self.qca_widget, stretch=4)
@@ -160,6 +164,16 @@ class MainWindow(QtGui.QMainWindow):
         self.action_heur_embed_flag = QtGui.QAction('Heuristic', self)
         self.action_heur_embed_flag.triggered.connect(self.switch_embedder)
 
+        self.action_cache_on_flag = QtGui.QAction('Use cached', self)
+        self.action_cache_on_flag.setStatusTip(
+            'Reuse cached embeddings of previously embedded circuits')
+        self.action_cache_on_flag.triggered.connect(self.switch_cache)
+
+        self.action_cache_off_flag = QtGui.QAction('Always re-embed', self)
+        self.action_cache_off_flag.setStatusTip(
+            'Run the embedder even if the circuit has a cached embedding')
+        self.action_cache_off_flag.triggered.connect(self.switch_cache)
+
         tile_func_ab = lambda: self.set_tile_style(0)
         tile_func_a = lambda: self.set_tile_style(-1)
         tile_func_b = lambda: self.set_tile_style(1)
@@ -176,6 +190,12 @@ class MainWindow(QtGui.QMainWindow):
         self.action_tile_B_flag.triggered.connect(tile_func_b)
         self.action_tile_B_flag.setEnabled(True)
 
+        self.action_pack = QtGui.QAction('Pack circuit...', self)
+        self.action_pack.setStatusTip(
+            'Fill the active range with instances of the displayed circuit')
+        self.action_pack.triggered.connect(self.pack_circuit)
+        self.action_pack.setEnabled(False)
+
         self.action_set_coupling = QtGui.QAction('Coupling Strength...', self)
         self.action_set_coupling.triggered.connect(self.set_coupling)
         self.action_set_coupling.setEnabled(True)
@@ -209,11 +229,20 @@ class MainWindow(QtGui.QMainWindow):
 
         print('Using dense embedder: {0}'.format(str(self.use_dense).upper()))
 
+        cache_menu = tool_menu.addMenu('Embedding cache')
+        cache_menu.addAction(self.action_cache_on_flag)
+        cache_menu.addAction(self.action_cache_off_flag)
+        cache_menu.setEnabled(core_settings.USE_CACHE)
+
+        self.action_cache_on_flag.setEnabled(not self.use_cache)
+        self.action_cache_off_flag.setEnabled(self.use_cache)
+
         tile_style_menu = tool_menu.addMenu('Tile style')
         tile_style_menu.addAction(self.action_tile_AB_flag)
         tile_style_menu.addAction(self.action_tile_A_flag)
         tile_style_menu.addAction(self.action_tile_B_flag)
 
+        tool_menu.addAction(self.action_pack)
         tool_menu.addAction(self.action_set_coupling)
 
     def init_toolbar(self):
@@ -299,6 +328,14 @@ class MainWindow(QtGui.QMainWindow):
         self.action_heur_embed_flag.setEnabled(not self.use_dense)
         self.use_dense = not self.use_dense
 
+    def switch_cache(self):
+        '''Change between reusing cached embeddings and always re-embedding,
+        and set menu enabling'''
+
+        self.action_cache_on_flag.setEnabled(self.use_cache)
+        self.action_cache_off_flag.setEnabled(not self.use_cache)
+        self.use_cache = not self.use_cache
+
     def set_tile_style(self, style):
         ''' '''
 
@@ -361,7 +398,7 @@ class MainWindow(QtGui.QMainWindow):
 
             # run embedding
             try:
-                embedding.run_embedding()
+                embedding.run_embedding(lookup=self.use_cache)
             except Exception as e:
                 if type(e).__name__ == 'KeyboardInterrupt':
                     print('Embedding interrupted...')
@@ -376,6 +413,58 @@ class MainWindow(QtGui.QMainWindow):
             self.addEmbedding(embedding)
         else:
             print('Embedding failed...')
+            size = embedding.suggest_range()
+            if size is not None:
+                print('Try an active range of at least {0}x{1} tiles'.format(
+                    *size))
+
+    def pack_circuit(self):
+        '''Place as many instances of the displayed circuit as fit, or a
+        chosen number, in disjoint tile windows of the active range. Each
+        instance is added as an embedding, so all can be exported to one
+        coefficient file'''
+
+        count, ok = QtGui.QInputDialog.getInt(self, 'Dialog',
+            'Number of instances (0 for as many as fit):', value=0, min=0)
+
+        if not ok:
+            return
+
+        print('Packing circuit...')
+
+        try:
+            M, N, chimera_adj, active_range = \
+                self.chimera_widget.getActiveGraph()
+
+            # apply tile style
+            chimera_adj, L = self.apply_tile_style(chimera_adj)
+
+            J, cells = self.qca_widget.prepareCircuit()
+            base = Embedding(self.qca_widget.filename)
+            base.set_qca(J, cells, self.full_adj)
+
+            instances = pack_circuits([base], chimera_adj, M, N,
+                                      counts=[count] if count else None)
+        except Exception as e:
+            if type(e).__name__ == 'KeyboardInterrupt':
+                print('Packing interrupted...')
+            else:
+                print('Something went wrong...')
+            return
+
+        if not instances:
+            print('No instance of the circuit fits in the active range...')
+            return
+
+        # instance windows are relative to the active range
+        dm, dn = active_range['M'][0], active_range['N'][0]
+        for ind, embedding in instances:
+            embedding.active_range = {
+                'M': [m+dm for m in embedding.active_range['M']],
+                'N': [n+dn for n in embedding.active_range['N']]}
+            self.addEmbedding(embedding)
+
+        print('Packed {0} instances'.format(len(instances)))
 
     def addEmbedding(self, embedding):
         '''Add an embedding object'''
@@ -555,8 +644,9 @@ class MainWindow(QtGui.QMainWindow):
         fp.write('chimera_file: {0}\n\n'.format(chim_file))
 
         # embedding files
+        ext = BIN_EXT if core_settings.EMBED_FORMAT == 'binary' else TEXT_EXT
         for ind in self.embeddings:
-            fp.write('{0}: {0}.txt\n'.format(ind))
+            fp.write('{0}: {0}{1}\n'.format(ind, ext))
 
         fp.close()
 
@@ -577,39 +667,23 @@ class MainWindow(QtGui.QMainWindow):
         self.save_embedding(embedding, fname)
 
     def save_embedding(self, embedding, fname):
-        '''Save a single embedding to file'''
-
-        try:
-            fp = open(fname, 'w')
-        except:
-            print('Failed to open file: {0}'.format(fp))
-            raise IOError
-
-        # chimera file
-        chim_file = os.path.relpath(self.chimera_file, os.path.dirname(fname))
-        fp.write('chimera_file: {0}\n'.format(chim_file))
-
-        # qca file
-        qca_file = os.path.relpath(embedding.qca_file, os.path.dirname(fname))
-        fp.write('qca_file: {0}\n\n'.format(qca_file))
-
-        # adjacency and embedding type
-        fp.write('full_adj: {0}\n'.format(embedding.full_adj))
-        fp.write('use_dense: {0}\n\n'.format(embedding.use_dense))
-
-        # chimera parameters
-        fp.write('M: {0}\n'.format(embedding.M))
-        fp.write('N: {0}\n'.format(embedding.N))
-        fp.write('L: {0}\n'.format(embedding.L))
-        fp.write('M0: {0}\n'.format(embedding.active_range['M'][0]))
-        fp.write('N0: {0}\n\n'.format(embedding.active_range['N'][0]))
-
-        # cell models
-        for cell in embedding.models:
-            fp.write('{0}: {1}\n'.format(cell,
-                     ';'.join(str(qb) for qb in embedding.models[cell])))
-
-        fp.close()
+        '''Save a single embedding to file. Files with the text extension
+        are written in the text format, otherwise EMBED_FORMAT is used'''
+
+        dir_name = os.path.dirname(fname)
+        meta = {'chimera_file': os.path.relpath(self.chimera_file, dir_name),
+                'qca_file': os.path.relpath(embedding.qca_file, dir_name),
+                'full_adj': embedding.full_adj,
+                'use_dense': embedding.use_dense,
+                'M': embedding.M,
+                'N': embedding.N,
+                'L': embedding.L,
+                'M0': embedding.active_range['M'][0],
+                'N0': embedding.active_range['N'][0]}
+
+        binary = core_settings.EMBED_FORMAT == 'binary' and \
+            not fname.endswith(TEXT_EXT)
+        save_embedding(fname, meta, embedding.models, binary=binary)
 
     def save_all_embeddings(self):
         '''Save all embeddings to a directory with an embed (summary) file'''
@@ -653,16 +727,21 @@ class MainWindow(QtGui.QMainWindow):
             self.create_embed_file(os.path.join(dir_name, 'summary.embed'))
 
             # save each embedding
+            ext = BIN_EXT if core_settings.EMBED_FORMAT == 'binary' \
+                else TEXT_EXT
             for ind in self.embeddings:
-                fname = os.path.join(dir_name, '{0}.txt'.format(ind))
+                fname = os.path.join(dir_name, '{0}{1}'.format(ind, ext))
                 self.save_embedding(self.embeddings[ind], fname)
         except IOError:
             print('Failed to save embeddings...')
             return
 
-    def load_embedding(self, fname, chimera_adj):
+    def load_embedding(self, fname):
         ''' '''
 
+        # qubits of embeddings already loaded are not available
+        chimera_adj = self.chimera_widget.getFreeGraph()
+
         # create embedding
         embedding = Embedding()
         try:
@@ -675,6 +754,13 @@ class MainWindow(QtGui.QMainWindow):
             print('Failed to load embedding')
             return
 
+        # relocate embeddings from other chimera graphs, or which overlap
+        # embeddings already loaded
+        if not (embedding.native and embedding.fits(chimera_adj)) and \
+                not embedding.relocate(chimera_adj):
+            print('No valid placement of the embedding in this chimera graph')
+            return
+
         self.addEmbedding(embedding)
 
     def load_embed_file(self):
@@ -711,18 +797,26 @@ class MainWindow(QtGui.QMainWindow):
 
         # delete all embeddings
         self.reset()
-        ndir = os.path.dirname(fname)
-        chim_file = os.path.normpath(os.path.join(ndir, info['chimera_file']))
-        self.chimera_widget.updateChimera(chim_file)
-        M, N, chimera_adj, active_range = self.chimera_widget.getActiveGraph()
+
+        # embeddings are placed in the current chimera graph, relocating them
+        # if needed, so only use the embed file's graph if none is loaded
+        if not self.chimera_file:
+            ndir = os.path.dirname(fname)
+            chim_file = os.path.normpath(os.path.join(ndir,
+                                                      info['chimera_file']))
+            if not self.chimera_widget.updateChimera(chim_file):
+                return
+            self.chimera_file = os.path.relpath(chim_file)
+
         for ind in inds:
             ndir = os.path.dirname(fname)
             fn = os.path.normpath(os.path.join(ndir, info[str(ind)]))
-            self.load_embedding(fn, chimera_adj)
+            self.load_embedding(fn)
 
         if not self.qca_active:
             self.qca_active = True
             self.action_embed.setEnabled(True)
+            self.action_pack.setEnabled(True)
             self.action_switch_adj.setEnabled(True)
 
     def load_qca_file(self):
@@ -750,6 +844,7 @@ class MainWindow(QtGui.QMainWindow):
         if not self.qca_active:
             self.qca_active = True
             self.action_embed.setEnabled(True)
+            self.action_pack.setEnabled(True)
             self.action_switch_adj.setEnabled(True)
             self.action_save_qca_svg.setEnabled(True)
 
@@ -766,8 +861,8 @@ class MainWindow(QtGui.QMainWindow):
         fdir = os.path.dirname(fname)
         self.chimera_dir = fdir
 
-        self.chimera_widget.updateChimera(fname)
-        self.chimera_file = os.path.relpath(fname)
+        if self.chimera_widget.updateChimera(fname):
+            self.chimera_file = os.path.relpath(fname)
 
     def export_coefs(self):
         '''Determine the smallest set of files which need to be produced to
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+
+#---------------------------------------------------------
+# Name: bench_routing.py
+# Purpose: Micro-benchmark of the negotiated congestion router used by
+#          Dense Placement on dense multi-route instances
+# Author: Jacob Retallick
+# Created: 2026.10.17
+#---------------------------------------------------------
+
+import numpy as np
+import random
+import sys
+
+from time import time
+
+import dense_placement.embed as embed
+import dense_placement.routing as Routing
+
+M, N, L = 12, 12, 4     # target Chimera size
+WINDOW = 3              # side length of the tile window containing the routes
+ROUTES = [2, 4, 6, 8]   # number of routes per instance
+TRIALS = 50             # number of random instances per route count
+
+
+def gen_routes(graph, num_routes, rng):
+    '''Generate num_routes routes between random qubits in a WINDOW x WINDOW
+    block of tiles at the processor centre. Routes are grouped into stars,
+    each sharing a target qubit, as in Dense Placement cell placement'''
+
+    r0, c0 = (M-WINDOW)//2, (N-WINDOW)//2
+    pool = [qb for qb in xrange(graph.size) if graph.degree[qb] > 0 and
+            r0 <= graph.row[qb] < r0+WINDOW and c0 <= graph.col[qb] < c0+WINDOW]
+    qbits = rng.sample(pool, 2*num_routes)
+
+    routes = []
+    while len(routes) < num_routes:
+        target = qbits.pop()
+        for _ in xrange(min(rng.randint(1, 4), num_routes-len(routes))):
+            routes.append([qbits.pop(), target])
+
+    return routes
+
+
+def run_bench(num_routes, trials=TRIALS, seed=0):
+    '''Time Router.route over random instances with num_routes routes'''
+
+    state = embed.EmbedderState(M, N, L)
+    state.setQbitAdj(state.getCouplerFlags())
+    graph = state._graph
+    reserved = [set() for _ in xrange(graph.size)]
+    router = Routing.Router()
+
+    rng = random.Random(seed)
+    instances = [gen_routes(graph, num_routes, rng) for _ in xrange(trials)]
+
+    success, costs, dts = 0, [], []
+    for routes in instances:
+        router.initialize(graph)
+        t = time()
+        cost = router.route(routes, reserved)
+        dts.append(time()-t)
+        if cost < Routing.COST_BREAK:
+            success += 1
+            costs.append(cost)
+
+    return {'success': success, 'costs': costs, 'times': dts}
+
+
+def show(results, trials=TRIALS):
+    '''Echo a table of the benchmark results'''
+
+    print('\n{0:>8} {1:>8} {2:>10} {3:>10} {4:>10}'.format(
+        'routes', 'success', 'mean cost', 'ms/call', 'max ms'))
+    for num_routes in ROUTES:
+        res = results[num_routes]
+        print('{0:>8} {1:>8} {2:>10.2f} {3:>10.2f} {4:>10.2f}'.format(
+            num_routes, '{0}/{1}'.format(res['success'], trials),
+            np.mean(res['costs']) if res['costs'] else 0,
+            1e3*np.mean(res['times']), 1e3*np.max(res['times'])))
+
+
+if __name__ == '__main__':
+
+    try:
+        seed = int(sys.argv[1])
+    except:
+        seed = 0
+
+    show({num_routes: run_bench(num_routes, seed=seed)
+          for num_routes in ROUTES})
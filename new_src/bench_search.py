@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+
+#---------------------------------------------------------
+# Name: bench_search.py
+# Purpose: Side-by-side comparison of the Dijkstra and A* multi-source
+#          search methods used by Dense Placement
+# Author: Jacob Retallick
+# Created: 2026.10.17
+#---------------------------------------------------------
+
+import numpy as np
+import random
+import sys
+
+from time import time
+
+from parse_qca import parse_qca_file
+from auxil import CELL_FUNCTIONS, convert_adjacency
+import dense_placement.embed as embed
+
+TYPES = ['Dijkstra', 'Astar']   # search methods to compare
+TRIALS = 5                      # number of seeded embedding trials per method
+M, N, L = 12, 12, 4             # target Chimera size
+
+_stats = {}     # counters for the active method
+
+
+def qca_to_source(fname, adj='full'):
+    '''Build the Dense Placement source graph of the normal and output cells
+    of a QCADesigner file'''
+
+    try:
+        cells, spacing, zones, J, _ = parse_qca_file(fname, one_zone=True)
+    except:
+        print('Failed to process QCA file: {0}'.format(fname))
+        return None
+
+    J = convert_adjacency(cells, spacing, J, adj=adj)
+
+    CFs = [CELL_FUNCTIONS['QCAD_CELL_NORMAL'],
+           CELL_FUNCTIONS['QCAD_CELL_OUTPUT']]
+    inds = [i for i in xrange(len(cells)) if cells[i]['cf'] in CFs]
+
+    return {i: [j for j in np.nonzero(J[i])[0] if j in inds] for i in inds}
+
+
+def counted(extend):
+    '''Wrap a search extension generator to count expanded nodes'''
+
+    def wrapper(*args):
+        for qbit in extend(*args):
+            _stats['nodes'] += 1
+            yield qbit
+    return wrapper
+
+
+def timed(place):
+    '''Wrap placeCell to record nodes expanded and wall time of each top
+    level call. Recursive calls from seam opening are included in the
+    parent call'''
+
+    def wrapper(*args):
+        _stats['depth'] += 1
+        nodes, t = _stats['nodes'], time()
+        try:
+            return place(*args)
+        finally:
+            _stats['depth'] -= 1
+            if _stats['depth'] == 0:
+                _stats['calls'].append((_stats['nodes']-nodes, time()-t))
+    return wrapper
+
+
+def run_bench(source, trials=TRIALS):
+    '''Run seeded Dense Placement trials for each search method'''
+
+    state = embed.EmbedderState(M, N, L)
+    state.setQbitAdj(state.getCouplerFlags())
+
+    Embedder = embed.EmbedderState
+    Embedder.extend_Dijkstra = counted(Embedder.extend_Dijkstra)
+    Embedder.extend_Astar = counted(Embedder.extend_Astar)
+    Embedder.placeCell = timed(Embedder.placeCell)
+
+    results = {}
+    for typ in TYPES:
+        embed.SEARCH_TYPE = typ
+        _stats.update({'nodes': 0, 'depth': 0, 'calls': []})
+        success, t = 0, time()
+        for trial in xrange(trials):
+            random.seed(trial)
+            try:
+                state.denseEmbed(source)
+                success += 1
+            except Exception as e:
+                if type(e).__name__ == 'KeyboardInterrupt':
+                    raise KeyboardInterrupt
+        results[typ] = {'success': success,
+                        'time': time()-t,
+                        'calls': _stats['calls']}
+
+    return results
+
+
+def show(results, trials=TRIALS):
+    '''Echo a comparison table of the benchmark results'''
+
+    print('\n{0:>10} {1:>8} {2:>8} {3:>12} {4:>12} {5:>10}'.format(
+        'method', 'success', 'places', 'nodes/place', 'ms/place', 'total(s)'))
+    for typ in TYPES:
+        res = results[typ]
+        nodes, dts = zip(*res['calls']) if res['calls'] else ([0], [0])
+        print('{0:>10} {1:>8} {2:>8} {3:>12.1f} {4:>12.2f} {5:>10.2f}'.format(
+            typ, '{0}/{1}'.format(res['success'], trials), len(res['calls']),
+            np.mean(nodes), 1e3*np.mean(dts), res['time']))
+
+
+if __name__ == '__main__':
+
+    try:
+        fname = sys.argv[1]
+    except:
+        print('No file given...')
+        sys.exit()
+
+    source = qca_to_source(fname)
+    if source is not None:
+        show(run_bench(source))
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+
+#---------------------------------------------------------
+# Name: bench_wires.py
+# Purpose: Comparison of the DP and recursive DFS wire lengthening methods
+#          used by Dense Placement wire path shortening on circuits with
+#          long wires
+# Author: Jacob Retallick
+# Created: 2026.10.17
+#---------------------------------------------------------
+
+import numpy as np
+import random
+import sys
+
+import dense_placement.embed as embed
+from dense_placement.convert import convertToModels
+
+METHODS = ['DFS', 'DP']     # wire lengthening methods to compare
+WIRE_LENS = [6, 10, 14]     # maximum wire lengths between gates
+HUBS = 12                   # number of gates per circuit
+TRIALS = 10                 # number of seeded circuits per wire length
+M, N, L = 12, 12, 4         # target Chimera size
+
+_stats = {}     # counters for the active method
+
+
+def gen_circuit(num_hubs, wire_len, rng):
+    '''Generate a circuit source graph of gates with three or four
+    connections joined in a random tree by wires of up to wire_len cells.
+    Gates with unused connections get short dangling wires'''
+
+    source = {}
+    num = [0]
+
+    def new_cell():
+        source[num[0]] = []
+        num[0] += 1
+        return num[0]-1
+
+    def connect(c1, c2):
+        source[c1].append(c2)
+        source[c2].append(c1)
+
+    def wire(c1, length, c2=None):
+        for _ in xrange(length):
+            cell = new_cell()
+            connect(c1, cell)
+            c1 = cell
+        if c2 is not None:
+            connect(c1, c2)
+
+    hubs = [new_cell() for _ in xrange(num_hubs)]
+    for i in xrange(1, num_hubs):
+        # attach to an earlier gate with a free connection
+        cands = [hub for hub in hubs[:i] if len(source[hub]) < 4]
+        wire(hubs[i], rng.randint(wire_len//2, wire_len), rng.choice(cands))
+
+    for hub in hubs:
+        while len(source[hub]) < 3:
+            wire(hub, rng.randint(2, 4))
+
+    return source
+
+
+def counted(lengthen):
+    '''Wrap a wire lengthening method to count calls and failures'''
+
+    def wrapper(*args):
+        qb_wire = lengthen(*args)
+        _stats['calls'] += 1
+        _stats['failed'] += qb_wire is None
+        return qb_wire
+    return wrapper
+
+
+def run_bench(wire_len, trials=TRIALS):
+    '''Run seeded Dense Placement trials for each lengthening method on
+    circuits with the given maximum wire length'''
+
+    state = embed.EmbedderState(M, N, L)
+    state.setQbitAdj(state.getCouplerFlags())
+
+    rng = random.Random(wire_len)
+    circuits = [gen_circuit(HUBS, wire_len, rng) for _ in xrange(trials)]
+
+    results = {}
+    for method in METHODS:
+        embed.WIRE_SEARCH = method
+        _stats.update({'calls': 0, 'failed': 0})
+        res = {'success': 0, 'shorten': [], 'extra': [], 'chain': []}
+        for trial, source in enumerate(circuits):
+            random.seed(trial)
+            try:
+                cell_map, paths, stats = state.denseEmbed(source, stats=True)
+            except Exception as e:
+                if type(e).__name__ == 'KeyboardInterrupt':
+                    raise KeyboardInterrupt
+                continue
+            res['success'] += 1
+            res['shorten'].append(stats['time']['shorten'])
+            res['extra'].append(sum(len(p)-2 for p in paths.values()))
+            models, max_model = convertToModels(paths, cell_map)
+            res['chain'].append(max_model)
+        res.update(_stats)
+        results[method] = res
+
+    return results
+
+
+def show(results, trials=TRIALS):
+    '''Echo a comparison table of the benchmark results'''
+
+    print('\n{0:>6} {1:>6} {2:>8} {3:>12} {4:>10} {5:>10} {6:>8} '
+          '{7:>9}'.format('wire', 'method', 'success', 'lengthened',
+                          'ms/short', 'max ms', 'extra', 'max chain'))
+    for wire_len in WIRE_LENS:
+        for method in METHODS:
+            res = results[wire_len][method]
+            mean = lambda x: np.mean(x) if x else 0
+            print('{0:>6} {1:>6} {2:>8} {3:>12} {4:>10.2f} {5:>10.2f} '
+                  '{6:>8.1f} {7:>9.2f}'.format(
+                      wire_len, method,
+                      '{0}/{1}'.format(res['success'], trials),
+                      '{0}/{1}'.format(res['calls']-res['failed'],
+                                       res['calls']),
+                      1e3*mean(res['shorten']),
+                      1e3*max(res['shorten'] or [0]),
+                      mean(res['extra']), mean(res['chain'])))
+
+
+if __name__ == '__main__':
+
+    try:
+        trials = int(sys.argv[1])
+    except:
+        trials = TRIALS
+
+    Embedder = embed.EmbedderState
+    Embedder.lengthen = counted(Embedder.lengthen)
+    Embedder.bounded_path = counted(Embedder.bounded_path)
+
+    show({wire_len: run_bench(wire_len, trials) for wire_len in WIRE_LENS},
+         trials)
@@ -10,7 +10,6 @@
 
 import numpy as np
 import networkx as nx
-import itertools
 import re
 
 # ASSIGNMENT PARAMETERS
@@ -25,6 +24,31 @@ strategy = 'maximal'
 assert strategy.lower() in strategies, 'Invalid edge selection strategy'
 
 
+_graph_memo = {}    # last chimera adjacency and its networkx graph
+
+
+def chimera_graph(chimera):
+    '''networkx graph of a chimera adjacency structure. The graph of the
+    last adjacency is kept, so repeated calls with the same unmodified
+    adjacency only build it once'''
+
+    if _graph_memo.get('adj') is not chimera or \
+            _graph_memo.get('size') != len(chimera):
+        _graph_memo['adj'] = chimera
+        _graph_memo['size'] = len(chimera)
+        _graph_memo['graph'] = nx.Graph(chimera)
+
+    return _graph_memo['graph']
+
+
+def model_index(parts):
+    '''Map each qbit of a list of partitions to its partition index and its
+    position in the partition'''
+
+    return {qbit: (i, k) for i, part in enumerate(parts)
+            for k, qbit in enumerate(part)}
+
+
 def sort_dict(d):
     '''Sort the keys of a dict by d[key]'''
     return zip(*sorted([(d[k], k) for k in d]))[1]
@@ -175,19 +199,31 @@ def partition_graph(G, parts):
             raise KeyError('Invalid indices given: {0}'.format(conflicts))
         subgraphs[i] = subgraph
 
-    # get list of edges between each subgraph
+    # get list of edges between each subgraph, walking the neighbours of
+    # each qbit once. Edges are in order of the positions of their end points
+    # in parts[i1] then parts[i2]
+    index = model_index(parts)
     edges = {}
-    for i1 in xrange(N-1):
-        for i2 in xrange(i1+1, N):
-            edges[(i1, i2)] = []
-            for u, v in list(itertools.product(parts[i1], parts[i2])):
-                edge = sorted([u, v])
-                if G.has_edge(*edge):
-                    edges[(i1, i2)].append(edge)
-            if len(edges[(i1, i2)]) == 0:
-                raise KeyError('No edges found between partitions {0} \
+    for i1, part in enumerate(parts):
+        for k1, u in enumerate(part):
+            for v in G[u]:
+                if v not in index:
+                    continue
+                i2, k2 = index[v]
+                if i1 < i2:
+                    edges.setdefault((i1, i2), []).append(
+                        (k1, k2, sorted([u, v])))
+
+    # every pair of subgraphs must be connected
+    if len(edges) < N*(N-1)//2:
+        i1, i2 = next((i1, i2) for i1 in xrange(N-1)
+                     for i2 in xrange(i1+1, N) if not (i1, i2) in edges)
+        raise KeyError('No edges found between partitions {0} \
                                 and {1}'.format(i1, i2))
 
+    for key in edges:
+        edges[key] = [edge for k1, k2, edge in sorted(edges[key])]
+
     return subgraphs, edges
 
 
@@ -246,8 +282,8 @@ def assign_parameters(h, J, qbits, chimera, flip_J=False):
         print('Flipping signs of J coefficients')
         J = -J
 
-    # build chimera graph
-    G_chimera = nx.Graph(chimera)
+    # chimera graph
+    G_chimera = chimera_graph(chimera)
 
     # get subgraphs and edge lists for problem node qbit lists
     try:
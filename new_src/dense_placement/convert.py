@@ -9,14 +9,22 @@
 #------------------------------------------------------------------------------
 
 #from scipy.optimize import linprog     # need scipy.__version__ >= 0.15.1
-import pulp     # python LP and MIP classes and binding
 from random import shuffle
 from copy import copy as cp
+from fractions import Fraction
+from collections import deque
 import os    # only for deleting LP solution file
 
+try:
+    import pulp     # python LP and MIP classes and binding
+except ImportError:
+    pulp = None     # only needed for the optional LP solver
+
 
 ### HANDLES ###
 
+USE_LP = False          # flag for solving with PuLP instead of solveMinMax
+CHECK_LP = False        # flag for cross-checking solveMinMax against PuLP
 USE_DEFAULT = False     # flag for using default PuLP solver.
 USE_LPR = False         # flag for using LP-relaxation. Current not implemented
 
@@ -393,10 +401,150 @@ def solToModels(sol, prob_dict):
     return models
 
 
+def maxFlow(graph, caps, src, snk):
+    '''Maximum flow from src to snk by shortest augmenting paths. graph is a
+    node indexed list of (edge, target) pairs and caps the edge indexed
+    residual capacities, with edge e^1 the reverse of edge e. caps is
+    updated in place. Returns the flow value'''
+
+    flow = 0
+    while True:
+        # breadth first search for an augmenting path
+        parent = {src: None}
+        queue = deque([src])
+        while queue and snk not in parent:
+            node = queue.popleft()
+            for e, target in graph[node]:
+                if caps[e] > 0 and target not in parent:
+                    parent[target] = (node, e)
+                    queue.append(target)
+        if snk not in parent:
+            return flow
+
+        # bottleneck capacity along the path
+        path, node = [], snk
+        while parent[node] is not None:
+            node, e = parent[node]
+            path.append(e)
+        df = min(caps[e] for e in path)
+        for e in path:
+            caps[e] -= df
+            caps[e ^ 1] += df
+        flow += df
+
+
+def assignEnds(prob_dict, mu):
+    '''Check whether a maximum model size mu is achievable. Each chain must
+    give at least its demand of qubits to its two end models: all of them
+    for chains without nodes, otherwise enough that the chain nodes average
+    at most mu qubits. End models hold at most mu-1 chain qubits. The split
+    is a flow from chains to end points. Returns the lists of start and end
+    group sizes n and m, or None if mu is infeasible'''
+
+    N = prob_dict['node_lens']
+    M = prob_dict['chain_lens']
+    keys = prob_dict['keys']
+    end_lists = prob_dict['end_lists']
+    K = len(keys)
+
+    cap = int(mu) - 1   # chain qubits allowed in each end model
+    if cap < 0:
+        return None
+
+    # demand of each chain
+    demands = []
+    for i in xrange(K):
+        if N[i] == 0:
+            d = M[i]
+        else:
+            d = max(0, -int((mu*N[i]-M[i]) // 1))     # ceil(M-mu*N)
+            if d > M[i] - N[i]:
+                return None
+        demands.append(d)
+
+    # flow network: source, sink, chains then end points
+    ends = {node: 2+K+k for k, node in enumerate(end_lists)}
+    graph = [[] for _ in xrange(2+K+len(ends))]
+    caps = []
+
+    def addEdge(u, v, c):
+        graph[u].append((len(caps), v))
+        caps.append(c)
+        graph[v].append((len(caps), u))
+        caps.append(0)
+
+    split = []  # edges to the start and end models of each chain
+    for i in xrange(K):
+        addEdge(0, 2+i, demands[i])
+        split.append(len(caps))
+        addEdge(2+i, ends[keys[i][0]], demands[i])
+        addEdge(2+i, ends[keys[i][1]], demands[i])
+    for node in ends:
+        addEdge(ends[node], 1, cap)
+
+    if maxFlow(graph, caps, 0, 1) < sum(demands):
+        return None
+
+    # the reverse edges hold the flow to each end model
+    n = [caps[e+1] for e in split]
+    m = [caps[e+3] for e in split]
+
+    return n, m
+
+
+def solveMinMax(prob_dict, verbose):
+    '''Find the chain splits which minimize the largest model size. The
+    optimal mu is either an integer (an end model) or the average chain
+    node model size (M-n-m)/N of some chain, so binary search the sorted
+    candidate values with the assignEnds feasibility check'''
+
+    N = prob_dict['node_lens']
+    M = prob_dict['chain_lens']
+
+    # candidate values of mu, the largest is always feasible
+    cands = set(xrange(1, sum(M)+2))
+    for i in prob_dict['ind_nodes']:
+        for s in xrange(M[i]-N[i]+1):
+            cands.add(Fraction(M[i]-s, N[i]))
+    cands = sorted(cands)
+
+    lo, hi = 0, len(cands)-1
+    sol = assignEnds(prob_dict, cands[hi])
+    while lo < hi:
+        mid = (lo+hi)//2
+        split = assignEnds(prob_dict, cands[mid])
+        if split is None:
+            lo = mid+1
+        else:
+            hi, sol = mid, split
+
+    if sol is None:
+        return None, -1
+
+    sol = {'n': sol[0], 'm': sol[1], 'mu': float(cands[hi])}
+
+    if verbose:
+        print 'Max model size: %.2f' % sol['mu']
+        print sol['m']
+        print sol['n']
+
+    models = solToModels(sol, prob_dict)
+
+    if verbose:
+        for cell in models:
+            print 'c: %s \t :: %s' % (str(cell), str(models[cell]['qbits']))
+
+    return models, sol['mu']
+
+
 def solveLP(prob_dict, verbose):
     '''Solve the optimation problem using either Mixed Integer Programming
     or LP-Relaxation'''
 
+    if pulp is None:
+        print 'PuLP is not installed, LP solver unavailable'
+        return None, -1
+
     K = len(prob_dict['keys'])
     N = prob_dict['node_lens']
     M = prob_dict['chain_lens']
@@ -535,7 +683,15 @@ def convertToModels(paths, qbits, verbose=False):
         # generate problem dictionary
         prob_dict = formatProblem(extended_chains, qbits)
         # solve for optimal model parameters
-        models, max_model = solveLP(prob_dict, verbose=verbose)
+        if USE_LP:
+            models, max_model = solveLP(prob_dict, verbose=verbose)
+        else:
+            models, max_model = solveMinMax(prob_dict, verbose=verbose)
+            if CHECK_LP and models is not None and pulp is not None:
+                lp_max = solveLP(prob_dict, verbose=verbose)[1]
+                if abs(lp_max - max_model) > 1e-6:
+                    print('Model size mismatch: LP %.2f, min-max %.2f'
+                          % (lp_max, max_model))
         if models is None:
             print('Error occurred in model optimization...')
             return None, -1
@@ -0,0 +1,186 @@
+#---------------------------------------------------------
+# Name: graph.py
+# Purpose: Compact integer indexed Chimera graph shared by the placement
+#          and routing algorithms.
+# Author:	Jacob Retallick
+# Created: 17.10.2026
+#---------------------------------------------------------
+
+import numpy as np
+
+MEMO_SIZE = 16  # maximum number of memoised graphs
+
+_edge_memo = {}     # (M, N, L) keyed coupler arrays
+_index_memo = {}    # (M, N, L) keyed 4-tup to linear index dicts
+_graph_memo = {}    # (M, N, L, fault set) keyed graphs
+
+
+def chimera_edges(M, N, L):
+    '''Array of the linear (q1, q2) pairs, q1 < q2, of every coupler in a
+    full (M, N, L) processor, in increasing order of q1*size+q2. The array
+    is memoised and should not be modified'''
+
+    key = (M, N, L)
+    if key not in _edge_memo:
+        ids = np.arange(2*M*N*L).reshape([M, N, 2, L])
+
+        # internal couplers: every vertical to every horizontal qubit
+        vert = np.repeat(ids[:, :, 0, :], L, axis=2).ravel()
+        horz = np.tile(ids[:, :, 1, :], [1, 1, L]).ravel()
+
+        # external couplers: vertical qubits along columns, horizontal
+        # qubits along rows
+        down = [ids[:-1, :, 0, :].ravel(), ids[1:, :, 0, :].ravel()]
+        right = [ids[:, :-1, 1, :].ravel(), ids[:, 1:, 1, :].ravel()]
+
+        edges = np.vstack([np.column_stack([vert, horz]),
+                           np.column_stack(down), np.column_stack(right)])
+        order = np.argsort(edges[:, 0]*ids.size + edges[:, 1])
+        _edge_memo[key] = edges[order]
+
+    return _edge_memo[key]
+
+
+def qubit_index(M, N, L):
+    '''Dict of 0-indexed linear indices keyed by 4-tup qubit for an
+    (M, N, L) processor. The dict is memoised and should not be modified'''
+
+    key = (M, N, L)
+    if key not in _index_memo:
+        tups = np.unravel_index(np.arange(2*M*N*L), [M, N, 2, L])
+        _index_memo[key] = {tup: i for i, tup in
+                            enumerate(zip(*[x.tolist() for x in tups]))}
+    return _index_memo[key]
+
+
+def build_graph(M, N, L, dis_qbits=[], dis_coup=[]):
+    '''Memoised ChimeraGraph of an (M, N, L) processor with the given
+    faults. Graphs are read only, so the same object is returned for the same
+    size and set of disabled couplers.
+
+    inputs: M, N, L (int)       : processor size
+            dis_qbits (iter)    : 0-indexed linear disabled qubits
+            dis_coup (iter)     : 0-indexed linear (q1, q2) disabled couplers
+
+    output: graph (ChimeraGraph)
+    '''
+
+    size = 2*M*N*L
+    edges = chimera_edges(M, N, L)
+
+    # mask couplers which are disabled or touch a disabled qubit
+    mask = np.zeros(len(edges), dtype=bool)
+    dis_qbits = np.array(list(dis_qbits), dtype=int)
+    if dis_qbits.size:
+        mask |= np.in1d(edges, dis_qbits).reshape([-1, 2]).any(axis=1)
+    dis_coup = np.array(list(dis_coup), dtype=int).reshape([-1, 2])
+    if dis_coup.size:
+        dis_coup.sort(axis=1)
+        codes = edges[:, 0]*size + edges[:, 1]
+        mask |= np.in1d(codes, dis_coup[:, 0]*size + dis_coup[:, 1])
+
+    key = (M, N, L, frozenset(np.nonzero(mask)[0].tolist()))
+    if key not in _graph_memo:
+        if len(_graph_memo) >= MEMO_SIZE:
+            _graph_memo.clear()
+        _graph_memo[key] = ChimeraGraph(M, N, L, edges[~mask])
+
+    return _graph_memo[key]
+
+
+def graph_from_edges(M, N, L, edges):
+    '''ChimeraGraph of an (M, N, L) processor with the given active
+    couplers. If every coupler is a Chimera coupler the graph is built from
+    the set of missing couplers with build_graph, so it is memoised.
+
+    inputs: M, N, L (int)   : processor size
+            edges (iter)    : 0-indexed linear (q1, q2) active couplers, in
+                              either or both directions
+
+    output: graph (ChimeraGraph)
+    '''
+
+    size = 2*M*N*L
+    full = chimera_edges(M, N, L)
+    full_codes = full[:, 0]*size + full[:, 1]
+
+    edges = np.array(edges, dtype=int).reshape([-1, 2])
+    codes = np.unique(edges.min(axis=1)*size + edges.max(axis=1))
+    if not np.in1d(codes, full_codes).all():
+        return ChimeraGraph(M, N, L, edges)
+
+    return build_graph(M, N, L, dis_coup=full[~np.in1d(full_codes, codes)])
+
+
+class ChimeraGraph:
+    '''Integer indexed Chimera graph. Each qubit is labelled by the 0-indexed
+    linear index of its 4-tup (row, col, horiz, index), the same labelling
+    as embed.indexToLinear with index0=True. Neighbours are stored in CSR
+    format with sorted neighbour lists.'''
+
+    def __init__(self, M, N, L, edges):
+        '''Build the graph for an (M, N, L) processor.
+
+        inputs: M (int)         : number of tile rows
+                N (int)         : number of tile columns
+                L (int)         : number of qubits per half tile
+                edges (iter)    : linear (q1, q2) pairs of active couplers
+        '''
+
+        self.M, self.N, self.L = M, N, L
+        self.size = 2*M*N*L     # number of qubits, active or not
+
+        # qubit coordinates
+        ids = np.arange(self.size)
+        self.row, rem = divmod(ids, 2*N*L)
+        self.col, rem = divmod(rem, 2*L)
+        self.horiz, self.index = divmod(rem, L)
+        self.tile = ids // (2*L)    # linear tile index, row*N+col
+
+        self.tuples = zip(*[x.tolist() for x in
+                            [self.row, self.col, self.horiz, self.index]])
+
+        # symmetric, duplicate free coupler list
+        if not isinstance(edges, np.ndarray):
+            edges = list(edges)
+        edges = np.array(edges, dtype=int).reshape([-1, 2])
+        edges = np.vstack([edges, edges[:, ::-1]])
+        edges = edges[edges[:, 0] != edges[:, 1]]
+        codes = np.unique(edges[:, 0]*self.size + edges[:, 1])
+        src, dst = divmod(codes, self.size)
+
+        # CSR adjacency, codes are sorted so neighbours are sorted
+        self.indices = dst.astype(np.int32)
+        self.indptr = np.zeros(self.size+1, dtype=np.int32)
+        self.indptr[1:] = np.cumsum(np.bincount(src, minlength=self.size))
+        self.degree = np.diff(self.indptr)
+
+        # neighbour lists for python level iteration
+        self.adj = [self.indices[self.indptr[i]:self.indptr[i+1]].tolist()
+                    for i in xrange(self.size)]
+
+    def linear(self, tup):
+        '''Linear index of a 4-tup qubit, None if not on the processor'''
+
+        r, c, h, l = tup
+        if 0 <= r < self.M and 0 <= c < self.N and \
+                0 <= h < 2 and 0 <= l < self.L:
+            return ((r*self.N + c)*2 + h)*self.L + l
+        return None
+
+    def qbit(self, tup):
+        '''Linear index of a 4-tup qubit. Raises KeyError if the qubit is not
+        on the processor'''
+
+        qb = self.linear(tup)
+        if qb is None:
+            raise KeyError(tup)
+        return qb
+
+    def shift(self, qbit, axis, step):
+        '''4-tup of a qubit moved by step tiles along the given axis: 0 for
+        rows and 1 for columns. May lie outside the processor'''
+
+        tup = list(self.tuples[qbit])
+        tup[axis] += step
+        return tuple(tup)
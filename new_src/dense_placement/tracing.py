@@ -0,0 +1,114 @@
+#---------------------------------------------------------
+# Name: tracing.py
+# Purpose: Lightweight structured event tracing for Dense Placement. Events
+#          are kept unformatted in a bounded ring buffer and only converted
+#          to JSON-lines when dumped.
+# Author:	Jacob Retallick
+# Created: 17.10.2026
+#---------------------------------------------------------
+
+from collections import deque
+from time import time
+import json
+
+
+def _jsonable(obj):
+    '''Fallback conversion of non JSON types in trace fields'''
+
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj)
+    if hasattr(obj, 'tolist'):     # numpy arrays and scalars
+        return obj.tolist()
+    return str(obj)
+
+
+def _key(key):
+    '''JSON object key for a dict key. Tuple keys (cell pairs) are joined'''
+
+    if isinstance(key, tuple):
+        return ','.join(map(str, key))
+    return key if isinstance(key, basestring) else str(key)
+
+
+def _keys(obj):
+    '''Recursively convert dict keys to strings'''
+
+    if isinstance(obj, dict):
+        return {_key(k): _keys(v) for k, v in obj.iteritems()}
+    if isinstance(obj, (list, tuple)):
+        return [_keys(x) for x in obj]
+    return obj
+
+
+class Tracer:
+    '''Bounded ring buffer of structured trace events. When disabled, event()
+    returns immediately and no field is touched. When enabled, events are
+    stored as (time, name, fields) with the field values by reference, so
+    callers should pass immutable or no longer mutated values. Formatting
+    is deferred to dump() or format()'''
+
+    def __init__(self, enabled=False, size=10000, verbose=False):
+        '''Initialise a tracer.
+
+        inputs: enabled (bool)  : record events
+                size (int)      : maximum number of buffered events, oldest
+                                  events are dropped first
+                verbose (bool)  : also echo each event as it is recorded
+        '''
+
+        self.enabled = enabled
+        self.verbose = verbose
+        self.size = size
+        self._events = deque(maxlen=size)
+        self._t0 = time()
+
+    def __nonzero__(self):
+        return self.enabled
+
+    def __len__(self):
+        return len(self._events)
+
+    def clear(self):
+        '''Drop all buffered events and restart the trace clock'''
+
+        self._events.clear()
+        self._t0 = time()
+
+    def event(self, name, **fields):
+        '''Record a trace event if enabled'''
+
+        if self.enabled:
+            ev = (time()-self._t0, name, fields)
+            self._events.append(ev)
+            if self.verbose:
+                print self.format(ev)
+
+    def format(self, ev):
+        '''JSON-line of a single buffered event'''
+
+        t, name, fields = ev
+        rec = _keys(fields)
+        rec['t'] = round(t, 6)
+        rec['ev'] = name
+        return json.dumps(rec, default=_jsonable, sort_keys=True)
+
+    def events(self):
+        '''List of buffered events as dicts, oldest first'''
+
+        return [json.loads(self.format(ev)) for ev in self._events]
+
+    def dump(self, fname):
+        '''Write the buffered events to file as JSON-lines. Returns the
+        number of events written, None if the file could not be opened'''
+
+        try:
+            fp = open(fname, 'w')
+        except IOError:
+            print('Failed to open trace file... likely invalid directory path')
+            return None
+
+        for ev in self._events:
+            fp.write(self.format(ev) + '\n')
+        fp.close()
+
+        return len(self._events)
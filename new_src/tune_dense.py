@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+
+#---------------------------------------------------------
+# Name: tune_dense.py
+# Purpose: Random search tuning of the Dense Placement cost constants over
+#          a corpus of circuits and Chimera fault maps
+# Author: Jacob Retallick
+# Created: 2026.10.17
+#---------------------------------------------------------
+
+import numpy as np
+import multiprocessing as mp
+import argparse
+import random
+import sys
+import os
+
+from time import time
+
+from bench_search import qca_to_source
+import dense_placement.embed as embed
+from dense_placement.graph import chimera_edges
+
+SETS = 20               # number of parameter sets, including the current one
+TRIALS = 4              # seeded trials per circuit and target
+M, N, L = 12, 12, 4     # size of the fault free target
+
+# (low, high, type) sampling range of each tunable constant
+SEARCH_SPACE = {
+    'embed': {'IN_TILE_COST': (.5, 2., float),
+              'OUT_TILE_COST': (1., 4., float),
+              'EDGE_REP_COST': (0., 1.5, float),
+              'SEAM_QBIT_COST': (10., 60., float),
+              'SEAM_PATH_COST': (10., 80., float),
+              'SEAM_EXT_COST': (0., 10., float),
+              'SEAM_DIST_COST': (10., 60., float),
+              'FIRST_PROB_POW': (1., 6., float)},
+    'routing': {'COST_BASE': (.5, 2., float),
+                'COST_HISTORY': (.5, 2., float),
+                'INC_SHARING': (.5, 2., float),
+                'BREAK_SHARING': (10, 40, int),
+                'RATE_FORGET': (0., .01, float)}}
+
+_circuits = []      # (name, source) pairs of the corpus in this process
+_targets = []       # (name, M, N, dis_coup, dis_qbits) of each target
+_budget = None      # time budget of each trial in this process
+
+
+def load_fault_map(fname):
+    '''Disabled couplers and qubits of a Chimera graph file, as 1-indexed
+    linear indices for getCouplerFlags. The file lists the number of qubits
+    and couplers followed by the working couplers. Returns the target tuple
+    (name, M, N, dis_coup, dis_qbits)'''
+
+    try:
+        with open(fname, 'r') as fp:
+            num_qbits, num_conns = [int(x) for x in fp.readline().split()]
+            conns = np.array(fp.read().split(), dtype=int).reshape([-1, 2])
+    except (IOError, ValueError):
+        print('Failed to load fault map: {0}'.format(fname))
+        raise IOError
+
+    M = N = int(np.sqrt(num_qbits/(2.*L)))
+
+    conns = np.sort(conns-1, axis=1)
+    edges = chimera_edges(M, N, L)
+
+    size = 2*M*N*L
+    dis_qbits = np.setdiff1d(np.arange(size), conns.ravel())
+    missing = ~np.in1d(edges[:, 0]*size+edges[:, 1],
+                       conns[:, 0]*size+conns[:, 1])
+    missing &= ~np.in1d(edges, dis_qbits).reshape([-1, 2]).any(axis=1)
+
+    name = os.path.splitext(os.path.basename(fname))[0]
+    return (name, M, N, (edges[missing]+1).tolist(), (dis_qbits+1).tolist())
+
+
+def sample_profile(rng):
+    '''Random cost profile from the search space'''
+
+    profile = {}
+    for mod, space in SEARCH_SPACE.iteritems():
+        profile[mod] = {}
+        for key, (low, high, typ) in space.iteritems():
+            if typ is int:
+                profile[mod][key] = rng.randint(low, high)
+            else:
+                profile[mod][key] = round(rng.uniform(low, high), 4)
+    return profile
+
+
+def _init_worker(circuits, targets, budget):
+    '''Set the corpus, targets and trial time budget of the current
+    process'''
+    global _circuits, _targets, _budget
+
+    _circuits, _targets, _budget = circuits, targets, budget
+
+
+def run_task(task):
+    '''Run one seeded trial of a parameter set on a circuit and target.
+    Returns the task indices with the number of qubits used, None on
+    failure, and the trial time'''
+
+    ind, profile, circ, targ, seed = task
+    name, M, N, dis_coup, dis_qbits = _targets[targ]
+
+    embed.setChimeraSize(M, N, L)
+    embed.setQbitAdj(embed.getCouplerFlags(dis_coup, dis_qbits))
+
+    random.seed(seed)
+    np.random.seed(seed)
+    t = time()
+    try:
+        cell_map, paths = embed.denseEmbed(_circuits[circ][1],
+                                           budget=_budget, profile=profile)
+    except KeyboardInterrupt:
+        raise KeyboardInterrupt
+    except (Exception, SystemExit):
+        return ind, circ, targ, None, time()-t
+
+    qbits = set(cell_map.values())
+    for path in paths.values():
+        qbits.update(path)
+
+    return ind, circ, targ, len(qbits), time()-t
+
+
+def run_tuning(circuits, targets, sets=SETS, trials=TRIALS, seed=0,
+               procs=None, budget=None, verbose=True):
+    '''Run every parameter set on every circuit and target. Parameter set 0
+    is the current profile and all sets share the trial seeds, so sets are
+    compared on the same random choices. Returns a list of results per set
+    with the profile, success rate, mean qubits per cell of the successful
+    trials and mean trial time'''
+
+    rng = random.Random(seed)
+    profiles = [embed.getProfile()]
+    profiles += [sample_profile(rng) for _ in xrange(sets-1)]
+
+    tasks = [(ind, profile, circ, targ, seed+trial)
+             for ind, profile in enumerate(profiles)
+             for circ in xrange(len(circuits))
+             for targ in xrange(len(targets))
+             for trial in xrange(trials)]
+
+    init_args = (circuits, targets, budget)
+    procs = max(1, min(procs or mp.cpu_count(), len(tasks)))
+    if procs == 1:
+        _init_worker(*init_args)
+        results = (run_task(task) for task in tasks)
+        pool = None
+    else:
+        pool = mp.Pool(procs, initializer=_init_worker, initargs=init_args)
+        results = pool.imap_unordered(run_task, tasks)
+
+    runs = [[] for _ in profiles]
+    try:
+        for count, (ind, circ, targ, qbits, dt) in enumerate(results, 1):
+            cells = len(circuits[circ][1])
+            runs[ind].append((qbits, cells, dt))
+            if verbose and count % max(1, len(tasks)//20) == 0:
+                print('{0}/{1} trials done'.format(count, len(tasks)))
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    stats = []
+    for ind, profile in enumerate(profiles):
+        good = [qbits*1./cells for qbits, cells, dt in runs[ind]
+                if qbits is not None]
+        stats.append({'set': ind,
+                      'profile': profile,
+                      'success': len(good)*1./len(runs[ind]),
+                      'qubits': np.mean(good) if good else float('inf'),
+                      'time': np.mean([dt for _, _, dt in runs[ind]])})
+
+    return stats
+
+
+def rank(stats):
+    '''Order parameter sets by decreasing success rate, then by increasing
+    qubits per cell and trial time'''
+
+    return sorted(stats, key=lambda x: (-x['success'], x['qubits'],
+                                        x['time']))
+
+
+def show(stats):
+    '''Echo a table of the ranked parameter sets'''
+
+    print('\n{0:>5} {1:>8} {2:>12} {3:>10}'.format(
+        'set', 'success', 'qubits/cell', 'ms/trial'))
+    for res in rank(stats):
+        print('{0:>5} {1:>8.2f} {2:>12.3f} {3:>10.1f}'.format(
+            res['set'], res['success'], res['qubits'], 1e3*res['time']))
+
+
+def save_best(stats, name, circuits, targets, trials, seed):
+    '''Write the best parameter set as a named cost profile, with a record
+    of how it was tuned'''
+
+    best = rank(stats)[0]
+    profile = dict(best['profile'])
+    profile['info'] = {'circuits': [circ[0] for circ in circuits],
+                       'targets': [targ[0] for targ in targets],
+                       'sets': len(stats), 'trials': trials, 'seed': seed,
+                       'success': best['success'], 'qubits': best['qubits'],
+                       'time': best['time']}
+    embed.saveProfile(name, profile)
+
+    print('\nSet {0} saved as profile: {1}'.format(
+        best['set'], embed.profileFile(name)))
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description='Tune the Dense Placement cost constants by random '
+                    'search and save the best set as a named cost profile.')
+    parser.add_argument('qca_files', nargs='+', help='QCADesigner circuits')
+    parser.add_argument('-c', '--chimera', nargs='*', default=[],
+                        help='Chimera graph files of the fault maps, a '
+                             '{0}x{1} fault free target if none'.format(M, N))
+    parser.add_argument('-n', '--sets', type=int, default=SETS,
+                        help='number of parameter sets')
+    parser.add_argument('-t', '--trials', type=int, default=TRIALS,
+                        help='trials per circuit and target')
+    parser.add_argument('-p', '--procs', type=int, default=None,
+                        help='number of worker processes, default all cores')
+    parser.add_argument('-b', '--budget', type=float, default=None,
+                        help='time budget in seconds per trial')
+    parser.add_argument('-s', '--seed', type=int, default=0,
+                        help='seed of the parameter sets and trials')
+    parser.add_argument('-o', '--profile', default='tuned',
+                        help='name or file of the saved profile')
+    args = parser.parse_args()
+
+    circuits = []
+    for fname in args.qca_files:
+        source = qca_to_source(fname)
+        if source:
+            circuits.append((os.path.basename(fname), source))
+    try:
+        targets = [load_fault_map(fname) for fname in args.chimera]
+    except IOError:
+        sys.exit()
+    targets = targets or [('ideal', M, N, [], [])]
+
+    if not circuits:
+        print('No circuits to tune on...')
+        sys.exit()
+
+    stats = run_tuning(circuits, targets, sets=args.sets, trials=args.trials,
+                       seed=args.seed, procs=args.procs, budget=args.budget)
+    show(stats)
+    save_best(stats, args.profile, circuits, targets, args.trials, args.seed)